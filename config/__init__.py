@@ -8,16 +8,81 @@ from config.settings import (
     DATA_DIR,
     CONVERSATIONS_DIR,
     EXPERIMENTS_DIR,
+    INGESTION_JOBS_DIR,
+    CACHE_DIR,
     OLLAMA_MODELS_FILE,
     EMBEDDING_MODELS_FILE,
     STYLES_FILE,
     OLLAMA_BASE_URL,
     OLLAMA_API_TAGS,
+    OLLAMA_DEFAULT_NUM_CTX,
+    OLLAMA_EMBED_BATCH_SIZE,
+    OLLAMA_EMBED_CONCURRENCY,
+    OLLAMA_EMBED_MAX_RETRIES,
+    OLLAMA_EMBED_RETRY_BACKOFF_SECONDS,
+    OLLAMA_EMBED_TIMEOUT_SECONDS,
     DEFAULT_TEMPERATURE,
     DEFAULT_CHUNK_SIZE,
+    DEFAULT_CHUNK_TOKENS,
     DEFAULT_TOP_K,
     PARENT_CHUNK_MULTIPLIER,
     CHUNK_OVERLAP_RATIO,
+    PDF_PARSE_WORKERS,
+    PDF_PAGES_PER_TASK,
+    PDF_PARALLEL_MIN_PAGES,
+    PARSED_TEXT_CACHE_FILE,
+    PARSED_TEXT_CACHE_MAX_BYTES,
+    INGESTION_PAGE_BATCH_SIZE,
+    INGESTION_CHUNK_BATCH_SIZE,
+    INGESTION_QUEUE_SIZE,
+    INGESTION_PROFILE_SAMPLE_SECONDS,
+    INGESTION_TRACE_MEMORY,
+    SWEEP_PROBE_QUERIES,
+    INGESTION_JOB_WORKERS,
+    INGESTION_JOB_HISTORY,
+    INGESTION_JOB_POLL_SECONDS,
+    EMBEDDING_CACHE_FILE,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_REGISTRY_MAX_BYTES,
+    EMBEDDING_REGISTRY_IDLE_SECONDS,
+    EMBEDDING_WARMUP_MODELS,
+    FAISS_FLAT_MAX_VECTORS,
+    FAISS_HNSW_MAX_VECTORS,
+    FAISS_IVF_FLAT_MAX_VECTORS,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NPROBE,
+    FAISS_TRAIN_SAMPLE_SIZE,
+    DOCSTORE_HOT_CACHE_SIZE,
+    DOCSTORE_TEMP_DIR,
+    EXPERIMENT_CACHE_MAX_ENTRIES,
+    EXPERIMENT_CACHE_MAX_BYTES,
+    BM25_K1,
+    BM25_B,
+    HYBRID_RRF_K,
+    HYBRID_FETCH_MULTIPLIER,
+    RERANK_MODEL,
+    RERANK_FETCH_MULTIPLIER,
+    RERANK_MAX_LENGTH,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_SCORE_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+    RETRIEVAL_BATCH_SIZE,
+    RETRIEVAL_MICROBATCH_MAX_SIZE,
+    RETRIEVAL_MICROBATCH_MAX_WAIT_MS,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_TTL_SECONDS,
+    LLM_CACHE_SIZE,
+    CHAIN_CACHE_SIZE,
+    CONTEXT_RESERVED_TOKENS,
+    CONTEXT_CHARS_PER_TOKEN,
+    CONTEXT_SCORE_STD_CUTOFF,
     APP_TITLE,
     APP_ICON,
     APP_LAYOUT,
@@ -34,6 +99,12 @@ from config.constants import (
     MessageRole,
     EmbeddingModelType,
     ExperimentStatus,
+    IngestionStage,
+    JobStatus,
+    JobKind,
+    IndexType,
+    RetrievalMode,
+    ChunkUnit,
     ConversationAction,
     TEXT_SEPARATORS,
     HARDWARE_REQUIREMENTS,
@@ -47,16 +118,81 @@ __all__ = [
     "DATA_DIR",
     "CONVERSATIONS_DIR",
     "EXPERIMENTS_DIR",
+    "INGESTION_JOBS_DIR",
+    "CACHE_DIR",
     "OLLAMA_MODELS_FILE",
     "EMBEDDING_MODELS_FILE",
     "STYLES_FILE",
     "OLLAMA_BASE_URL",
     "OLLAMA_API_TAGS",
+    "OLLAMA_DEFAULT_NUM_CTX",
+    "OLLAMA_EMBED_BATCH_SIZE",
+    "OLLAMA_EMBED_CONCURRENCY",
+    "OLLAMA_EMBED_MAX_RETRIES",
+    "OLLAMA_EMBED_RETRY_BACKOFF_SECONDS",
+    "OLLAMA_EMBED_TIMEOUT_SECONDS",
     "DEFAULT_TEMPERATURE",
     "DEFAULT_CHUNK_SIZE",
+    "DEFAULT_CHUNK_TOKENS",
     "DEFAULT_TOP_K",
     "PARENT_CHUNK_MULTIPLIER",
     "CHUNK_OVERLAP_RATIO",
+    "PDF_PARSE_WORKERS",
+    "PDF_PAGES_PER_TASK",
+    "PDF_PARALLEL_MIN_PAGES",
+    "PARSED_TEXT_CACHE_FILE",
+    "PARSED_TEXT_CACHE_MAX_BYTES",
+    "INGESTION_PAGE_BATCH_SIZE",
+    "INGESTION_CHUNK_BATCH_SIZE",
+    "INGESTION_QUEUE_SIZE",
+    "INGESTION_PROFILE_SAMPLE_SECONDS",
+    "INGESTION_TRACE_MEMORY",
+    "SWEEP_PROBE_QUERIES",
+    "INGESTION_JOB_WORKERS",
+    "INGESTION_JOB_HISTORY",
+    "INGESTION_JOB_POLL_SECONDS",
+    "EMBEDDING_CACHE_FILE",
+    "EMBEDDING_CACHE_MAX_BYTES",
+    "EMBEDDING_REGISTRY_MAX_BYTES",
+    "EMBEDDING_REGISTRY_IDLE_SECONDS",
+    "EMBEDDING_WARMUP_MODELS",
+    "FAISS_FLAT_MAX_VECTORS",
+    "FAISS_HNSW_MAX_VECTORS",
+    "FAISS_IVF_FLAT_MAX_VECTORS",
+    "FAISS_HNSW_M",
+    "FAISS_HNSW_EF_CONSTRUCTION",
+    "FAISS_HNSW_EF_SEARCH",
+    "FAISS_IVF_NPROBE",
+    "FAISS_TRAIN_SAMPLE_SIZE",
+    "DOCSTORE_HOT_CACHE_SIZE",
+    "DOCSTORE_TEMP_DIR",
+    "EXPERIMENT_CACHE_MAX_ENTRIES",
+    "EXPERIMENT_CACHE_MAX_BYTES",
+    "BM25_K1",
+    "BM25_B",
+    "HYBRID_RRF_K",
+    "HYBRID_FETCH_MULTIPLIER",
+    "RERANK_MODEL",
+    "RERANK_FETCH_MULTIPLIER",
+    "RERANK_MAX_LENGTH",
+    "RERANK_LATENCY_BUDGET_MS",
+    "RERANK_SCORE_CACHE_SIZE",
+    "QUERY_EMBEDDING_CACHE_SIZE",
+    "QUERY_EMBEDDING_CACHE_TTL_SECONDS",
+    "RETRIEVAL_CACHE_SIZE",
+    "RETRIEVAL_CACHE_TTL_SECONDS",
+    "RETRIEVAL_BATCH_SIZE",
+    "RETRIEVAL_MICROBATCH_MAX_SIZE",
+    "RETRIEVAL_MICROBATCH_MAX_WAIT_MS",
+    "ANSWER_CACHE_SIMILARITY_THRESHOLD",
+    "ANSWER_CACHE_SIZE",
+    "ANSWER_CACHE_MAX_BYTES",
+    "ANSWER_CACHE_TTL_SECONDS",
+    "LLM_CACHE_SIZE",
+    "CHAIN_CACHE_SIZE",
+    "CONTEXT_RESERVED_TOKENS",
+    "CONTEXT_CHARS_PER_TOKEN",
+    "CONTEXT_SCORE_STD_CUTOFF",
     "APP_TITLE",
     "APP_ICON",
     "APP_LAYOUT",
@@ -71,6 +207,12 @@ __all__ = [
     "MessageRole",
     "EmbeddingModelType",
     "ExperimentStatus",
+    "IngestionStage",
+    "JobStatus",
+    "JobKind",
+    "IndexType",
+    "RetrievalMode",
+    "ChunkUnit",
     "ConversationAction",
     "TEXT_SEPARATORS",
     "HARDWARE_REQUIREMENTS",
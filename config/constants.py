@@ -50,6 +50,50 @@ class ExperimentStatus(str, Enum):
     LOADED = "loaded"
 
 
+class IngestionStage(str, Enum):
+    """Stages of the document ingestion pipeline."""
+    PARSE = "parse"
+    SPLIT = "split"
+    EMBED = "embed"
+    INDEX = "index"
+
+
+class JobStatus(str, Enum):
+    """States of a background ingestion job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobKind(str, Enum):
+    """Kinds of background ingestion jobs."""
+    BUILD = "build"
+    SWEEP = "sweep"
+
+
+class IndexType(str, Enum):
+    """FAISS index types for experiment vectorstores."""
+    AUTO = "auto"
+    FLAT = "flat"
+    HNSW = "hnsw"
+    IVF_FLAT = "ivf_flat"
+    IVF_PQ = "ivf_pq"
+
+
+class RetrievalMode(str, Enum):
+    """Ways of ranking child chunks for retrieval."""
+    DENSE = "dense"
+    HYBRID = "hybrid"
+
+
+class ChunkUnit(str, Enum):
+    """Units in which chunk sizes are measured."""
+    CHARACTERS = "characters"
+    TOKENS = "tokens"
+
+
 class ConversationAction(str, Enum):
     """Actions for conversation management."""
     NEW = "🆕 New Conversation"
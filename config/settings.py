@@ -4,6 +4,8 @@ TalkNexus Application Settings
 Centralized configuration for URLs, paths, and app-wide settings.
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # =============================================================================
@@ -29,10 +31,12 @@ DATA_DIR = BASE_DIR / "data"
 # Runtime data directories
 CONVERSATIONS_DIR = DATA_DIR / "saved_conversations"
 EXPERIMENTS_DIR = DATA_DIR / "experiments"
+INGESTION_JOBS_DIR = DATA_DIR / "jobs"
+CACHE_DIR = DATA_DIR / "cache"
 
 # Config data files
 OLLAMA_MODELS_FILE = CONFIG_DIR / "data" / "ollama_models.json"
-EMBEDDING_MODELS_FILE = CONFIG_DIR / "data" / "embedding_models.json"
+EMBEDDING_MODELS_FILE = CONFIG_DIR / "data" / "embeddings_models.json"
 
 # Styles
 STYLES_FILE = BASE_DIR / "ui" / "styles" / "main.css"
@@ -44,6 +48,14 @@ STYLES_FILE = BASE_DIR / "ui" / "styles" / "main.css"
 
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_API_TAGS = f"{OLLAMA_BASE_URL}/api/tags"
+# Context window Ollama uses when a model does not set num_ctx
+OLLAMA_DEFAULT_NUM_CTX = 2048
+# Batched embedding through /api/embed
+OLLAMA_EMBED_BATCH_SIZE = 64
+OLLAMA_EMBED_CONCURRENCY = 4
+OLLAMA_EMBED_MAX_RETRIES = 3
+OLLAMA_EMBED_RETRY_BACKOFF_SECONDS = 0.5
+OLLAMA_EMBED_TIMEOUT_SECONDS = 120
 
 
 # =============================================================================
@@ -52,11 +64,171 @@ OLLAMA_API_TAGS = f"{OLLAMA_BASE_URL}/api/tags"
 
 DEFAULT_TEMPERATURE = 0.2
 DEFAULT_CHUNK_SIZE = 300
+DEFAULT_CHUNK_TOKENS = 256
 DEFAULT_TOP_K = 4
 PARENT_CHUNK_MULTIPLIER = 5
 CHUNK_OVERLAP_RATIO = 0.1
 
 
+# =============================================================================
+# PDF Parsing
+# =============================================================================
+
+PDF_PARSE_WORKERS = os.cpu_count() or 1
+PDF_PAGES_PER_TASK = 32
+PDF_PARALLEL_MIN_PAGES = 16
+
+
+# =============================================================================
+# Parsed Text Cache
+# =============================================================================
+
+PARSED_TEXT_CACHE_FILE = CACHE_DIR / "parsed_text.sqlite"
+PARSED_TEXT_CACHE_MAX_BYTES = 512 * 1024 ** 2
+
+
+# =============================================================================
+# Ingestion Pipeline
+# =============================================================================
+
+INGESTION_PAGE_BATCH_SIZE = 16
+INGESTION_CHUNK_BATCH_SIZE = 256
+INGESTION_QUEUE_SIZE = 4
+# Seconds between memory samples of the ingestion profiler
+INGESTION_PROFILE_SAMPLE_SECONDS = 0.05
+# Also trace peak Python allocations; slows ingestion down noticeably
+INGESTION_TRACE_MEMORY = False
+
+
+# =============================================================================
+# Parameter Sweeps
+# =============================================================================
+
+SWEEP_PROBE_QUERIES = 8
+
+
+# =============================================================================
+# Background Ingestion Jobs
+# =============================================================================
+
+INGESTION_JOB_WORKERS = 1
+INGESTION_JOB_HISTORY = 20
+INGESTION_JOB_POLL_SECONDS = 1.0
+
+
+# =============================================================================
+# Embedding Cache
+# =============================================================================
+
+EMBEDDING_CACHE_FILE = CACHE_DIR / "embeddings.sqlite"
+EMBEDDING_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+# =============================================================================
+# Embedding Model Registry
+# =============================================================================
+
+EMBEDDING_REGISTRY_MAX_BYTES = 2 * 1024 ** 3
+EMBEDDING_REGISTRY_IDLE_SECONDS = 600
+EMBEDDING_WARMUP_MODELS = ("bge-small",)
+
+
+# =============================================================================
+# Vector Index
+# =============================================================================
+
+# Automatic index selection by expected number of child chunks
+FAISS_FLAT_MAX_VECTORS = 100_000
+FAISS_HNSW_MAX_VECTORS = 1_000_000
+FAISS_IVF_FLAT_MAX_VECTORS = 5_000_000
+
+FAISS_HNSW_M = 32
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = 64
+FAISS_IVF_NPROBE = 16
+FAISS_TRAIN_SAMPLE_SIZE = 65_536
+
+
+# =============================================================================
+# Document Store
+# =============================================================================
+
+DOCSTORE_HOT_CACHE_SIZE = 1024
+# Build databases are scratch files; keep them out of the data directory
+DOCSTORE_TEMP_DIR = Path(tempfile.gettempdir()) / "talknexus"
+
+
+# =============================================================================
+# Loaded Experiment Cache
+# =============================================================================
+
+EXPERIMENT_CACHE_MAX_ENTRIES = 8
+EXPERIMENT_CACHE_MAX_BYTES = 4 * 1024 ** 3
+
+
+# =============================================================================
+# Hybrid Retrieval
+# =============================================================================
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+HYBRID_RRF_K = 60
+HYBRID_FETCH_MULTIPLIER = 4
+
+
+# =============================================================================
+# Cross-Encoder Reranking
+# =============================================================================
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_MULTIPLIER = 4
+RERANK_MAX_LENGTH = 512
+RERANK_LATENCY_BUDGET_MS = 300
+RERANK_SCORE_CACHE_SIZE = 10_000
+
+
+# =============================================================================
+# Query Caches
+# =============================================================================
+
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = 24 * 60 * 60
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_TTL_SECONDS = 60 * 60
+# Queries embedded and searched together by RAGEngine.retrieve_batch
+RETRIEVAL_BATCH_SIZE = 256
+# Concurrent chat queries coalesced into one batched retrieval
+RETRIEVAL_MICROBATCH_MAX_SIZE = 32
+RETRIEVAL_MICROBATCH_MAX_WAIT_MS = 5
+
+
+# =============================================================================
+# Semantic Answer Cache
+# =============================================================================
+
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_MAX_BYTES = 64 * 1024 ** 2
+ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+# =============================================================================
+# LLM and Chain Reuse
+# =============================================================================
+
+LLM_CACHE_SIZE = 16
+CHAIN_CACHE_SIZE = 64
+
+
+# =============================================================================
+# Prompt Context Packing
+# =============================================================================
+
+CONTEXT_RESERVED_TOKENS = 512
+CONTEXT_CHARS_PER_TOKEN = 4
+CONTEXT_SCORE_STD_CUTOFF = 1.5
+
+
 # =============================================================================
 # UI Configuration
 # =============================================================================
@@ -1,9 +1,21 @@
-from core.ollama_client import OllamaClient
-from core.conversation import ConversationManager
-from core.rag_engine import RAGEngine
+import importlib
+
+# Imported on first access: PDF parsing processes import this package to reach
+# their worker function and must not pull in the whole RAG stack
+_EXPORTS = {
+    "OllamaClient": "core.ollama_client",
+    "ConversationManager": "core.conversation",
+    "RAGEngine": "core.rag_engine",
+}
 
 __all__ = [
     "OllamaClient",
     "ConversationManager",
     "RAGEngine",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
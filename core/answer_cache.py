@@ -0,0 +1,169 @@
+import logging
+import re
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from core.cache import LRUCache
+from core.persistence.embedding_cache import normalize_text
+
+# Tokens holding a digit: part numbers, versions, dates, quantities
+_IDENTIFIER_PATTERN = re.compile(r"[\w./-]*\d[\w./-]*")
+
+
+def _identifiers(question: str) -> frozenset[str]:
+    """Numbers and identifiers of a question, such as "A-113" or "2.5"."""
+    return frozenset(
+        token.strip("./-").lower()
+        for token in _IDENTIFIER_PATTERN.findall(question)
+    )
+
+
+def _answer_bytes(result: dict) -> int:
+    sources = result.get("source_documents") or []
+    text = len(result.get("result", "")) + sum(len(doc.page_content) for doc in sources)
+    return text * 2
+
+
+class SemanticAnswerCache:
+    """
+    Cache of complete RAG answers, matched by question similarity.
+
+    Answers are grouped by namespace, typically the experiment revision and
+    LLM model that produced them. A question whose embedding has a cosine
+    similarity of at least the threshold with a cached question of the same
+    namespace is served the stored answer and sources, provided both
+    questions mention the same numbers and identifiers: embeddings barely
+    separate "part A-113" from "part A-118". Storage, TTL and
+    eviction are handled by an LRUCache; the question embeddings of each
+    namespace are kept alongside it and pruned as entries disappear.
+    """
+
+    def __init__(
+        self,
+        threshold: float = None,
+        max_entries: int = None,
+        max_bytes: int = None,
+        ttl_seconds: float = None,
+    ):
+        """
+        Initialize SemanticAnswerCache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached answers
+            max_bytes: Approximate memory budget for cached answers
+            ttl_seconds: Lifetime of a cached answer
+        """
+        self.threshold = threshold or ANSWER_CACHE_SIMILARITY_THRESHOLD
+        self._answers = LRUCache(
+            max_entries=max_entries or ANSWER_CACHE_SIZE,
+            max_bytes=max_bytes or ANSWER_CACHE_MAX_BYTES,
+            sizeof=_answer_bytes,
+            ttl_seconds=ttl_seconds or ANSWER_CACHE_TTL_SECONDS,
+        )
+        self._vectors: dict[tuple, dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, namespace: tuple, question: str, embedding: list[float]) -> Optional[dict]:
+        """
+        Find the answer to the most similar cached question.
+
+        Args:
+            namespace: Experiment revision and model the answer must come from
+            question: The new question
+            embedding: Embedding of the new question
+
+        Returns:
+            Copy of the cached result with its "similarity", or None
+        """
+        with self._lock:
+            questions = dict(self._vectors.get(namespace, {}))
+
+        if questions:
+            names = list(questions)
+            similarities = np.stack([questions[name] for name in names]) @ _unit(embedding)
+            identifiers = _identifiers(question)
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.threshold:
+                    break
+                if _identifiers(names[i]) != identifiers:
+                    continue
+                result = self._answers.get((namespace, names[i]))
+                if result is None:
+                    self._forget(namespace, names[i])
+                    continue
+                with self._lock:
+                    self.hits += 1
+                logging.debug(f"Answer cache hit with similarity {similarities[i]:.3f}")
+                return {
+                    **result,
+                    "source_documents": list(result.get("source_documents") or []),
+                    "similarity": float(similarities[i]),
+                }
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, namespace: tuple, question: str, embedding: list[float], result: dict) -> None:
+        """Cache the answer to a question."""
+        name = normalize_text(question)
+        entry = {
+            "result": result["result"],
+            "source_documents": list(result.get("source_documents") or []),
+        }
+        self._answers.put((namespace, name), entry)
+        with self._lock:
+            self._vectors.setdefault(namespace, {})[name] = _unit(embedding)
+            if sum(map(len, self._vectors.values())) > (self._answers.max_entries or 0):
+                self._prune()
+
+    def discard_where(self, predicate: Callable[[tuple], bool]) -> None:
+        """Drop every answer whose namespace matches a predicate."""
+        self._answers.discard_where(lambda key: predicate(key[0]))
+        with self._lock:
+            for namespace in [namespace for namespace in self._vectors if predicate(namespace)]:
+                del self._vectors[namespace]
+
+    def _forget(self, namespace: tuple, name: str) -> None:
+        with self._lock:
+            self._vectors.get(namespace, {}).pop(name, None)
+
+    def _prune(self) -> None:
+        """Drop embeddings whose answers were evicted or expired; needs the lock."""
+        for namespace in list(self._vectors):
+            questions = self._vectors[namespace]
+            for name in [name for name in questions if (namespace, name) not in self._answers]:
+                del questions[name]
+            if not questions:
+                del self._vectors[namespace]
+
+    def stats(self) -> dict:
+        """Return semantic hit/miss counters and the underlying storage stats."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "storage": self._answers.stats(),
+        }
+
+
+def _unit(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Process-wide answer cache shared by every RAGEngine
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from config import RETRIEVAL_MICROBATCH_MAX_SIZE, RETRIEVAL_MICROBATCH_MAX_WAIT_MS
+
+
+class _Batch:
+    """Queries collected for one retrieve_batch call."""
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.queries: list[str] = []
+        self.results: Optional[list] = None
+        self.error: Optional[BaseException] = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatchScheduler:
+    """
+    Coalesces concurrent retrieval requests into batched retrievals.
+
+    Requests for the same retriever that arrive while a batch of it is
+    already running are collected for up to the maximum wait, or until the
+    batch is full, and then served by a single ``retrieve_batch`` call that
+    embeds and searches them together. A request arriving while its
+    retriever is idle runs at once, so a single user never waits.
+    """
+
+    def __init__(self, max_batch_size: int = None, max_wait_ms: float = None):
+        """
+        Initialize MicroBatchScheduler.
+
+        Args:
+            max_batch_size: Most queries served by one batched retrieval
+            max_wait_ms: Longest time a request waits for others to join
+        """
+        self.max_batch_size = max_batch_size or RETRIEVAL_MICROBATCH_MAX_SIZE
+        self.max_wait_ms = RETRIEVAL_MICROBATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        self._collecting: dict[int, _Batch] = {}
+        self._running: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+
+    def retrieve(self, retriever, query: str) -> Any:
+        """
+        Retrieve documents for a query, batched with concurrent requests.
+
+        Args:
+            retriever: Retriever providing retrieve_batch
+            query: Query text
+
+        Returns:
+            The retriever's result for the query
+        """
+        key = id(retriever)
+        with self._lock:
+            self.requests += 1
+            batch = self._collecting.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch(retriever)
+                # Only wait for company while the retriever is busy
+                if self._running.get(key):
+                    self._collecting[key] = batch
+                else:
+                    batch.full.set()
+            index = len(batch.queries)
+            batch.queries.append(query)
+            if len(batch.queries) >= self.max_batch_size:
+                self._close(key, batch)
+
+        if leader:
+            batch.full.wait(self.max_wait_ms / 1000)
+            self._run(key, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _close(self, key: int, batch: _Batch) -> None:
+        """Stop collecting queries for a batch; needs the lock."""
+        if self._collecting.get(key) is batch:
+            del self._collecting[key]
+        batch.full.set()
+
+    def _run(self, key: int, batch: _Batch) -> None:
+        with self._lock:
+            self._close(key, batch)
+            self._running[key] = self._running.get(key, 0) + 1
+            self.batches += 1
+
+        start = time.perf_counter()
+        try:
+            batch.results = batch.retriever.retrieve_batch(batch.queries)
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self._running[key] -= 1
+                if not self._running[key]:
+                    del self._running[key]
+            batch.done.set()
+
+        logging.debug(
+            f"Retrieved a batch of {len(batch.queries)} queries in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def stats(self) -> dict:
+        """Return request and batch counts."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            }
+
+
+# Process-wide scheduler shared by every RAGEngine
+retrieval_scheduler = MicroBatchScheduler()
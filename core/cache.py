@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an entry limit and a size budget.
+
+    Entry sizes come from the size passed to ``put`` or from the ``sizeof``
+    callable; least recently used entries are evicted once either limit is
+    exceeded. The most recently inserted entry is always kept, even if it
+    alone exceeds the size budget. Entries can also expire a fixed time
+    after they were stored.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        max_bytes: int = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        ttl_seconds: float = None,
+    ):
+        """
+        Initialize LRUCache.
+
+        Args:
+            max_entries: Maximum number of entries, unlimited if None
+            max_bytes: Maximum total entry size, unlimited if None
+            sizeof: Estimates the size of a value when put is not given one
+            ttl_seconds: Lifetime of an entry, unlimited if None
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int, Optional[float]]] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and mark it as recently used."""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value without updating recency or counters."""
+        with self._lock:
+            entry = self._live_entry(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int = None) -> None:
+        """Insert or replace a value, evicting old entries if needed."""
+        if size is None:
+            size = self.sizeof(value) if self.sizeof else 0
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._size_bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value."""
+        with self._lock:
+            entry = self._remove(key)
+            return default if entry is None else entry[0]
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches a predicate."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def _live_entry(self, key: Hashable) -> Optional[tuple]:
+        """Return an entry unless it is missing or expired, dropping expired ones."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: Hashable) -> Optional[tuple]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size_bytes -= entry[1]
+        return entry
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._size_bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._size_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,224 @@
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+from langchain.chains import RetrievalQA
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.documents import Document
+
+from config import CONTEXT_CHARS_PER_TOKEN, CONTEXT_SCORE_STD_CUTOFF
+from core.persistence.embedding_cache import normalize_text
+from core.retrieval import RELEVANCE_SCORE_KEY
+
+# Shorter shared edges between two passages are treated as coincidence
+_MIN_OVERLAP_CHARS = 20
+
+
+def estimate_tokens(text: str, chars_per_token: float = None) -> int:
+    """Estimate the number of LLM tokens in a text from its length."""
+    return math.ceil(len(text) / (chars_per_token or CONTEXT_CHARS_PER_TOKEN))
+
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of first that is also a prefix of second."""
+    for size in range(min(len(first), len(second)), _MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+@dataclass
+class PackedContext:
+    """Documents selected for a prompt, with what packing left out."""
+
+    documents: list[Document]
+    tokens: int
+    candidate_tokens: int
+    budget: int
+    dropped: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.candidate_tokens - self.tokens
+
+    def report(self) -> dict:
+        """Summarize the packing for the chain output."""
+        return {
+            "documents": len(self.documents),
+            "tokens": self.tokens,
+            "tokens_saved": self.tokens_saved,
+            "budget": self.budget,
+            "dropped": dict(self.dropped),
+        }
+
+
+class ContextAssembler:
+    """
+    Selects retrieved parent documents for a prompt within a token budget.
+
+    Documents are taken in relevance order. Passages repeated by earlier
+    documents of the same page are trimmed or dropped, documents scoring far
+    below the rest of the result list are cut, and the remainder is packed
+    until the budget is spent. Only the most relevant document is truncated
+    if it alone exceeds the budget; others that do not fit are skipped.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        score_std_cutoff: float = None,
+        chars_per_token: float = None,
+    ):
+        """
+        Initialize ContextAssembler.
+
+        Args:
+            max_tokens: Token budget for the documents and the question
+            score_std_cutoff: Standard deviations below the mean score at which documents are cut
+            chars_per_token: Characters per token used to estimate prompt size
+        """
+        self.max_tokens = max_tokens
+        self.score_std_cutoff = score_std_cutoff or CONTEXT_SCORE_STD_CUTOFF
+        self.chars_per_token = chars_per_token or CONTEXT_CHARS_PER_TOKEN
+
+    def assemble(self, documents: list[Document], reserved_tokens: int = 0) -> PackedContext:
+        """
+        Pack documents into the token budget.
+
+        Args:
+            documents: Retrieved documents, most relevant first
+            reserved_tokens: Part of the budget already taken, such as the question
+
+        Returns:
+            The packed documents and packing statistics
+        """
+        budget = max(self.max_tokens - reserved_tokens, 0)
+        candidate_tokens = sum(self._tokens(doc.page_content) for doc in documents)
+        dropped = {"overlap": 0, "score": 0, "budget": 0}
+
+        documents = self._deduplicate(documents, dropped)
+        documents = self._cut_low_scores(documents, dropped)
+
+        packed = []
+        remaining = budget
+        for doc in documents:
+            tokens = self._tokens(doc.page_content)
+            if tokens > remaining and not packed:
+                doc = _with_content(doc, doc.page_content[:int(remaining * self.chars_per_token)])
+                tokens = self._tokens(doc.page_content)
+            if tokens > remaining or not doc.page_content:
+                dropped["budget"] += 1
+                continue
+            packed.append(doc)
+            remaining -= tokens
+
+        context = PackedContext(
+            documents=packed,
+            tokens=budget - remaining,
+            candidate_tokens=candidate_tokens,
+            budget=budget,
+            dropped=dropped,
+        )
+        logging.debug(f"Packed context: {context.report()}")
+        return context
+
+    def _tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def _deduplicate(self, documents: list[Document], dropped: dict[str, int]) -> list[Document]:
+        """Drop repeated documents and trim text shared with more relevant neighbours."""
+        seen = set()
+        kept: list[Document] = []
+        for doc in documents:
+            text = doc.page_content
+            key = normalize_text(text)
+            if key in seen:
+                dropped["overlap"] += 1
+                continue
+
+            for other in kept:
+                if _page_of(other) != _page_of(doc):
+                    continue
+                if text in other.page_content:
+                    text = ""
+                    break
+                text = text[_overlap(other.page_content, text):]
+                shared = _overlap(text, other.page_content)
+                if shared:
+                    text = text[:-shared]
+
+            if not text.strip():
+                dropped["overlap"] += 1
+                continue
+            seen.add(key)
+            kept.append(doc if text == doc.page_content else _with_content(doc, text))
+        return kept
+
+    def _cut_low_scores(self, documents: list[Document], dropped: dict[str, int]) -> list[Document]:
+        """Drop documents scoring far below the mean of the result list."""
+        scores = [doc.metadata.get(RELEVANCE_SCORE_KEY) for doc in documents]
+        if len(documents) < 3 or any(score is None for score in scores):
+            return documents
+
+        scores = np.asarray(scores, dtype=np.float64)
+        cutoff = scores.mean() - self.score_std_cutoff * scores.std()
+        kept = [documents[0]] + [
+            doc for doc, score in zip(documents[1:], scores[1:]) if score >= cutoff
+        ]
+        dropped["score"] += len(documents) - len(kept)
+        return kept
+
+
+def _page_of(doc: Document) -> tuple[Any, Any]:
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _with_content(doc: Document, text: str) -> Document:
+    return Document(id=doc.id, page_content=text, metadata=doc.metadata)
+
+
+class PackedRetrievalQA(RetrievalQA):
+    """
+    RetrievalQA chain that packs retrieved documents into a token budget.
+
+    The output carries the packed documents as ``source_documents`` and a
+    ``context`` report with the tokens used and saved.
+    """
+
+    assembler: ContextAssembler
+    """Selects the documents that go into the prompt."""
+    prompt_tokens: int = 0
+    """Estimated tokens of the prompt template without documents or question."""
+
+    @property
+    def output_keys(self) -> list[str]:
+        return [*super().output_keys, "context"]
+
+    def _call(
+        self,
+        inputs: dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> dict[str, Any]:
+        _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        question = inputs[self.input_key]
+        docs = self._get_docs(question, run_manager=_run_manager)
+
+        reserved = self.prompt_tokens + estimate_tokens(question, self.assembler.chars_per_token)
+        context = self.assembler.assemble(docs, reserved_tokens=reserved)
+        logging.info(
+            f"Prompt context: {context.tokens} tokens from {len(context.documents)} documents, "
+            f"{context.tokens_saved} tokens saved"
+        )
+
+        answer = self.combine_documents_chain.run(
+            input_documents=context.documents,
+            question=question,
+            callbacks=_run_manager.get_child(),
+        )
+
+        outputs = {self.output_key: answer, "context": context.report()}
+        if self.return_source_documents:
+            outputs["source_documents"] = context.documents
+        return outputs
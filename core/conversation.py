@@ -1,9 +1,17 @@
 from langchain.chains import ConversationChain
 from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
 
 from config import OLLAMA_BASE_URL, DEFAULT_TEMPERATURE
+from core.llm_factory import get_llm
+
+CONVERSATION_PROMPT = PromptTemplate(
+    input_variables=["history", "input"],
+    template="""Current conversation:
+            {history}
+            Human: {input}
+            Assistant:""",
+)
 
 
 class ConversationManager:
@@ -40,27 +48,14 @@ class ConversationManager:
         return self._chain
 
     def _create_chain(self) -> ConversationChain:
-        """Create a new conversation chain."""
-        llm = Ollama(
-            model=self.model_name,
-            temperature=self.temperature,
-            base_url=self.base_url,
-        )
-
-        prompt = PromptTemplate(
-            input_variables=["history", "input"],
-            template="""Current conversation:
-            {history}
-            Human: {input}
-            Assistant:""",
-        )
-
+        """Create a new conversation chain around the shared LLM."""
+        llm = get_llm(self.model_name, self.temperature, self.base_url)
         memory = ConversationBufferMemory(return_messages=True)
 
         return ConversationChain(
             llm=llm,
             memory=memory,
-            prompt=prompt,
+            prompt=CONVERSATION_PROMPT,
             verbose=False,
         )
 
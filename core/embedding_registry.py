@@ -0,0 +1,364 @@
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import torch
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    OLLAMA_BASE_URL,
+    EMBEDDING_MODELS_FILE,
+    EMBEDDING_REGISTRY_MAX_BYTES,
+    EMBEDDING_REGISTRY_IDLE_SECONDS,
+    EMBEDDING_WARMUP_MODELS,
+)
+from config.constants import EmbeddingModelType
+from core.ollama_embeddings import OllamaBatchEmbeddings
+
+_WARMUP_TEXT = "warm-up"
+
+
+class EmbeddingModels:
+    """Manages embedding model configurations."""
+
+    _cache: Optional[dict] = None
+
+    @classmethod
+    def load(cls) -> dict:
+        """Load embedding models from JSON configuration."""
+        if cls._cache is None:
+            try:
+                with open(EMBEDDING_MODELS_FILE, "r") as f:
+                    cls._cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                cls._cache = cls._get_defaults()
+        return cls._cache
+
+    @classmethod
+    def _get_defaults(cls) -> dict:
+        """Return default embedding models if config file missing."""
+        return {
+            "bge-small": {
+                "name": "BAAI/bge-small-en-v1.5",
+                "type": "huggingface",
+                "description": "Optimized for retrieval tasks, good balance of speed/quality",
+            },
+            "minilm": {
+                "name": "sentence-transformers/all-MiniLM-L6-v2",
+                "type": "huggingface",
+                "description": "Lightweight, fast, good general purpose model",
+            },
+        }
+
+    @classmethod
+    def get_model_names(cls) -> list[str]:
+        """Get list of available embedding model names."""
+        return list(cls.load().keys())
+
+    @classmethod
+    def get_model_config(cls, name: str) -> dict:
+        """Get configuration for a specific embedding model."""
+        return cls.load().get(name, {})
+
+
+def _model_bytes(embeddings: Embeddings) -> int:
+    """Memory held by a locally loaded model; remote models count as zero."""
+    client = getattr(embeddings, "client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return 0
+    tensors = list(client.parameters()) + list(client.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+@dataclass
+class _LoadedModel:
+    embeddings: Embeddings
+    size_bytes: int
+    last_used: float
+
+
+class EmbeddingRegistry:
+    """
+    Process-wide registry of loaded embedding models.
+
+    Each model from EmbeddingModels is loaded once and shared by every
+    session, for both ingestion and retrieval. Models can be warmed up in
+    the background, and least recently used models that have been idle
+    long enough are unloaded when the registry exceeds its memory budget.
+    """
+
+    def __init__(self, max_bytes: int = None, idle_seconds: float = None):
+        """
+        Initialize EmbeddingRegistry.
+
+        Args:
+            max_bytes: Memory budget for loaded model weights
+            idle_seconds: Minimum idle time before a model may be unloaded
+        """
+        self.max_bytes = max_bytes or EMBEDDING_REGISTRY_MAX_BYTES
+        self.idle_seconds = EMBEDDING_REGISTRY_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.loads = 0
+        self.evictions = 0
+        self._models: dict[str, _LoadedModel] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._warming: set[str] = set()
+        self._tokenizers: dict[str, "ModelTokenizer"] = {}
+
+    def get(self, name: str) -> Embeddings:
+        """
+        Return the embeddings for a model, loading it on first use.
+
+        Args:
+            name: Embedding model name from EmbeddingModels
+
+        Returns:
+            Shared embeddings instance
+        """
+        with self._lock:
+            loaded = self._models.get(name)
+            if loaded is not None:
+                loaded.last_used = time.monotonic()
+                return loaded.embeddings
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Concurrent requests for the same model wait for a single load
+        with load_lock:
+            with self._lock:
+                loaded = self._models.get(name)
+                if loaded is not None:
+                    loaded.last_used = time.monotonic()
+                    return loaded.embeddings
+
+            start = time.perf_counter()
+            embeddings = self._create(name)
+            size_bytes = _model_bytes(embeddings)
+            logging.info(
+                f"Loaded embedding model {name} ({size_bytes / 1024 ** 2:.0f} MB) "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+
+            with self._lock:
+                self._models[name] = _LoadedModel(embeddings, size_bytes, time.monotonic())
+                self.loads += 1
+                self._evict(keep=name)
+            return embeddings
+
+    def _create(self, name: str) -> Embeddings:
+        """Instantiate an embedding model from its configuration."""
+        model_config = EmbeddingModels.get_model_config(name)
+        if not model_config:
+            raise ValueError(f"Unknown embedding model: {name}")
+
+        if model_config.get("type") == EmbeddingModelType.OLLAMA.value:
+            return OllamaBatchEmbeddings(
+                model=model_config["name"],
+                base_url=OLLAMA_BASE_URL,
+            )
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        return HuggingFaceEmbeddings(
+            model_name=model_config["name"],
+            model_kwargs={"device": device},
+            encode_kwargs={"normalize_embeddings": True},
+        )
+
+    def _evict(self, keep: str) -> None:
+        """Unload idle models, least recently used first, until under budget."""
+        total = sum(model.size_bytes for model in self._models.values())
+        if total <= self.max_bytes:
+            return
+
+        now = time.monotonic()
+        for name, model in sorted(self._models.items(), key=lambda item: item[1].last_used):
+            if total <= self.max_bytes:
+                break
+            if name == keep or now - model.last_used < self.idle_seconds:
+                continue
+            del self._models[name]
+            total -= model.size_bytes
+            self.evictions += 1
+            logging.info(f"Unloaded idle embedding model {name}")
+
+        if total > self.max_bytes:
+            logging.warning(
+                f"Embedding models use {total / 1024 ** 2:.0f} MB, above the "
+                f"{self.max_bytes / 1024 ** 2:.0f} MB budget, but none are idle"
+            )
+
+    def warm_up(self, names: Iterable[str] = None) -> None:
+        """
+        Load models and run a first embedding in a background thread.
+
+        Args:
+            names: Embedding model names, defaults to EMBEDDING_WARMUP_MODELS
+        """
+        names = list(EMBEDDING_WARMUP_MODELS if names is None else names)
+        with self._lock:
+            pending = [
+                name for name in names
+                if name and name not in self._models and name not in self._warming
+            ]
+            self._warming.update(pending)
+        if not pending:
+            return
+
+        thread = threading.Thread(
+            target=self._warm_up,
+            args=(pending,),
+            name="embedding-warm-up",
+            daemon=True,
+        )
+        thread.start()
+
+    def _warm_up(self, names: list[str]) -> None:
+        for name in names:
+            try:
+                self.get(name).embed_query(_WARMUP_TEXT)
+            except Exception as e:
+                logging.warning(f"Warm-up of embedding model {name} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._warming.discard(name)
+
+    def tokenizer(self, name: str) -> Optional["ModelTokenizer"]:
+        """
+        Return the tokenizer handle of a model, or None if it has no local tokenizer.
+
+        Ollama models tokenize on the server, so only HuggingFace models
+        have one. Handles are shared, so each model's tokenizer is looked
+        up once.
+
+        Args:
+            name: Embedding model name from EmbeddingModels
+        """
+        model_config = EmbeddingModels.get_model_config(name)
+        if not model_config or model_config.get("type") == EmbeddingModelType.OLLAMA.value:
+            return None
+        with self._lock:
+            tokenizer = self._tokenizers.get(name)
+            if tokenizer is None:
+                tokenizer = self._tokenizers[name] = ModelTokenizer(name, self)
+            return tokenizer
+
+    def stats(self) -> dict:
+        """Return loaded models, their memory use and load/eviction counters."""
+        with self._lock:
+            return {
+                "loaded": sorted(self._models),
+                "size_bytes": sum(model.size_bytes for model in self._models.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+class RegisteredEmbeddings(Embeddings):
+    """
+    Embeddings handle that resolves its model through the registry.
+
+    Vectorstores keep this handle rather than the model itself, so an
+    unloaded model is transparently reloaded on its next use.
+    """
+
+    def __init__(self, name: str, registry: EmbeddingRegistry = None):
+        """
+        Initialize RegisteredEmbeddings.
+
+        Args:
+            name: Embedding model name from EmbeddingModels
+            registry: Registry holding the model, the process-wide one if None
+        """
+        self.name = name
+        self.registry = registry or embedding_registry
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.registry.get(self.name).embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.registry.get(self.name).embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries in one model call, matching embed_query."""
+        model = self.registry.get(self.name)
+        if isinstance(model, OllamaBatchEmbeddings):
+            return model.embed_queries(texts)
+        if isinstance(model, HuggingFaceEmbeddings):
+            # HuggingFaceEmbeddings embeds queries exactly like documents
+            return model.embed_documents(texts)
+        return [model.embed_query(text) for text in texts]
+
+
+class ModelTokenizer:
+    """
+    Fast tokenizer of a registered HuggingFace embedding model.
+
+    The tokenizer is taken from the model when it is first needed. Token
+    positions of many texts are computed in one batched call, so chunk
+    lengths can be measured by offsets instead of tokenizing every piece.
+    """
+
+    def __init__(self, name: str, registry: EmbeddingRegistry):
+        """
+        Initialize ModelTokenizer.
+
+        Args:
+            name: Embedding model name from EmbeddingModels
+            registry: Registry holding the model
+        """
+        self.name = name
+        self.registry = registry
+        self._tokenizer = None
+        self._max_tokens = 0
+
+    def _load(self):
+        if self._tokenizer is None:
+            client = self.registry.get(self.name).client
+            tokenizer = client.tokenizer
+            if not tokenizer.is_fast:
+                raise ValueError(f"Embedding model {self.name} has no fast tokenizer")
+            self._max_tokens = client.max_seq_length - tokenizer.num_special_tokens_to_add()
+            self._tokenizer = tokenizer
+        return self._tokenizer
+
+    @property
+    def max_tokens(self) -> int:
+        """Most text tokens the model embeds without truncation."""
+        self._load()
+        return self._max_tokens
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a text, without special tokens."""
+        return len(self._load()(text, add_special_tokens=False)["input_ids"])
+
+    def token_offsets(self, texts: list[str]) -> list[np.ndarray]:
+        """
+        Character offsets of the tokens of each text.
+
+        Args:
+            texts: Texts to tokenize in one batch
+
+        Returns:
+            A (tokens, 2) array of (start, end) offsets per text, in text order
+        """
+        if not texts:
+            return []
+        encoding = self._load()(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        return [
+            np.array(offsets, dtype=np.int64).reshape(-1, 2)
+            for offsets in encoding["offset_mapping"]
+        ]
+
+
+# Process-wide registry shared by every RAGEngine
+embedding_registry = EmbeddingRegistry()
@@ -0,0 +1,396 @@
+"""
+Offline retrieval quality and latency evaluation of saved RAG experiments.
+
+Usage:
+    python -m core.evaluation QUESTIONS.jsonl --experiment NAME [--llm MODEL]
+
+Each line of the questions file is a JSON object with a "question" and
+optional "gold_pages": 1-based page numbers, or {"source", "page"} objects
+to also match the file name. A top-level "source" applies to plain page
+numbers. Without --llm, answers come from a local mock LLM so the harness
+runs offline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+
+from config import CONTEXT_RESERVED_TOKENS, OLLAMA_DEFAULT_NUM_CTX
+from core.context import ContextAssembler, PackedRetrievalQA, estimate_tokens
+from core.persistence import ExperimentStore
+
+STAGES = ("embedding", "search", "fetch", "first_token", "generation")
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class EvaluationQuestion:
+    """A question with the pages that answer it."""
+
+    question: str
+    gold_pages: set[tuple[Optional[str], int]] = field(default_factory=set)
+
+    @classmethod
+    def from_json(cls, record: dict) -> "EvaluationQuestion":
+        """Parse a line of the questions file; gold pages become 0-based."""
+        default_source = record.get("source")
+        gold_pages = set()
+        for page in record.get("gold_pages", []):
+            if isinstance(page, dict):
+                gold_pages.add((page.get("source", default_source), int(page["page"]) - 1))
+            else:
+                gold_pages.add((default_source, int(page) - 1))
+        return cls(record["question"], gold_pages)
+
+    def matches(self, doc: Document) -> bool:
+        """Whether a retrieved document lies on a gold page."""
+        return any(_on_page(doc, gold_page) for gold_page in self.gold_pages)
+
+    def recall(self, documents: list[Document]) -> float:
+        """Fraction of gold pages covered by the retrieved documents."""
+        found = sum(
+            any(_on_page(doc, gold_page) for doc in documents)
+            for gold_page in self.gold_pages
+        )
+        return found / len(self.gold_pages)
+
+
+def _on_page(doc: Document, gold_page: tuple[Optional[str], int]) -> bool:
+    source, page = gold_page
+    if doc.metadata.get("page") != page:
+        return False
+    return source is None or os.path.basename(str(doc.metadata.get("source", ""))) == source
+
+
+def load_questions(path: str) -> list[EvaluationQuestion]:
+    """Read questions from a JSONL file, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [EvaluationQuestion.from_json(json.loads(line)) for line in f if line.strip()]
+
+
+class StageTimer:
+    """Accumulates the time spent in each stage of one question."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    def reset(self) -> None:
+        self.seconds = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def timed(self, stage: str, function, *args, **kwargs):
+        """Call a function and charge its duration to a stage."""
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+
+class _TimedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, timer: StageTimer):
+        self.embeddings = embeddings
+        self.timer = timer
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.timer.timed("embedding", self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.timer.timed("embedding", self.embeddings.embed_query, text)
+
+
+class _TimedProxy:
+    """Delegates to an object, charging the given methods to a stage."""
+
+    def __init__(self, target: Any, timer: StageTimer, stage: str, methods: Iterable[str]):
+        self._target = target
+        self._timer = timer
+        self._stage = stage
+        self._methods = set(methods)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if name in self._methods:
+            return lambda *args, **kwargs: self._timer.timed(self._stage, attribute, *args, **kwargs)
+        return attribute
+
+
+class _GenerationTimer(BaseCallbackHandler):
+    """Splits LLM time into time to first token and the rest of the generation."""
+
+    def __init__(self, timer: StageTimer):
+        self.timer = timer
+        self.started = None
+        self.first_token = None
+
+    def on_llm_start(self, *args, **kwargs) -> None:
+        self.started = time.perf_counter()
+        self.first_token = None
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def on_llm_end(self, *args, **kwargs) -> None:
+        ended = time.perf_counter()
+        first_token = self.first_token or ended
+        self.timer.add("first_token", first_token - self.started)
+        self.timer.add("generation", ended - first_token)
+
+
+class MockLLM(LLM):
+    """
+    Offline stand-in for an Ollama model.
+
+    Streams the opening words of the prompt back after a fixed delay, with a
+    fixed delay per token, so prompt handling and streaming are exercised
+    without a model server.
+    """
+
+    first_token_ms: float = 50.0
+    """Delay before the first token."""
+    token_ms: float = 5.0
+    """Delay between tokens."""
+    max_tokens: int = 64
+    """Number of tokens generated."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock"
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        time.sleep(self.first_token_ms / 1000)
+        tokens = []
+        for word in prompt.split()[:self.max_tokens]:
+            if tokens:
+                time.sleep(self.token_ms / 1000)
+            tokens.append(f"{word} ")
+            if run_manager:
+                run_manager.on_llm_new_token(tokens[-1])
+        return "".join(tokens)
+
+
+@dataclass
+class EvaluationReport:
+    """Retrieval quality and per-stage latency of an evaluation run."""
+
+    questions: int
+    judged: int
+    k: int
+    recall_at_k: Optional[float]
+    mrr: Optional[float]
+    latency_ms: dict[str, dict[str, float]]
+    prompt_tokens_saved: int
+
+    def to_dict(self) -> dict:
+        return {
+            "questions": self.questions,
+            "judged": self.judged,
+            "k": self.k,
+            "recall_at_k": self.recall_at_k,
+            "mrr": self.mrr,
+            "latency_ms": self.latency_ms,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+        }
+
+    def format(self) -> str:
+        """Render the report as a plain text table."""
+        lines = [
+            f"Questions: {self.questions} ({self.judged} with gold pages)",
+            f"Recall@{self.k}: {_format_metric(self.recall_at_k)}",
+            f"MRR: {_format_metric(self.mrr)}",
+            f"Prompt tokens saved: {self.prompt_tokens_saved}",
+            "",
+            f"{'Stage':<12}" + "".join(f"{name:>10}" for name in ("mean", *(f"p{p}" for p in PERCENTILES))),
+        ]
+        for stage, values in self.latency_ms.items():
+            lines.append(
+                f"{stage:<12}" + "".join(f"{values[name]:>10.1f}" for name in ("mean", *(f"p{p}" for p in PERCENTILES)))
+            )
+        return "\n".join(lines)
+
+
+def _format_metric(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.3f}"
+
+
+def _latency_summary(samples: list[dict[str, float]]) -> dict[str, dict[str, float]]:
+    summary = {}
+    for stage in (*STAGES, "total"):
+        values = np.array([sample.get(stage, 0.0) for sample in samples]) * 1000
+        summary[stage] = {
+            "mean": float(values.mean()) if len(values) else 0.0,
+            **{
+                f"p{p}": float(np.percentile(values, p)) if len(values) else 0.0
+                for p in PERCENTILES
+            },
+        }
+    return summary
+
+
+class RAGEvaluator:
+    """
+    Runs questions against a saved experiment and measures every stage.
+
+    The experiment is loaded privately and its embeddings, FAISS index,
+    BM25 index and docstores are wrapped with timers, so the regular
+    retrieval code is measured without changes. Answers go through the
+    same prompt and context packing as the chat page.
+    """
+
+    def __init__(
+        self,
+        store: ExperimentStore,
+        experiment_name: str,
+        llm: LLM = None,
+        context_tokens: int = None,
+    ):
+        """
+        Initialize RAGEvaluator.
+
+        Args:
+            store: Store holding the experiment
+            experiment_name: Name of the saved experiment
+            llm: LLM answering the questions, a MockLLM if None
+            context_tokens: Context window of the LLM
+        """
+        # Imported here since the engine module pulls in the whole RAG stack
+        from core.rag_engine import QA_PROMPT
+
+        retriever, config = store.load(experiment_name)
+        if not retriever or not config:
+            raise ValueError(f"Experiment not found: {experiment_name}")
+
+        self.config = config
+        self.timer = StageTimer()
+        self.retriever = self._instrument(retriever)
+        self.k = retriever.search_kwargs.get("k", 4)
+
+        max_tokens = (context_tokens or OLLAMA_DEFAULT_NUM_CTX) - CONTEXT_RESERVED_TOKENS
+        self.chain = PackedRetrievalQA.from_chain_type(
+            llm=llm or MockLLM(),
+            chain_type="stuff",
+            retriever=self.retriever,
+            return_source_documents=True,
+            chain_type_kwargs={"prompt": QA_PROMPT},
+            assembler=ContextAssembler(max_tokens=max_tokens),
+            prompt_tokens=estimate_tokens(QA_PROMPT.template),
+        )
+
+    def _instrument(self, retriever):
+        """Wrap the components of a privately loaded retriever with stage timers."""
+        vectorstore = retriever.vectorstore
+        if getattr(vectorstore.embedding_function, "query_cache", None) is not None:
+            # Repeated questions should be measured cold, not served from memory
+            vectorstore.embedding_function.query_cache = None
+        vectorstore.embedding_function = _TimedEmbeddings(vectorstore.embedding_function, self.timer)
+        vectorstore.index = _TimedProxy(vectorstore.index, self.timer, "search", ["search"])
+        vectorstore.docstore = _TimedProxy(
+            vectorstore.docstore, self.timer, "fetch", ["search", "mget", "mget_by_positions"]
+        )
+        update = {"docstore": _TimedProxy(retriever.docstore, self.timer, "fetch", ["mget"])}
+        if getattr(retriever, "sparse_index", None) is not None:
+            update["sparse_index"] = _TimedProxy(retriever.sparse_index, self.timer, "search", ["search"])
+        return retriever.model_copy(update=update)
+
+    def run(self, questions: list[EvaluationQuestion]) -> EvaluationReport:
+        """Answer every question and summarize quality and latency."""
+        samples = []
+        recalls = []
+        reciprocal_ranks = []
+        tokens_saved = 0
+        for item in questions:
+            documents, context, seconds = self._answer(item.question)
+            samples.append(seconds)
+            tokens_saved += context["tokens_saved"]
+
+            if item.gold_pages:
+                recalls.append(item.recall(documents))
+                rank = next((i + 1 for i, doc in enumerate(documents) if item.matches(doc)), None)
+                reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+        return EvaluationReport(
+            questions=len(questions),
+            judged=len(recalls),
+            k=self.k,
+            recall_at_k=float(np.mean(recalls)) if recalls else None,
+            mrr=float(np.mean(reciprocal_ranks)) if reciprocal_ranks else None,
+            latency_ms=_latency_summary(samples),
+            prompt_tokens_saved=tokens_saved,
+        )
+
+    def _answer(self, question: str) -> tuple[list[Document], dict, dict[str, float]]:
+        """Retrieve and answer one question, returning per-stage seconds."""
+        self.timer.reset()
+        start = time.perf_counter()
+
+        documents = self.retriever.invoke(question)
+        reserved = self.chain.prompt_tokens + estimate_tokens(question)
+        context = self.chain.assembler.assemble(documents, reserved_tokens=reserved)
+        self.chain.combine_documents_chain.invoke(
+            {"input_documents": context.documents, "question": question},
+            config={"callbacks": [_GenerationTimer(self.timer)]},
+        )
+
+        seconds = dict(self.timer.seconds)
+        seconds["total"] = time.perf_counter() - start
+        return documents, context.report(), seconds
+
+
+def main(argv: list[str] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Evaluate a saved RAG experiment.")
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("--experiment", required=True, help="Name of the saved experiment")
+    parser.add_argument("--llm", help="Ollama model to answer with instead of the mock LLM")
+    parser.add_argument("--context-tokens", type=int, help="Context window of the LLM")
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    llm = None
+    context_tokens = args.context_tokens
+    if args.llm:
+        from core.llm_factory import get_llm
+        from core.ollama_client import get_context_length
+
+        llm = get_llm(args.llm)
+        context_tokens = context_tokens or get_context_length(args.llm)
+
+    # Build the store through the engine so embeddings come from the shared registry
+    from core.rag_engine import RAGEngine
+
+    evaluator = RAGEvaluator(
+        RAGEngine().experiment_store,
+        args.experiment,
+        llm=llm,
+        context_tokens=context_tokens,
+    )
+    report = evaluator.run(load_questions(args.questions))
+    print(report.format())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+import queue
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from config import (
+    INGESTION_PAGE_BATCH_SIZE,
+    INGESTION_CHUNK_BATCH_SIZE,
+    INGESTION_QUEUE_SIZE,
+)
+from config.constants import IngestionStage, IndexType
+from core.pdf_parser import PDFParser
+from core.profiling import PipelineProfiler
+from core.sparse_index import SparseIndex, SparseIndexBuilder
+from core.splitters import split_documents_hierarchy
+from core.vector_index import FaissIndexBuilder
+
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+class IngestionAborted(Exception):
+    """Raised inside a pipeline stage once another stage has failed."""
+
+
+class IngestionCancelled(Exception):
+    """Raised by IngestionPipeline.run when its cancel event was set."""
+
+
+@dataclass
+class StageProgress:
+    """Progress counters for a single pipeline stage."""
+
+    completed: int = 0
+    total: Optional[int] = None
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of an ingestion run."""
+
+    vectorstore: Optional[FAISS]
+    pages: int
+    parents: int
+    children: int
+    index_stats: dict = field(default_factory=dict)
+    sparse_index: Optional[SparseIndex] = None
+    profile: dict = field(default_factory=dict)
+
+
+class IngestionPipeline:
+    """
+    Streaming PDF ingestion pipeline.
+
+    Parsing, parent/child splitting, embedding and FAISS insertion run as
+    concurrent stages that hand fixed-size batches to each other through
+    bounded queues, so memory stays flat regardless of corpus size and
+    embedding overlaps with parsing. The index stage runs on the calling
+    thread, which is also the only thread that invokes the progress callback.
+    Every run is profiled per stage; see PipelineProfiler.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        parent_splitter,
+        child_splitter,
+        docstore,
+        parser: PDFParser = None,
+        id_key: str = "doc_id",
+        page_batch_size: int = None,
+        chunk_batch_size: int = None,
+        queue_size: int = None,
+        progress_callback: Optional[Callable[[dict[str, StageProgress]], None]] = None,
+        child_docstore=None,
+        build_sparse_index: bool = False,
+        cancel_event: Optional[threading.Event] = None,
+        split_documents: Optional[Callable[[list[Document]], list]] = None,
+    ):
+        """
+        Initialize IngestionPipeline.
+
+        Args:
+            embeddings: LangChain embeddings used for child chunks
+            parent_splitter: Splitter producing parent documents
+            child_splitter: Splitter producing child chunks from each parent
+            docstore: Key-value store receiving parent documents
+            parser: PDF parser used by the parse stage
+            id_key: Child metadata key linking a chunk to its parent
+            page_batch_size: Pages handed from parsing to splitting at once
+            chunk_batch_size: Child chunks per embedding batch
+            queue_size: Maximum batches buffered between two stages
+            progress_callback: Called with a snapshot of every stage's progress
+            child_docstore: Docstore for chunks of a newly created vectorstore
+            build_sparse_index: Also build a BM25 index over the child chunks
+            cancel_event: Stops the run between batches once set
+            split_documents: Splits a page batch into (parent, children)
+                pairs, split_documents_hierarchy with the splitters if None
+        """
+        self.embeddings = embeddings
+        self.parent_splitter = parent_splitter
+        self.child_splitter = child_splitter
+        self.docstore = docstore
+        self.parser = parser or PDFParser()
+        self.id_key = id_key
+        self.page_batch_size = page_batch_size or INGESTION_PAGE_BATCH_SIZE
+        self.chunk_batch_size = chunk_batch_size or INGESTION_CHUNK_BATCH_SIZE
+        self.queue_size = queue_size or INGESTION_QUEUE_SIZE
+        self.progress_callback = progress_callback
+        self.child_docstore = child_docstore
+        self.build_sparse_index = build_sparse_index
+        self.cancel_event = cancel_event
+        self.split_documents = split_documents
+
+    def run(
+        self,
+        pdf_files: list,
+        vectorstore: Optional[FAISS] = None,
+        index_type: str = IndexType.AUTO.value,
+    ) -> IngestionResult:
+        """
+        Ingest PDF files into a vectorstore and the parent docstore.
+
+        Args:
+            pdf_files: Uploaded PDF file objects
+            vectorstore: Existing vectorstore to extend, or None to create one
+            index_type: Index type used when a new vectorstore is created
+
+        Returns:
+            IngestionResult with the populated vectorstore and counts
+        """
+        self._abort = threading.Event()
+        self._errors: list[BaseException] = []
+        self._lock = threading.Lock()
+        self._progress = {stage.value: StageProgress() for stage in IngestionStage}
+        self._last_snapshot = None
+        self._parent_count = 0
+        self._child_count = 0
+        self._profiler = PipelineProfiler([stage.value for stage in IngestionStage])
+        sparse_builder = SparseIndexBuilder() if self.build_sparse_index else None
+
+        pages_queue = queue.Queue(maxsize=self.queue_size)
+        chunks_queue = queue.Queue(maxsize=self.queue_size)
+        vectors_queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            (IngestionStage.PARSE, self._parse_stage, (pdf_files, pages_queue)),
+            (IngestionStage.SPLIT, self._split_stage, (pages_queue, chunks_queue)),
+            (IngestionStage.EMBED, self._embed_stage, (chunks_queue, vectors_queue)),
+        ]
+        threads = [
+            threading.Thread(
+                target=self._guard,
+                args=(stage, target, *args),
+                name=f"ingestion-{stage.value}",
+                daemon=True,
+            )
+            for stage, target, args in stages
+        ]
+        self._profiler.start()
+        for thread in threads:
+            thread.start()
+
+        builder = FaissIndexBuilder(
+            self.embeddings,
+            index_type=index_type,
+            vectorstore=vectorstore,
+            expected_vectors=self._expected_children,
+            docstore=self.child_docstore,
+        )
+
+        sparse_index = None
+        try:
+            with self._profiler.stage(IngestionStage.INDEX.value):
+                self._index_stage(vectors_queue, builder, sparse_builder)
+                sparse_index = sparse_builder.build() if sparse_builder else None
+        except IngestionAborted:
+            pass
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            self._profiler.stop()
+
+        if self._errors:
+            raise self._errors[0]
+        if self._cancelled():
+            raise IngestionCancelled("Ingestion was cancelled")
+
+        pages = self._progress[IngestionStage.PARSE.value].completed
+        children = self._progress[IngestionStage.INDEX.value].completed
+        return IngestionResult(
+            vectorstore=builder.vectorstore,
+            pages=pages,
+            parents=self._parent_count,
+            children=children,
+            index_stats=builder.stats(),
+            sparse_index=sparse_index,
+            profile=self._profiler.report(pages, children),
+        )
+
+    # -------------------------------------------------------------------------
+    # Stages
+    # -------------------------------------------------------------------------
+
+    def _parse_stage(self, pdf_files: list, out_queue: queue.Queue) -> None:
+        """Extract pages and hand them over in fixed-size batches."""
+
+        def on_start(total_pages: int) -> None:
+            self._set_total(IngestionStage.PARSE, total_pages)
+            self._set_total(IngestionStage.SPLIT, total_pages)
+
+        def on_worker_cpu(seconds: float) -> None:
+            self._profiler.add_cpu(IngestionStage.PARSE.value, seconds)
+
+        pages = self.parser.iter_pages(pdf_files, on_start=on_start, on_worker_cpu=on_worker_cpu)
+        batch = []
+        try:
+            for page in pages:
+                batch.append(Document(page_content=page.text, metadata=page.metadata))
+                self._advance(IngestionStage.PARSE, 1)
+                if len(batch) >= self.page_batch_size:
+                    self._put(out_queue, batch)
+                    batch = []
+        finally:
+            pages.close()
+
+        if batch:
+            self._put(out_queue, batch)
+        self._put(out_queue, _DONE)
+
+    def _split_stage(self, in_queue: queue.Queue, out_queue: queue.Queue) -> None:
+        """Split pages into parents and children, storing parents as they go."""
+        batch = []
+        children = 0
+
+        while (pages := self._get(in_queue)) is not _DONE:
+            if self.split_documents is not None:
+                hierarchy = self.split_documents(pages)
+            else:
+                hierarchy = split_documents_hierarchy(pages, self.parent_splitter, self.child_splitter)
+            parents = [parent for parent, _ in hierarchy]
+            parent_ids = [str(uuid.uuid4()) for _ in parents]
+
+            for parent_id, (_, parent_children) in zip(parent_ids, hierarchy):
+                for child in parent_children:
+                    child.metadata[self.id_key] = parent_id
+                    batch.append(child)
+                    children += 1
+                    if len(batch) >= self.chunk_batch_size:
+                        self._put(out_queue, self._analyzed(batch))
+                        batch = []
+
+            self.docstore.mset(list(zip(parent_ids, parents)))
+            with self._lock:
+                self._parent_count += len(parents)
+                self._child_count = children
+            self._advance(IngestionStage.SPLIT, len(pages))
+
+        if batch:
+            self._put(out_queue, self._analyzed(batch))
+        self._set_total(IngestionStage.EMBED, children)
+        self._set_total(IngestionStage.INDEX, children)
+        self._put(out_queue, _DONE)
+
+    def _embed_stage(self, in_queue: queue.Queue, out_queue: queue.Queue) -> None:
+        """Embed child chunks one batch at a time."""
+        while (item := self._get(in_queue)) is not _DONE:
+            chunks, term_counts = item
+            vectors = np.asarray(
+                self.embeddings.embed_documents([chunk.page_content for chunk in chunks]),
+                dtype=np.float32,
+            )
+            self._advance(IngestionStage.EMBED, len(chunks))
+            self._put(out_queue, (chunks, vectors, term_counts))
+
+        self._put(out_queue, _DONE)
+
+    def _index_stage(
+        self,
+        in_queue: queue.Queue,
+        builder: FaissIndexBuilder,
+        sparse_builder: Optional[SparseIndexBuilder],
+    ) -> None:
+        """Insert embedded chunks into FAISS on the calling thread."""
+        while (item := self._get(in_queue, on_idle=self._report)) is not _DONE:
+            chunks, vectors, term_counts = item
+            builder.add(vectors, chunks)
+            # Same order as FAISS, so sparse document numbers are FAISS positions
+            if sparse_builder is not None:
+                sparse_builder.add(term_counts)
+            self._advance(IngestionStage.INDEX, len(chunks))
+            self._report()
+
+        builder.finish()
+        self._report()
+
+    def _analyzed(self, chunks: list[Document]) -> tuple[list[Document], Optional[list]]:
+        """Pair a chunk batch with its BM25 term counts when a sparse index is built."""
+        if not self.build_sparse_index:
+            return chunks, None
+        return chunks, [SparseIndexBuilder.analyze(chunk.page_content) for chunk in chunks]
+
+    def _expected_children(self) -> int:
+        """Extrapolate the final child chunk count from splitting so far."""
+        with self._lock:
+            split = self._progress[IngestionStage.SPLIT.value]
+            embedded = self._progress[IngestionStage.EMBED.value]
+            if embedded.total is not None:
+                return embedded.total
+            if not split.completed or not split.total:
+                return 0
+            return int(self._child_count * split.total / split.completed)
+
+    # -------------------------------------------------------------------------
+    # Plumbing
+    # -------------------------------------------------------------------------
+
+    def _guard(self, stage: IngestionStage, target: Callable, *args) -> None:
+        """Run a stage thread, recording its failure and aborting the others."""
+        try:
+            with self._profiler.stage(stage.value):
+                target(*args)
+        except IngestionAborted:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+
+    def _cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def _put(self, out_queue: queue.Queue, item) -> None:
+        """Put into a bounded queue, giving up once the pipeline aborts."""
+        while True:
+            if self._cancelled():
+                self._abort.set()
+            if self._abort.is_set():
+                raise IngestionAborted()
+            try:
+                with self._profiler.waiting():
+                    out_queue.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, in_queue: queue.Queue, on_idle: Callable[[], None] = None):
+        """Get from a queue, giving up once the pipeline aborts."""
+        while True:
+            if self._cancelled():
+                self._abort.set()
+            if self._abort.is_set():
+                raise IngestionAborted()
+            try:
+                with self._profiler.waiting():
+                    return in_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if on_idle:
+                    on_idle()
+
+    def _advance(self, stage: IngestionStage, amount: int) -> None:
+        with self._lock:
+            self._progress[stage.value].completed += amount
+        self._profiler.add_items(stage.value, amount)
+
+    def _set_total(self, stage: IngestionStage, total: int) -> None:
+        with self._lock:
+            self._progress[stage.value].total = total
+
+    def _report(self) -> None:
+        """Send a progress snapshot to the callback if anything changed."""
+        if not self.progress_callback:
+            return
+        with self._lock:
+            snapshot = {
+                stage: StageProgress(progress.completed, progress.total)
+                for stage, progress in self._progress.items()
+            }
+        if snapshot != self._last_snapshot:
+            self._last_snapshot = snapshot
+            self.progress_callback(snapshot)
@@ -0,0 +1,341 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, Optional
+
+from config import INGESTION_JOBS_DIR, INGESTION_JOB_HISTORY, INGESTION_JOB_WORKERS
+from config.constants import JobKind, JobStatus
+from core.ingestion import IngestionCancelled, StageProgress
+from core.sweep import ParameterSweep
+
+# Seconds between writes of a running job's progress to disk
+_PROGRESS_SAVE_INTERVAL = 1.0
+
+
+@dataclass
+class IngestionJob:
+    """Status of a background ingestion job."""
+
+    job_id: str
+    experiment_name: str
+    created_at: float
+    kind: str = JobKind.BUILD.value
+    status: str = JobStatus.QUEUED.value
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: dict[str, dict] = field(default_factory=dict)
+    pages: int = 0
+    error: Optional[str] = None
+    # Summary rows of a sweep's experiments
+    results: list[dict] = field(default_factory=list)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+# Work run by a job: (job, engine, cancel event, stage progress callback)
+JobWork = Callable[[IngestionJob, object, threading.Event, Callable], None]
+
+
+def _copy_upload(pdf_file, index: int) -> io.BytesIO:
+    """Copy an uploaded file so the job does not depend on the session that submitted it."""
+    if hasattr(pdf_file, "getvalue"):
+        data = pdf_file.getvalue()
+    else:
+        pdf_file.seek(0)
+        data = pdf_file.read()
+    copy = io.BytesIO(data)
+    copy.name = getattr(pdf_file, "name", None) or f"document_{index}.pdf"
+    return copy
+
+
+def _snapshot(job: IngestionJob) -> IngestionJob:
+    """Copy a job, including the progress its worker keeps updating."""
+    return replace(
+        job,
+        progress={stage: dict(counters) for stage, counters in job.progress.items()},
+        results=list(job.results),
+    )
+
+
+class IngestionJobManager:
+    """
+    Runs experiment builds and parameter sweeps in a background worker pool.
+
+    Jobs belong to the process rather than to a Streamlit session, so a
+    build keeps running through reruns and page reloads, and any session
+    can follow or cancel it by job id. At most max_workers jobs run at
+    once, leaving CPU for interactive chat; further jobs wait in the queue.
+    A sweep is a single job that builds its experiments one at a time.
+    Job status and per-stage progress are persisted as JSON, and jobs left
+    unfinished by a restart are reported as failed.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str = None,
+        max_workers: int = None,
+        engine_factory: Callable[[], object] = None,
+    ):
+        """
+        Initialize IngestionJobManager.
+
+        Args:
+            jobs_dir: Directory holding one status file per job
+            max_workers: Jobs running at the same time
+            engine_factory: Creates the RAGEngine that builds and saves experiments
+        """
+        self.jobs_dir = jobs_dir or str(INGESTION_JOBS_DIR)
+        self.max_workers = max_workers or INGESTION_JOB_WORKERS
+        self.engine_factory = engine_factory
+        self._engine = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: dict[str, IngestionJob] = {}
+        self._futures: dict[str, Future] = {}
+        self._cancel_events: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def submit(self, experiment_name: str, pdf_files: list, config: dict, **build_kwargs) -> str:
+        """
+        Queue a build of an experiment.
+
+        Args:
+            experiment_name: Name the experiment is saved under
+            pdf_files: Uploaded PDF file objects, copied before returning
+            config: Experiment configuration saved with the build statistics
+            **build_kwargs: RAGEngine.build_retriever arguments
+
+        Returns:
+            Job id
+        """
+        files = [_copy_upload(pdf_file, index) for index, pdf_file in enumerate(pdf_files)]
+
+        def build(job: IngestionJob, engine, cancel_event: threading.Event, on_progress) -> None:
+            retriever, build_info, result = engine.build_retriever(
+                files,
+                progress_callback=on_progress,
+                cancel_event=cancel_event,
+                **build_kwargs,
+            )
+            if cancel_event.is_set():
+                raise IngestionCancelled("Ingestion was cancelled")
+            if not engine.save_retriever(job.experiment_name, retriever, {**config, **build_info}):
+                raise RuntimeError("Failed to save experiment configuration")
+            with self._lock:
+                job.pages = result.pages
+
+        return self._enqueue(experiment_name, JobKind.BUILD, build)
+
+    def submit_sweep(self, experiment_prefix: str, pdf_files: list, **sweep_kwargs) -> str:
+        """
+        Queue a parameter sweep.
+
+        Args:
+            experiment_prefix: Prefix of the saved experiment names
+            pdf_files: Uploaded PDF file objects, copied before returning
+            **sweep_kwargs: ParameterSweep.run arguments
+
+        Returns:
+            Job id
+        """
+        files = [_copy_upload(pdf_file, index) for index, pdf_file in enumerate(pdf_files)]
+
+        def sweep(job: IngestionJob, engine, cancel_event: threading.Event, on_progress) -> None:
+            def on_variants(finished: int, total: int) -> None:
+                with self._lock:
+                    job.progress["variants"] = {"completed": finished, "total": total}
+                    self._save(job)
+
+            results = ParameterSweep(engine).run(
+                files,
+                experiment_prefix,
+                progress_callback=on_variants,
+                build_progress_callback=on_progress,
+                cancel_event=cancel_event,
+                **sweep_kwargs,
+            )
+            with self._lock:
+                job.results = [result.row() for result in results]
+
+        return self._enqueue(experiment_prefix, JobKind.SWEEP, sweep)
+
+    def _enqueue(self, experiment_name: str, kind: JobKind, work: JobWork) -> str:
+        """Record a new job and queue its work."""
+        job = IngestionJob(uuid.uuid4().hex, experiment_name, created_at=time.time(), kind=kind.value)
+
+        with self._lock:
+            self._load()
+            self._jobs[job.job_id] = job
+            self._cancel_events[job.job_id] = threading.Event()
+            self._save(job)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="ingestion-job",
+                )
+            self._futures[job.job_id] = self._executor.submit(self._run, job.job_id, work)
+
+        logging.info(f"Queued ingestion {kind.value} job {job.job_id} for {experiment_name}")
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Return a snapshot of a job's status, or None if unknown."""
+        with self._lock:
+            self._load()
+            job = self._jobs.get(job_id)
+            return _snapshot(job) if job else None
+
+    def list_jobs(self) -> list[IngestionJob]:
+        """Return snapshots of all known jobs, newest first."""
+        with self._lock:
+            self._load()
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+            return [_snapshot(job) for job in jobs]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Queued jobs never start; running jobs stop after their current batch.
+
+        Returns:
+            Whether the job was still active
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            self._cancel_events[job_id].set()
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                self._finish(job, JobStatus.CANCELLED)
+        logging.info(f"Cancelling ingestion job {job_id}")
+        return True
+
+    def _run(self, job_id: str, work: JobWork) -> None:
+        """Worker: run a job's work and record the outcome."""
+        cancel_event = self._cancel_events[job_id]
+        with self._lock:
+            job = self._jobs[job_id]
+            if cancel_event.is_set():
+                self._finish(job, JobStatus.CANCELLED)
+                return
+            job.status = JobStatus.RUNNING.value
+            job.started_at = time.time()
+            self._save(job)
+
+        last_save = 0.0
+
+        def on_progress(progress: dict[str, StageProgress]) -> None:
+            nonlocal last_save
+            with self._lock:
+                job.progress.update({stage: asdict(value) for stage, value in progress.items()})
+                if time.monotonic() - last_save >= _PROGRESS_SAVE_INTERVAL:
+                    last_save = time.monotonic()
+                    self._save(job)
+
+        try:
+            work(job, self._get_engine(), cancel_event, on_progress)
+            if cancel_event.is_set():
+                raise IngestionCancelled("Ingestion was cancelled")
+            with self._lock:
+                self._finish(job, JobStatus.COMPLETED)
+            logging.info(
+                f"Ingestion {job.kind} job {job_id} for {job.experiment_name} "
+                f"finished in {job.elapsed_seconds:.1f}s"
+            )
+        except IngestionCancelled:
+            with self._lock:
+                self._finish(job, JobStatus.CANCELLED)
+            logging.info(f"Ingestion job {job_id} cancelled")
+        except Exception as e:
+            logging.error(f"Ingestion job {job_id} failed: {str(e)}")
+            with self._lock:
+                self._finish(job, JobStatus.FAILED, error=str(e))
+
+    def _get_engine(self):
+        """Create the engine shared by all jobs on first use."""
+        with self._lock:
+            if self._engine is None:
+                if self.engine_factory is None:
+                    # Imported here since the engine module pulls in the whole RAG stack
+                    from core.rag_engine import RAGEngine
+                    self.engine_factory = RAGEngine
+                self._engine = self.engine_factory()
+            return self._engine
+
+    def _finish(self, job: IngestionJob, status: JobStatus, error: str = None) -> None:
+        """Record a final status; needs the lock."""
+        job.status = status.value
+        job.finished_at = time.time()
+        job.error = error
+        self._futures.pop(job.job_id, None)
+        self._cancel_events.pop(job.job_id, None)
+        self._save(job)
+        self._prune()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: IngestionJob) -> None:
+        """Write a job's status file atomically; needs the lock."""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        path = self._path(job.job_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(temp_path, path)
+
+    def _load(self) -> None:
+        """Read jobs of earlier runs once; needs the lock."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.jobs_dir):
+            return
+
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, filename), "r", encoding="utf-8") as f:
+                    job = IngestionJob(**json.load(f))
+            except (OSError, TypeError, ValueError) as e:
+                logging.warning(f"Skipping unreadable ingestion job file {filename}: {str(e)}")
+                continue
+            self._jobs[job.job_id] = job
+            if job.active:
+                # Its uploaded files were only held in memory by the previous process
+                self._finish(job, JobStatus.FAILED, error="Interrupted by an application restart")
+        self._prune()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit; needs the lock."""
+        finished = sorted(
+            (job for job in self._jobs.values() if not job.active),
+            key=lambda job: job.created_at,
+        )
+        for job in finished[:max(len(finished) - INGESTION_JOB_HISTORY, 0)]:
+            del self._jobs[job.job_id]
+            try:
+                os.remove(self._path(job.job_id))
+            except OSError:
+                pass
+
+
+# Process-wide job manager, outliving Streamlit reruns and sessions
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,42 @@
+from langchain_community.llms import Ollama
+
+from config import OLLAMA_BASE_URL, DEFAULT_TEMPERATURE, LLM_CACHE_SIZE, CHAIN_CACHE_SIZE
+from core.cache import LRUCache
+
+# Process-wide LLM clients keyed by (model, temperature, base URL)
+_llms = LRUCache(max_entries=LLM_CACHE_SIZE)
+
+# Process-wide retrieval chains keyed by (experiment revision, model, temperature, rerank)
+chain_cache = LRUCache(max_entries=CHAIN_CACHE_SIZE)
+
+
+def get_llm(model_name: str, temperature: float = None, base_url: str = None) -> Ollama:
+    """
+    Return a shared Ollama LLM for a model and temperature.
+
+    The LLM carries no callbacks; pass them per request through the
+    ``config`` argument of ``invoke`` so concurrent sessions can share it.
+
+    Args:
+        model_name: Name of the Ollama model
+        temperature: LLM temperature setting
+        base_url: Ollama API base URL
+
+    Returns:
+        Cached Ollama LLM
+    """
+    key = (
+        model_name,
+        DEFAULT_TEMPERATURE if temperature is None else temperature,
+        base_url or OLLAMA_BASE_URL,
+    )
+    llm = _llms.get(key)
+    if llm is None:
+        llm = Ollama(model=key[0], temperature=key[1], base_url=key[2])
+        _llms.put(key, llm)
+    return llm
+
+
+def llm_cache_stats() -> dict:
+    """Return hit/miss counters of the shared LLM clients."""
+    return _llms.stats()
@@ -7,6 +7,7 @@ import requests
 from config import (
     OLLAMA_API_TAGS,
     OLLAMA_MODELS_FILE,
+    OLLAMA_DEFAULT_NUM_CTX,
     MODEL_FILTER_KEYWORDS,
 )
 
@@ -24,6 +25,8 @@ class OllamaClient:
         from config import OLLAMA_BASE_URL
         self.base_url = base_url or OLLAMA_BASE_URL
         self.api_tags = f"{self.base_url}/api/tags"
+        self.api_show = f"{self.base_url}/api/show"
+        self._context_lengths: dict[str, int] = {}
 
     def is_running(self) -> bool:
         """Check if Ollama API is running and accessible."""
@@ -81,6 +84,42 @@ class OllamaClient:
         except Exception:
             return None
 
+    def get_context_length(self, model_name: str) -> int:
+        """
+        Get the context window Ollama runs a model with.
+
+        This is the model's num_ctx parameter if it sets one, otherwise the
+        server default capped at the model's trained context length.
+
+        Returns:
+            Context length in tokens, the server default if it cannot be determined
+        """
+        if model_name in self._context_lengths:
+            return self._context_lengths[model_name]
+
+        try:
+            response = requests.post(self.api_show, json={"model": model_name}, timeout=10)
+            if response.status_code != 200:
+                return OLLAMA_DEFAULT_NUM_CTX
+            details = response.json()
+        except (requests.RequestException, ValueError):
+            return OLLAMA_DEFAULT_NUM_CTX
+
+        context_length = OLLAMA_DEFAULT_NUM_CTX
+        trained = [
+            value for key, value in (details.get("model_info") or {}).items()
+            if key.endswith(".context_length")
+        ]
+        if trained:
+            context_length = min(context_length, int(trained[0]))
+        for line in (details.get("parameters") or "").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "num_ctx" and parts[1].isdigit():
+                context_length = int(parts[1])
+
+        self._context_lengths[model_name] = context_length
+        return context_length
+
     def pull_model(self, model_name: str) -> tuple[bool, str]:
         """
         Download a model from Ollama.
@@ -187,4 +226,9 @@ def get_ollama_models() -> list[str]:
 
 def get_model_info(model_name: str) -> Optional[str]:
     """Convenience function to get model information."""
-    return ollama_client.get_model_info(model_name)
\ No newline at end of file
+    return ollama_client.get_model_info(model_name)
+
+
+def get_context_length(model_name: str) -> int:
+    """Convenience function to get the context window of a model."""
+    return ollama_client.get_context_length(model_name)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from langchain_core.embeddings import Embeddings
+from requests.adapters import HTTPAdapter
+
+from config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_EMBED_BATCH_SIZE,
+    OLLAMA_EMBED_CONCURRENCY,
+    OLLAMA_EMBED_MAX_RETRIES,
+    OLLAMA_EMBED_RETRY_BACKOFF_SECONDS,
+    OLLAMA_EMBED_TIMEOUT_SECONDS,
+)
+
+# Responses worth retrying; other client errors (such as an unknown model) are not
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaEmbeddingError(RuntimeError):
+    """Raised when a batch cannot be embedded by the Ollama server."""
+
+
+class OllamaBatchEmbeddings(Embeddings):
+    """
+    Ollama embeddings sent in batches through the /api/embed endpoint.
+
+    Texts are split into fixed-size batches, several of which are in flight
+    at once over a pool of keep-alive connections. A failed batch is retried
+    on its own with exponential backoff, so a transient server error costs
+    one batch rather than the whole ingestion. Texts get the same document
+    and query prefixes as LangChain's OllamaEmbeddings.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = None,
+        batch_size: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        timeout: float = None,
+        embed_instruction: str = "passage: ",
+        query_instruction: str = "query: ",
+    ):
+        """
+        Initialize OllamaBatchEmbeddings.
+
+        Args:
+            model: Ollama embedding model name
+            base_url: Ollama API base URL
+            batch_size: Texts per /api/embed request
+            max_concurrency: Requests in flight at once
+            max_retries: Retries of a failed batch before giving up
+            timeout: Seconds to wait for a single request
+            embed_instruction: Prefix of document texts
+            query_instruction: Prefix of query texts
+        """
+        self.model = model
+        self.api_embed = f"{base_url or OLLAMA_BASE_URL}/api/embed"
+        self.batch_size = batch_size or OLLAMA_EMBED_BATCH_SIZE
+        self.max_concurrency = max_concurrency or OLLAMA_EMBED_CONCURRENCY
+        self.max_retries = OLLAMA_EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or OLLAMA_EMBED_TIMEOUT_SECONDS
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+        self.retries = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed([f"{self.embed_instruction}{text}" for text in texts])
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([f"{self.query_instruction}{text}"])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries in batched requests, matching embed_query."""
+        return self._embed([f"{self.query_instruction}{text}" for text in texts])
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in order, running their batches concurrently."""
+        if not texts:
+            return []
+        batches = [
+            texts[start:start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        vectors = []
+        for batch_vectors in self._get_executor().map(self._embed_batch, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the pool sending batches on first use; shared by all callers."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="ollama-embed",
+                )
+            return self._executor
+
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        """Send one batch, retrying transient failures with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    self.api_embed,
+                    json={"model": self.model, "input": batch},
+                    timeout=self.timeout,
+                )
+                if response.status_code != 200:
+                    message = f"Ollama returned {response.status_code}: {response.text[:200]}"
+                    if response.status_code not in _RETRYABLE_STATUS:
+                        raise OllamaEmbeddingError(message)
+                    raise requests.HTTPError(message, response=response)
+
+                embeddings = response.json()["embeddings"]
+                if len(embeddings) != len(batch):
+                    raise ValueError(
+                        f"Expected {len(batch)} embeddings, got {len(embeddings)}"
+                    )
+                return embeddings
+
+            except (requests.RequestException, ValueError, KeyError) as e:
+                if attempt == self.max_retries:
+                    raise OllamaEmbeddingError(
+                        f"Embedding a batch of {len(batch)} texts with {self.model} "
+                        f"failed after {attempt + 1} attempts: {str(e)}"
+                    ) from e
+                delay = OLLAMA_EMBED_RETRY_BACKOFF_SECONDS * 2 ** attempt
+                logging.warning(
+                    f"Embedding batch with {self.model} failed ({str(e)}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
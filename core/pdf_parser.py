@@ -0,0 +1,342 @@
+import hashlib
+import io
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context, shared_memory
+from typing import Callable, Iterator, Optional
+
+import pypdf
+from pypdf import PdfReader
+
+from config import (
+    PDF_PARSE_WORKERS,
+    PDF_PAGES_PER_TASK,
+    PDF_PARALLEL_MIN_PAGES,
+)
+
+# Part of the parsed text cache key; change it whenever extraction changes
+EXTRACTOR_VERSION = f"pypdf-{pypdf.__version__}"
+
+
+@dataclass(frozen=True)
+class ParsedPage:
+    """Text extracted from a single PDF page."""
+
+    source: str
+    page: int
+    total_pages: int
+    text: str
+
+    @property
+    def metadata(self) -> dict:
+        """Metadata in the shape produced by LangChain's PyPDFLoader."""
+        return {
+            "source": self.source,
+            "page": self.page,
+            "total_pages": self.total_pages,
+        }
+
+
+class _BufferStream(io.RawIOBase):
+    """Read-only, seekable stream over a buffer that never copies it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence value: {whence}")
+        self._pos = max(0, position)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def _open_reader(buffer) -> tuple[PdfReader, io.BufferedReader]:
+    """Open a PdfReader directly over an in-memory buffer."""
+    stream = io.BufferedReader(_BufferStream(buffer))
+    return PdfReader(stream), stream
+
+
+def _count_pages(buffer) -> int:
+    """Count pages without extracting any text."""
+    reader, stream = _open_reader(buffer)
+    try:
+        return len(reader.pages)
+    finally:
+        del reader
+        stream.close()
+
+
+def _extract_text(buffer, start: int, stop: int) -> list[str]:
+    """Extract the text of pages ``[start, stop)`` from a PDF buffer."""
+    reader, stream = _open_reader(buffer)
+    try:
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+    finally:
+        del reader
+        stream.close()
+
+
+def _extract_shared_range(
+    shm_name: str, size: int, start: int, stop: int
+) -> tuple[list[str], float]:
+    """Pool worker: extract a page range from a PDF held in shared memory, with its CPU time."""
+    cpu_start = time.process_time()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        with shm.buf[:size] as view:
+            texts = _extract_text(view, start, stop)
+    finally:
+        shm.close()
+    return texts, time.process_time() - cpu_start
+
+
+def _file_buffer(pdf_file) -> memoryview:
+    """Return a zero-copy view of an uploaded file's contents; release it when done."""
+    if hasattr(pdf_file, "getbuffer"):
+        return pdf_file.getbuffer()
+    if isinstance(pdf_file, (bytes, bytearray, memoryview)):
+        return memoryview(pdf_file)
+    pdf_file.seek(0)
+    return memoryview(pdf_file.read())
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Get the process-wide parsing pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=get_context("spawn"),
+            )
+        return _executor
+
+
+class PDFParser:
+    """
+    Parallel PDF text extractor.
+
+    Reads uploaded files straight from their in-memory buffers and spreads
+    extraction over a process pool, by file and by page range for large
+    documents. With a parsed text cache, files whose contents were parsed
+    before are not parsed again. Pages are always yielded in upload order.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = None,
+        pages_per_task: int = None,
+        parallel_min_pages: int = None,
+        cache=None,
+    ):
+        """
+        Initialize PDFParser.
+
+        Args:
+            max_workers: Number of parsing processes
+            pages_per_task: Maximum pages extracted by a single pool task
+            parallel_min_pages: Page count below which parsing stays in-process
+            cache: ParsedTextCache for extracted text, none if None
+        """
+        self.max_workers = max_workers or PDF_PARSE_WORKERS
+        self.pages_per_task = pages_per_task or PDF_PAGES_PER_TASK
+        self.parallel_min_pages = parallel_min_pages or PDF_PARALLEL_MIN_PAGES
+        self.cache = cache
+
+    def parse(self, pdf_files: list) -> list[ParsedPage]:
+        """Parse all files and return their pages in order."""
+        return list(self.iter_pages(pdf_files))
+
+    def iter_pages(
+        self,
+        pdf_files: list,
+        on_start: Optional[Callable[[int], None]] = None,
+        on_worker_cpu: Optional[Callable[[float], None]] = None,
+    ) -> Iterator[ParsedPage]:
+        """
+        Yield parsed pages in upload order.
+
+        Args:
+            pdf_files: Uploaded PDF file objects, bytes or buffers
+            on_start: Optional callback receiving the total page count
+                before the first page is extracted
+            on_worker_cpu: Optional callback receiving the CPU seconds of
+                every page range extracted in the process pool
+
+        Yields:
+            ParsedPage for every page of every file
+        """
+        files = []
+        buffers = []
+        try:
+            for index, pdf_file in enumerate(pdf_files):
+                name = getattr(pdf_file, "name", None) or f"document_{index}.pdf"
+                buffer = _file_buffer(pdf_file)
+                buffers.append(buffer)
+                file_hash = texts = None
+                if self.cache is not None:
+                    file_hash = hashlib.sha256(buffer).hexdigest()
+                    texts = self.cache.get(file_hash, EXTRACTOR_VERSION)
+                page_count = _count_pages(buffer) if texts is None else len(texts)
+                files.append((name, buffer, page_count, file_hash, texts))
+
+            total_pages = sum(page_count for _, _, page_count, _, _ in files)
+            if on_start:
+                on_start(total_pages)
+
+            cached = sum(1 for *_, texts in files if texts is not None)
+            if cached:
+                logging.info(f"Reusing parsed text of {cached} of {len(files)} files")
+
+            # Parse runs of uncached files together, in upload order around cached ones
+            uncached = []
+            for name, buffer, page_count, file_hash, texts in files:
+                if texts is None:
+                    uncached.append((name, buffer, page_count, file_hash))
+                    continue
+                buffer.release()
+                yield from self._parse(uncached, on_worker_cpu)
+                uncached = []
+                for page, text in enumerate(texts):
+                    yield ParsedPage(name, page, page_count, text)
+            yield from self._parse(uncached, on_worker_cpu)
+        finally:
+            # An exported buffer keeps a BytesIO from being resized or closed
+            for buffer in buffers:
+                buffer.release()
+
+    def _parse(self, files: list, on_worker_cpu=None) -> Iterator[ParsedPage]:
+        """Extract the pages of files, storing each file's text in the cache once complete."""
+        if not files:
+            return
+
+        parse_files = [(name, buffer, page_count) for name, buffer, page_count, _ in files]
+        total_pages = sum(page_count for _, _, page_count in parse_files)
+        if self.max_workers <= 1 or total_pages < self.parallel_min_pages:
+            pages = self._iter_sequential(parse_files)
+        else:
+            pages = self._iter_parallel(parse_files, on_worker_cpu)
+
+        if self.cache is None:
+            yield from pages
+            return
+
+        pending = deque(files)
+        texts = []
+
+        def store_complete() -> None:
+            nonlocal texts
+            while pending and len(texts) == pending[0][2]:
+                _, _, _, file_hash = pending.popleft()
+                self.cache.put(file_hash, EXTRACTOR_VERSION, texts)
+                texts = []
+
+        store_complete()
+        for page in pages:
+            texts.append(page.text)
+            store_complete()
+            yield page
+
+    @staticmethod
+    def _iter_sequential(files: list) -> Iterator[ParsedPage]:
+        """Extract pages in-process, one file at a time."""
+        for name, buffer, page_count in files:
+            texts = _extract_text(buffer, 0, page_count)
+            buffer.release()
+            for page, text in enumerate(texts):
+                yield ParsedPage(name, page, page_count, text)
+
+    def _iter_parallel(self, files: list, on_worker_cpu=None) -> Iterator[ParsedPage]:
+        """Extract pages in a process pool, keeping a bounded window in flight."""
+        executor = _get_executor(self.max_workers)
+        segments = {}
+        pending = deque()
+        window = self.max_workers * 2
+
+        def tasks():
+            for name, buffer, page_count in files:
+                if page_count == 0:
+                    continue
+                size = len(buffer)
+                shm = shared_memory.SharedMemory(create=True, size=size)
+                shm.buf[:size] = buffer
+                buffer.release()
+                ranges = range(0, page_count, self.pages_per_task)
+                segments[shm.name] = [shm, len(ranges)]
+                for start in ranges:
+                    yield name, page_count, shm.name, size, start
+
+        def release(shm_name: str) -> None:
+            segment = segments[shm_name]
+            segment[1] -= 1
+            if segment[1] == 0:
+                segment[0].close()
+                segment[0].unlink()
+                del segments[shm_name]
+
+        try:
+            for name, page_count, shm_name, size, start in tasks():
+                stop = min(start + self.pages_per_task, page_count)
+                future = executor.submit(_extract_shared_range, shm_name, size, start, stop)
+                pending.append((name, page_count, shm_name, start, future))
+
+                while len(pending) >= window:
+                    yield from self._drain_one(pending, release, on_worker_cpu)
+
+            while pending:
+                yield from self._drain_one(pending, release, on_worker_cpu)
+        finally:
+            for _, _, _, _, future in pending:
+                future.cancel()
+            for shm, _ in segments.values():
+                shm.close()
+                shm.unlink()
+
+    @staticmethod
+    def _drain_one(pending: deque, release, on_worker_cpu=None) -> Iterator[ParsedPage]:
+        """Wait for the oldest task and yield its pages."""
+        name, page_count, shm_name, start, future = pending[0]
+        texts, cpu_seconds = future.result()
+        pending.popleft()
+        release(shm_name)
+        if on_worker_cpu:
+            on_worker_cpu(cpu_seconds)
+        for offset, text in enumerate(texts):
+            yield ParsedPage(name, start + offset, page_count, text)
@@ -1,7 +1,24 @@
 from core.persistence.conversation_store import ConversationStore
 from core.persistence.experiment_store import ExperimentStore
+from core.persistence.embedding_cache import EmbeddingCache, CachedEmbeddings
+from core.persistence.experiment_cache import LoadedExperimentCache
+from core.persistence.parsed_text_cache import ParsedTextCache
+from core.persistence.docstore import (
+    DocumentDatabase,
+    SQLiteParentStore,
+    SQLiteChildDocstore,
+    remove_stale_temp_databases,
+)
 
 __all__ = [
     "ConversationStore",
     "ExperimentStore",
+    "EmbeddingCache",
+    "CachedEmbeddings",
+    "LoadedExperimentCache",
+    "ParsedTextCache",
+    "DocumentDatabase",
+    "SQLiteParentStore",
+    "SQLiteChildDocstore",
+    "remove_stale_temp_databases",
 ]
\ No newline at end of file
@@ -0,0 +1,543 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Iterator, Optional, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+from config import DOCSTORE_HOT_CACHE_SIZE, DOCSTORE_TEMP_DIR
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+# Temporary build databases are named after the process that owns them
+_TEMP_PREFIX = "docstore-"
+
+_stale_removed = False
+_stale_lock = threading.Lock()
+
+
+def _batched(items: Sequence, size: int = _SQL_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _like_prefix(prefix: str) -> str:
+    """LIKE pattern matching the prefix literally; use with ESCAPE '\\'."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _basename(path: Optional[str]) -> str:
+    """SQL function matching chunks by file name, whatever path they were stored with."""
+    return os.path.basename(path) if path else ""
+
+
+def _remove_file(path: str) -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Exists but belongs to someone else, or cannot be checked on this platform
+        return True
+    return True
+
+
+def remove_stale_temp_databases() -> int:
+    """
+    Delete temporary build databases left behind by processes that are gone.
+
+    Build databases are only removed when garbage collected, which never
+    happens if the process is killed. Runs once per process.
+
+    Returns:
+        Number of databases removed
+    """
+    global _stale_removed
+    with _stale_lock:
+        if _stale_removed:
+            return 0
+        _stale_removed = True
+
+    removed = 0
+    for path in glob.glob(os.path.join(DOCSTORE_TEMP_DIR, f"{_TEMP_PREFIX}*.sqlite")):
+        try:
+            pid = int(os.path.basename(path)[len(_TEMP_PREFIX):].split("-", 1)[0])
+        except ValueError:
+            continue
+        if not _process_alive(pid):
+            _remove_file(path)
+            removed += 1
+    if removed:
+        logging.info(f"Removed {removed} stale temporary document databases")
+    return removed
+
+
+class DocumentDatabase:
+    """
+    SQLite file holding the parent and child documents of an experiment.
+
+    Databases opened without a path live in a temporary file in the system
+    temp directory that is removed once the database is garbage collected,
+    or at the next startup if the process dies first; saved experiments are
+    opened from their own file, read-only unless they are being updated.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        read_only: bool = False,
+        hot_cache_size: int = None,
+    ):
+        """
+        Initialize DocumentDatabase.
+
+        Args:
+            path: SQLite file, or None for a temporary build database
+            read_only: Open an existing file without write access
+            hot_cache_size: Documents kept in each in-memory LRU
+        """
+        if path is None:
+            remove_stale_temp_databases()
+            os.makedirs(DOCSTORE_TEMP_DIR, exist_ok=True)
+            fd, path = tempfile.mkstemp(
+                suffix=".sqlite",
+                prefix=f"{_TEMP_PREFIX}{os.getpid()}-",
+                dir=DOCSTORE_TEMP_DIR,
+            )
+            os.close(fd)
+            self._finalizer = weakref.finalize(self, _remove_file, path)
+
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.RLock()
+
+        if read_only:
+            self._conn = sqlite3.connect(
+                f"file:{path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+        self._conn.create_function("basename", 1, _basename, deterministic=True)
+
+        cache_size = hot_cache_size or DOCSTORE_HOT_CACHE_SIZE
+        self.parents = SQLiteParentStore(self, cache_size)
+        self.children = SQLiteChildDocstore(self, cache_size)
+
+    def _create_tables(self) -> None:
+        with self._lock:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS parents (
+                    id TEXT PRIMARY KEY,
+                    page_content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS children (
+                    id TEXT PRIMARY KEY,
+                    position INTEGER,
+                    page_content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_children_position ON children (position);
+                """
+            )
+            self._conn.commit()
+
+    def execute(self, sql: str, parameters: Sequence = ()) -> list:
+        """Run a query and return all rows."""
+        with self._lock:
+            return self._conn.execute(sql, parameters).fetchall()
+
+    def iterate(
+        self,
+        sql: str,
+        parameters: Sequence = (),
+        batch_size: int = _SQL_BATCH_SIZE,
+    ) -> Iterator[tuple]:
+        """Run a query and yield its rows, fetching a batch at a time."""
+        with self._lock:
+            cursor = self._conn.execute(sql, parameters)
+        try:
+            while True:
+                # Lock per batch, so other threads can use the connection in between
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            with self._lock:
+                cursor.close()
+
+    def write(self, sql: str, rows: Sequence[Sequence]) -> None:
+        """Run a write statement for many rows in one transaction."""
+        with self._lock:
+            self._conn.executemany(sql, rows)
+            self._conn.commit()
+
+    def backup(self, path: str) -> None:
+        """Copy the database into a new file that can be opened read-only."""
+        with self._lock:
+            target = sqlite3.connect(path)
+            try:
+                self._conn.backup(target)
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+
+    def copy(self) -> "DocumentDatabase":
+        """Create a writable temporary copy of this database."""
+        database = DocumentDatabase(hot_cache_size=self.parents._cache_size)
+        with self._lock:
+            self._conn.backup(database._conn)
+        return database
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.read_only:
+                self._conn.execute("PRAGMA journal_mode=DELETE")
+            self._conn.close()
+
+    def size_bytes(self) -> int:
+        """Size of the database file on disk."""
+        return os.path.getsize(self.path)
+
+
+class _HotCache:
+    """Small thread-safe LRU of recently fetched documents."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Document] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Document]:
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+            return document
+
+    def put(self, key: str, document: Document) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Sequence[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class _DocumentTable:
+    """Shared fetch logic for the parent and child tables."""
+
+    table = ""
+
+    def __init__(self, database: DocumentDatabase, cache_size: int):
+        self.database = database
+        self._cache_size = cache_size
+        self._hot = _HotCache(cache_size)
+
+    def _to_document(self, key: str, page_content: str, metadata: str) -> Document:
+        return Document(id=key, page_content=page_content, metadata=json.loads(metadata))
+
+    def mget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        """Fetch documents with one query per batch of missing keys."""
+        found = {}
+        missing = []
+        for key in keys:
+            document = self._hot.get(key)
+            if document is not None:
+                found[key] = document
+            else:
+                missing.append(key)
+
+        for batch in _batched(list(dict.fromkeys(missing))):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.database.execute(
+                f"SELECT id, page_content, metadata FROM {self.table} "
+                f"WHERE id IN ({placeholders})",
+                batch,
+            )
+            for key, page_content, metadata in rows:
+                document = self._to_document(key, page_content, metadata)
+                found[key] = document
+                self._hot.put(key, document)
+
+        return [found.get(key) for key in keys]
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        keys = list(keys)
+        self._hot.discard(keys)
+        self.database.write(
+            f"DELETE FROM {self.table} WHERE id = ?",
+            [(key,) for key in keys],
+        )
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        if prefix:
+            rows = self.database.iterate(
+                f"SELECT id FROM {self.table} WHERE id LIKE ? ESCAPE '\\'",
+                (_like_prefix(prefix),),
+            )
+        else:
+            rows = self.database.iterate(f"SELECT id FROM {self.table}")
+        for (key,) in rows:
+            yield key
+
+    def __len__(self) -> int:
+        return self.database.execute(f"SELECT COUNT(*) FROM {self.table}")[0][0]
+
+
+class SQLiteParentStore(_DocumentTable, BaseStore[str, Document]):
+    """Disk-backed parent document store for ParentDocumentRetriever."""
+
+    table = "parents"
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, Document]]) -> None:
+        rows = [
+            (key, document.page_content, json.dumps(document.metadata))
+            for key, document in key_value_pairs
+        ]
+        self._hot.discard([row[0] for row in rows])
+        self.database.write(
+            "INSERT OR REPLACE INTO parents (id, page_content, metadata) VALUES (?, ?, ?)",
+            rows,
+        )
+
+
+class SQLiteChildDocstore(_DocumentTable, Docstore, AddableMixin):
+    """
+    Disk-backed child chunk docstore for LangChain's FAISS vectorstore.
+
+    The FAISS position of every chunk is stored alongside it, and
+    ``index_mapping`` exposes those positions as the vectorstore's
+    ``index_to_docstore_id`` without holding them in memory.
+    """
+
+    table = "children"
+
+    def __init__(self, database: DocumentDatabase, cache_size: int):
+        super().__init__(database, cache_size)
+        self.index_mapping = SQLiteIndexMapping(database)
+
+    def search(self, search: str):
+        document = self.mget([search])[0]
+        return document if document is not None else f"ID {search} not found."
+
+    def add(self, texts: dict[str, Document]) -> None:
+        self.database.write(
+            "INSERT OR REPLACE INTO children (id, position, page_content, metadata) "
+            "VALUES (?, NULL, ?, ?)",
+            [
+                (key, document.page_content, json.dumps(document.metadata))
+                for key, document in texts.items()
+            ],
+        )
+
+    def add_at_positions(self, start: int, ids: Sequence[str], documents: Sequence[Document]) -> None:
+        """Insert chunks together with their consecutive FAISS positions."""
+        self.database.write(
+            "INSERT OR REPLACE INTO children (id, position, page_content, metadata) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (key, start + offset, document.page_content, json.dumps(document.metadata))
+                for offset, (key, document) in enumerate(zip(ids, documents))
+            ],
+        )
+
+    def delete(self, ids: list) -> None:
+        self.mdelete(ids)
+
+    def mget_by_positions(self, positions: Sequence[int]) -> dict[int, Document]:
+        """Fetch chunks by FAISS position in batched queries."""
+        found = {}
+        for batch in _batched(list(dict.fromkeys(int(p) for p in positions if p >= 0))):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.database.execute(
+                f"SELECT position, id, page_content, metadata FROM children "
+                f"WHERE position IN ({placeholders})",
+                batch,
+            )
+            for position, key, page_content, metadata in rows:
+                found[position] = self._to_document(key, page_content, metadata)
+        return found
+
+    def items(self) -> Iterator[tuple[str, Document]]:
+        """Iterate over all chunks in FAISS position order."""
+        rows = self.database.iterate(
+            "SELECT id, page_content, metadata FROM children ORDER BY position"
+        )
+        for key, page_content, metadata in rows:
+            yield key, self._to_document(key, page_content, metadata)
+
+    def find_sources(
+        self,
+        file_names: Sequence[str],
+        id_key: str,
+    ) -> list[tuple[Optional[int], str, Optional[str]]]:
+        """
+        Look up the chunks of the given files without reading any others.
+
+        Args:
+            file_names: File names the chunks were ingested from
+            id_key: Metadata key holding a chunk's parent id
+
+        Returns:
+            (FAISS position, chunk id, parent id) of every matching chunk
+        """
+        rows = []
+        for batch in _batched(list(dict.fromkeys(file_names))):
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(self.database.execute(
+                "SELECT position, id, json_extract(metadata, ?) FROM children "
+                f"WHERE basename(json_extract(metadata, '$.source')) IN ({placeholders})",
+                [f'$."{id_key}"', *batch],
+            ))
+        return rows
+
+    def sources(self) -> set[str]:
+        """File names of all chunks."""
+        return {
+            name
+            for (name,) in self.database.iterate(
+                "SELECT DISTINCT basename(json_extract(metadata, '$.source')) FROM children"
+            )
+        }
+
+    def compact_positions(self) -> None:
+        """Renumber positions consecutively after chunks were deleted."""
+        with self.database._lock:
+            self.database._conn.execute(
+                """
+                WITH ranked AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY position) - 1 AS new_position
+                    FROM children
+                )
+                UPDATE children SET position = ranked.new_position
+                FROM ranked WHERE children.id = ranked.id
+                """
+            )
+            self.database._conn.commit()
+
+
+class SQLiteIndexMapping(MutableMapping):
+    """FAISS position to chunk id mapping backed by the children table."""
+
+    def __init__(self, database: DocumentDatabase):
+        self.database = database
+
+    def __getitem__(self, position: int) -> str:
+        rows = self.database.execute(
+            "SELECT id FROM children WHERE position = ?",
+            (int(position),),
+        )
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def __setitem__(self, position: int, key: str) -> None:
+        self.database.write(
+            "UPDATE children SET position = ? WHERE id = ?",
+            [(int(position), key)],
+        )
+
+    def update(self, other=(), **kwargs) -> None:
+        pairs = other.items() if hasattr(other, "items") else other
+        self.database.write(
+            "UPDATE children SET position = ? WHERE id = ?",
+            [(int(position), key) for position, key in pairs],
+        )
+
+    def __delitem__(self, position: int) -> None:
+        self.database.write(
+            "UPDATE children SET position = NULL WHERE position = ?",
+            [(int(position),)],
+        )
+
+    def __iter__(self) -> Iterator[int]:
+        rows = self.database.iterate(
+            "SELECT position FROM children WHERE position IS NOT NULL ORDER BY position"
+        )
+        for (position,) in rows:
+            yield position
+
+    def __len__(self) -> int:
+        return self.database.execute(
+            "SELECT COUNT(*) FROM children WHERE position IS NOT NULL"
+        )[0][0]
+
+    def items(self) -> Iterator[tuple[int, str]]:
+        """Iterate over (position, chunk id) pairs in position order."""
+        return self.database.iterate(
+            "SELECT position, id FROM children WHERE position IS NOT NULL ORDER BY position"
+        )
+
+    def values(self) -> Iterator[str]:
+        return (key for _, key in self.items())
+
+
+def iter_docstore(docstore) -> Iterator[tuple[str, Document]]:
+    """Iterate over the documents of any child docstore."""
+    if isinstance(docstore, SQLiteChildDocstore):
+        return docstore.items()
+    return iter(docstore._dict.items())
+
+
+def docstore_sources(docstore) -> set[str]:
+    """File names of the chunks in any child docstore."""
+    if isinstance(docstore, SQLiteChildDocstore):
+        return docstore.sources()
+    return {
+        _basename(document.metadata.get("source"))
+        for _, document in iter_docstore(docstore)
+    }
+
+
+def find_source_chunks(
+    vectorstore,
+    file_names: Sequence[str],
+    id_key: str,
+) -> list[tuple[Optional[int], str, Optional[str]]]:
+    """(FAISS position, chunk id, parent id) of the chunks of the given files in a vectorstore."""
+    docstore = vectorstore.docstore
+    if isinstance(docstore, SQLiteChildDocstore):
+        return docstore.find_sources(file_names, id_key)
+
+    names = set(file_names)
+    positions = {key: position for position, key in vectorstore.index_to_docstore_id.items()}
+    return [
+        (positions.get(key), key, document.metadata.get(id_key))
+        for key, document in iter_docstore(docstore)
+        if _basename(document.metadata.get("source")) in names
+    ]
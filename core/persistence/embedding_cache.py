@@ -0,0 +1,314 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_CACHE_FILE,
+    EMBEDDING_CACHE_MAX_BYTES,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
+from core.cache import LRUCache
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+# Evict down to this fraction of the budget so eviction is not run on every insert
+_EVICTION_TARGET_RATIO = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """Normalize chunk text so whitespace-only differences share a cache key."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    """Content hash of normalized chunk text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache.
+
+    Vectors are stored in SQLite keyed by (embedding model name, hash of the
+    normalized chunk text), so identical chunks are embedded once no matter
+    which experiment they belong to. The cache is kept under a byte budget by
+    evicting least recently used entries.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        Initialize EmbeddingCache.
+
+        Args:
+            path: SQLite database file for cached vectors
+            max_bytes: Size budget for stored vectors
+        """
+        self.path = path or str(EMBEDDING_CACHE_FILE)
+        self.max_bytes = max_bytes or EMBEDDING_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access "
+                "ON embeddings (last_access)"
+            )
+            conn.commit()
+            self._size_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, np.ndarray]:
+        """
+        Look up cached vectors.
+
+        Args:
+            model: Embedding model name
+            hashes: Text hashes to look up
+
+        Returns:
+            Mapping of text hash to vector for every cache hit
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), _SQL_BATCH_SIZE):
+                batch = unique[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                if rows:
+                    conn.execute(
+                        f"UPDATE embeddings SET last_access = ? "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        (now, model, *batch),
+                    )
+            conn.commit()
+
+            self.hits += sum(1 for key in hashes if key in found)
+            self.misses += sum(1 for key in hashes if key not in found)
+
+        return found
+
+    def put_many(self, model: str, vectors: dict[str, np.ndarray]) -> None:
+        """
+        Store vectors and evict old entries if the budget is exceeded.
+
+        Args:
+            model: Embedding model name
+            vectors: Mapping of text hash to vector
+        """
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((model, key, blob, len(blob), now))
+
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, text_hash, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            self._size_bytes += sum(row[3] for row in rows)
+
+            if self._size_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until back under budget."""
+        target = int(self.max_bytes * _EVICTION_TARGET_RATIO)
+        cursor = conn.execute(
+            "SELECT model, text_hash, size FROM embeddings ORDER BY last_access"
+        )
+        victims = []
+        size = self._size_bytes
+        for model, key, entry_size in cursor:
+            if size <= target:
+                break
+            victims.append((model, key))
+            size -= entry_size
+        cursor.close()
+
+        conn.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND text_hash = ?",
+            victims,
+        )
+        conn.commit()
+        self._size_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+        self.evictions += len(victims)
+        logging.info(f"Evicted {len(victims)} cached embeddings")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove every cached vector."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+            self._size_bytes = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that consults an EmbeddingCache before computing.
+
+    Query embeddings are kept in a separate in-memory LRU with a TTL, since
+    the same questions tend to be asked repeatedly.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        cache: EmbeddingCache,
+        query_cache: Optional[LRUCache] = None,
+    ):
+        """
+        Initialize CachedEmbeddings.
+
+        Args:
+            underlying: Embeddings used for cache misses
+            model_name: Embedding model name used in cache keys
+            cache: Cache shared by all embedding wrappers
+            query_cache: In-memory cache of query embeddings, none if None
+        """
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache
+        self.query_cache = query_cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents, computing only texts missing from the cache."""
+        hashes = [text_hash(text) for text in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = self.underlying.embed_documents(list(missing.values()))
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), computed)
+            }
+            self.cache.put_many(self.model_name, new_vectors)
+            cached.update(new_vectors)
+
+        return [cached[key].tolist() for key in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, reusing the embedding of an identical earlier query."""
+        if self.query_cache is None:
+            return self.underlying.embed_query(text)
+
+        key = (self.model_name, normalize_text(text))
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.query_cache.put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed many queries, computing the uncached ones in one batch."""
+        keys = [(self.model_name, normalize_text(text)) for text in texts]
+        vectors = {}
+        if self.query_cache is not None:
+            for key in dict.fromkeys(keys):
+                vector = self.query_cache.get(key)
+                if vector is not None:
+                    vectors[key] = vector
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            computed = embed_queries(self.underlying, list(missing.values()))
+            for key, vector in zip(missing, computed):
+                vectors[key] = vector
+                if self.query_cache is not None:
+                    self.query_cache.put(key, vector)
+
+        return [vectors[key] for key in keys]
+
+
+def embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """Embed queries in one batch if the embeddings support it, else one by one."""
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+# Process-wide caches shared by every RAGEngine
+embedding_cache = EmbeddingCache()
+query_embedding_cache = LRUCache(
+    max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
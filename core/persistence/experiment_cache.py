@@ -0,0 +1,108 @@
+import copy
+import threading
+from typing import Optional
+
+from langchain.retrievers import ParentDocumentRetriever
+
+from config import EXPERIMENT_CACHE_MAX_ENTRIES, EXPERIMENT_CACHE_MAX_BYTES
+from core.cache import LRUCache
+from core.persistence.experiment_store import ExperimentStore
+from core.vector_index import estimate_index_bytes
+
+
+def _experiment_bytes(entry: tuple[ParentDocumentRetriever, dict]) -> int:
+    retriever, _ = entry
+    return estimate_index_bytes(retriever.vectorstore.index)
+
+
+class LoadedExperimentCache:
+    """
+    Process-wide cache of loaded, read-only experiments.
+
+    Entries are keyed by the experiment's directory and current version, so
+    a saved update is picked up on the next lookup while sessions
+    working on the same experiment share one memory-mapped index and
+    docstore. Least recently used experiments are dropped once the cache
+    exceeds its entry limit or memory budget.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        """
+        Initialize LoadedExperimentCache.
+
+        Args:
+            max_entries: Maximum number of loaded experiments
+            max_bytes: Memory budget for the loaded indexes
+        """
+        self._cache = LRUCache(
+            max_entries=max_entries or EXPERIMENT_CACHE_MAX_ENTRIES,
+            max_bytes=max_bytes or EXPERIMENT_CACHE_MAX_BYTES,
+            sizeof=_experiment_bytes,
+        )
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    def _key(self, store: ExperimentStore, experiment_name: str) -> Optional[tuple[str, str]]:
+        return store.revision(experiment_name)
+
+    def get(
+        self,
+        store: ExperimentStore,
+        experiment_name: str,
+    ) -> tuple[Optional[ParentDocumentRetriever], Optional[dict]]:
+        """
+        Return a loaded experiment, loading it through the store on a miss.
+
+        The retriever is shared and must not be modified; the returned
+        config is a private copy.
+
+        Args:
+            store: Store the experiment is saved in
+            experiment_name: Name of the experiment
+
+        Returns:
+            Tuple of (retriever, config) or (None, None) on error
+        """
+        key = self._key(store, experiment_name)
+        entry = self._cache.get(key) if key else None
+        if entry is not None:
+            return entry[0], copy.deepcopy(entry[1])
+
+        path = store.experiment_path(experiment_name)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+
+        # Sessions opening the same experiment wait for a single load
+        with load_lock:
+            key = self._key(store, experiment_name)
+            entry = self._cache.peek(key) if key else None
+            if entry is None:
+                retriever, config = store.load(experiment_name)
+                if not retriever or not config:
+                    return None, None
+
+                # Loading may migrate the experiment or meet a newer save
+                key = self._key(store, experiment_name)
+                entry = (retriever, config)
+                self._cache.discard_where(lambda cached: cached[0] == path)
+                if key:
+                    self._cache.put(key, entry)
+
+        return entry[0], copy.deepcopy(entry[1])
+
+    def revision(self, store: ExperimentStore, experiment_name: str) -> Optional[tuple[str, str]]:
+        """Identify the saved version of an experiment, or None if it does not exist."""
+        return self._key(store, experiment_name)
+
+    def invalidate(self, store: ExperimentStore, experiment_name: str) -> None:
+        """Drop every cached version of an experiment."""
+        path = store.experiment_path(experiment_name)
+        self._cache.discard_where(lambda cached: cached[0] == path)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the memory held by loaded experiments."""
+        return self._cache.stats()
+
+
+# Process-wide cache shared by every RAGEngine
+experiment_cache = LoadedExperimentCache()
@@ -1,28 +1,207 @@
+import json
 import os
 import pickle
+import shutil
 import logging
-from typing import Optional
-
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
 from langchain.retrievers import ParentDocumentRetriever
 
 from config import EXPERIMENTS_DIR
+from config.constants import ChunkUnit
+from core.embedding_registry import embedding_registry
+from core.persistence.docstore import DocumentDatabase, SQLiteChildDocstore
+from core.retrieval import HybridParentDocumentRetriever
+from core.sparse_index import SparseIndex
+from core.splitters import create_splitters
+
+EXPERIMENT_FORMAT_VERSION = 2
+
+# Names the version directory holding the experiment's current files
+CURRENT_FILE = "current"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+SPARSE_INDEX_FILE = "sparse.npz"
+# Documents of format 1 experiments, converted to DOCSTORE_FILE on load
+CHILDREN_FILE = "children.jsonl"
+PARENTS_FILE = "parents.jsonl"
+
+_VERSION_PREFIX = "v-"
+# Version of experiments saved before versioning, whose files sit in the experiment directory
+_FLAT_VERSION = "."
+_FLAT_FILES = (MANIFEST_FILE, INDEX_FILE, DOCSTORE_FILE, SPARSE_INDEX_FILE, CHILDREN_FILE, PARENTS_FILE)
+# Staging and swap directories left next to experiments by the previous save logic
+_LEFTOVER_MARKERS = (".tmp-", ".old-")
+
+# Documents copied per step when writing a docstore
+_DOCUMENT_BATCH_SIZE = 1000
+
+# Vectors copied per step when converting a flat index for storage
+_CONVERSION_BATCH_SIZE = 65536
+
+
+def _to_mappable_index(index: faiss.Index) -> faiss.Index:
+    """
+    Convert a flat index into an equivalent single-list IVF index.
+
+    FAISS can only memory-map inverted lists, so flat indexes are stored as
+    an IVF with one list that is always probed. Search stays exact.
+    """
+    flat = faiss.downcast_index(index)
+    if not isinstance(flat, faiss.IndexFlat):
+        return index
+
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlat(flat.d, flat.metric_type), flat.d, 1, flat.metric_type)
+    ivf.quantizer.add(np.zeros((1, flat.d), dtype=np.float32))
+    ivf.is_trained = True
+    ivf.nprobe = 1
+    for start in range(0, flat.ntotal, _CONVERSION_BATCH_SIZE):
+        ivf.add(flat.reconstruct_n(start, min(_CONVERSION_BATCH_SIZE, flat.ntotal - start)))
+    return ivf
+
+
+def _read_index(path: str, mmap: bool) -> faiss.Index:
+    """Read an index, memory-mapping its vector data when possible."""
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            logging.warning(f"Memory-mapped read of {path} failed, loading into RAM: {str(e)}")
+    return faiss.read_index(path)
+
+
+def _read_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _batched(items, size: int = _DOCUMENT_BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_docstore(path: str, retriever: ParentDocumentRetriever) -> None:
+    """Write the child and parent documents of a retriever to a SQLite file."""
+    vectorstore = retriever.vectorstore
+    children = vectorstore.docstore
+    if (
+        isinstance(children, SQLiteChildDocstore)
+        and retriever.docstore is children.database.parents
+    ):
+        children.database.backup(path)
+        return
+
+    database = DocumentDatabase(path)
+    try:
+        ordered_ids = (doc_id for _, doc_id in sorted(vectorstore.index_to_docstore_id.items()))
+        start = 0
+        for ids in _batched(ordered_ids):
+            database.children.add_at_positions(start, ids, [children.search(doc_id) for doc_id in ids])
+            start += len(ids)
+
+        for batch in _batched(retriever.docstore.yield_keys()):
+            database.parents.mset([
+                (doc_id, document)
+                for doc_id, document in zip(batch, retriever.docstore.mget(batch))
+                if document is not None
+            ])
+    finally:
+        database.close()
+
+
+def _convert_jsonl_docstore(experiment_dir: str) -> None:
+    """Convert the jsonl documents of a format 1 experiment to SQLite."""
+    database = DocumentDatabase(os.path.join(experiment_dir, DOCSTORE_FILE))
+    try:
+        records = _read_jsonl(os.path.join(experiment_dir, CHILDREN_FILE))
+        start = 0
+        for batch in _batched(records):
+            database.children.add_at_positions(
+                start,
+                [record["id"] for record in batch],
+                [_record_document(record) for record in batch],
+            )
+            start += len(batch)
+
+        records = _read_jsonl(os.path.join(experiment_dir, PARENTS_FILE))
+        for batch in _batched(records):
+            database.parents.mset([(record["id"], _record_document(record)) for record in batch])
+    finally:
+        database.close()
+
+    for filename in (CHILDREN_FILE, PARENTS_FILE):
+        os.remove(os.path.join(experiment_dir, filename))
+
+
+def _record_document(record: dict) -> Document:
+    return Document(
+        id=record["id"],
+        page_content=record["page_content"],
+        metadata=record["metadata"],
+    )
 
-class ExperimentStore:
-    """Manages RAG experiment persistence."""
 
-    def __init__(self, base_dir: str = None):
+class ExperimentStore:
+    """
+    Manages RAG experiment persistence.
+
+    Each experiment is a directory holding a FAISS index file that is
+    memory-mapped on load, a SQLite docstore with the child and parent
+    documents that is queried on demand, and a small JSON manifest with the
+    configuration needed to rebuild the retriever.
+    Every save writes a new version subdirectory and then atomically
+    replaces a pointer file naming the current version, so the experiment
+    never disappears while it is being saved. The previous version is kept
+    until the next save for readers still opening it.
+    Experiments saved as pickles by older versions are migrated on load.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = None,
+        embeddings_factory: Optional[Callable[[str], object]] = None,
+    ):
         """
         Initialize ExperimentStore.
 
         Args:
             base_dir: Directory for storing experiments
+            embeddings_factory: Creates the embeddings for an embedding model name
         """
         self.base_dir = base_dir or str(EXPERIMENTS_DIR)
+        self.embeddings_factory = embeddings_factory
+        self._save_lock = threading.Lock()
         os.makedirs(self.base_dir, exist_ok=True)
 
+    def _safe_name(self, experiment_name: str) -> str:
+        return "".join(
+            c for c in experiment_name
+            if c.isalnum() or c in (" ", "-", "_")
+        ).rstrip()
+
+    def _get_dir(self, experiment_name: str) -> str:
+        """Get the directory of an experiment."""
+        return os.path.join(self.base_dir, self._safe_name(experiment_name))
+
     def _get_paths(self, experiment_name: str) -> tuple[str, str]:
         """
-        Get file paths for an experiment.
+        Get legacy pickle file paths for an experiment.
 
         Args:
             experiment_name: Name of the experiment
@@ -30,16 +209,47 @@ class ExperimentStore:
         Returns:
             Tuple of (retriever_path, config_path)
         """
-        safe_name = "".join(
-            c for c in experiment_name
-            if c.isalnum() or c in (" ", "-", "_")
-        ).rstrip()
+        safe_name = self._safe_name(experiment_name)
 
         retriever_path = os.path.join(self.base_dir, f"{safe_name}_retriever.pkl")
         config_path = os.path.join(self.base_dir, f"{safe_name}_config.pkl")
 
         return retriever_path, config_path
 
+    def _current_version(self, experiment_dir: str) -> Optional[str]:
+        """Name of the current version directory of an experiment, None if it has none."""
+        try:
+            with open(os.path.join(experiment_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        if os.path.isfile(os.path.join(experiment_dir, MANIFEST_FILE)):
+            return _FLAT_VERSION
+        return None
+
+    def _current_dir(self, experiment_name: str) -> Optional[str]:
+        """Directory holding the current files of an experiment, None if it has none."""
+        experiment_dir = self._get_dir(experiment_name)
+        version = self._current_version(experiment_dir)
+        return os.path.join(experiment_dir, version) if version else None
+
+    def manifest_path(self, experiment_name: str) -> str:
+        """Path of the manifest file of an experiment's current version."""
+        experiment_dir = self._current_dir(experiment_name) or self._get_dir(experiment_name)
+        return os.path.join(experiment_dir, MANIFEST_FILE)
+
+    def experiment_path(self, experiment_name: str) -> str:
+        """Absolute path of an experiment's directory, whether or not it exists."""
+        return os.path.abspath(self._get_dir(experiment_name))
+
+    def revision(self, experiment_name: str) -> Optional[tuple[str, str]]:
+        """Identify the saved version of an experiment, or None if it does not exist."""
+        experiment_dir = self._get_dir(experiment_name)
+        version = self._current_version(experiment_dir)
+        return (os.path.abspath(experiment_dir), version) if version else None
+
     def save(
         self,
         experiment_name: str,
@@ -49,49 +259,158 @@ class ExperimentStore:
         """
         Save an experiment with its configuration.
 
+        The experiment is written to a new version directory that becomes
+        current with a single atomic replace of the pointer file, so readers
+        see either the previous or the new version and never a partial one.
+
         Returns:
             True if save was successful
         """
-        try:
-            retriever_path, config_path = self._get_paths(experiment_name)
-
-            # Save retriever
-            with open(retriever_path, "wb") as f:
-                pickle.dump(retriever, f)
-
-            # Save configuration
-            with open(config_path, "wb") as f:
-                pickle.dump(config, f)
+        experiment_dir = self._get_dir(experiment_name)
+        version = f"{_VERSION_PREFIX}{uuid.uuid4().hex}"
+        staging_dir = os.path.join(experiment_dir, version)
 
+        try:
+            os.makedirs(staging_dir)
+            vectorstore = retriever.vectorstore
+
+            faiss.write_index(
+                _to_mappable_index(vectorstore.index),
+                os.path.join(staging_dir, INDEX_FILE),
+            )
+
+            _write_docstore(os.path.join(staging_dir, DOCSTORE_FILE), retriever)
+
+            sparse_index = getattr(retriever, "sparse_index", None)
+            if sparse_index is not None:
+                sparse_index.save(os.path.join(staging_dir, SPARSE_INDEX_FILE))
+
+            manifest = {
+                "format_version": EXPERIMENT_FORMAT_VERSION,
+                "name": experiment_name,
+                "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "retriever": {
+                    "id_key": retriever.id_key,
+                    "search_kwargs": retriever.search_kwargs,
+                    "child_chunk_size": retriever.child_splitter._chunk_size,
+                    "chunk_unit": getattr(
+                        retriever.child_splitter, "unit", ChunkUnit.CHARACTERS.value
+                    ),
+                },
+                "config": config,
+            }
+            with open(os.path.join(staging_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            with self._save_lock:
+                previous = self._current_version(experiment_dir)
+                self._set_current_version(experiment_dir, version)
+                self._remove_old_versions(experiment_dir, keep={version, previous})
+            self._remove_legacy(experiment_name)
             return True
 
         except Exception as e:
             logging.error(f"Error saving experiment {experiment_name}: {str(e)}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            try:
+                # Only succeeds if this was the experiment's first save
+                os.rmdir(experiment_dir)
+            except OSError:
+                pass
             return False
 
+    def _set_current_version(self, experiment_dir: str, version: str) -> None:
+        """Point an experiment at a fully written version directory."""
+        pointer_path = os.path.join(experiment_dir, CURRENT_FILE)
+        temp_path = f"{pointer_path}.tmp-{uuid.uuid4().hex}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, pointer_path)
+
+    def _remove_old_versions(self, experiment_dir: str, keep: set[Optional[str]]) -> None:
+        """Delete versions other than the kept ones, and files of interrupted saves."""
+        for filename in os.listdir(experiment_dir):
+            path = os.path.join(experiment_dir, filename)
+            if filename.startswith(_VERSION_PREFIX) and filename not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+            elif (
+                filename.startswith(f"{CURRENT_FILE}.tmp-")
+                or (_FLAT_VERSION not in keep and filename.startswith(_FLAT_FILES))
+            ):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
     def load(
         self,
         experiment_name: str,
+        read_only: bool = True,
     ) -> tuple[Optional[ParentDocumentRetriever], Optional[dict]]:
         """
         Load a saved experiment.
 
         Args:
             experiment_name: Name of the experiment to load
+            read_only: Memory-map the index and open the docstore read-only;
+                pass False to load a writable copy that can be updated
 
         Returns:
             Tuple of (retriever, config) or (None, None) on error
         """
         try:
-            retriever_path, config_path = self._get_paths(experiment_name)
-
-            # Load retriever
-            with open(retriever_path, "rb") as f:
-                retriever = pickle.load(f)
-
-            # Load configuration
-            with open(config_path, "rb") as f:
-                config = pickle.load(f)
+            # Resolved once, so every file comes from the same version
+            experiment_dir = self._current_dir(experiment_name)
+            if experiment_dir is None:
+                if not self.migrate(experiment_name):
+                    return None, None
+                experiment_dir = self._current_dir(experiment_name)
+
+            manifest_path = os.path.join(experiment_dir, MANIFEST_FILE)
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            config = manifest["config"]
+            settings = manifest["retriever"]
+
+            if manifest["format_version"] < 2:
+                logging.info(f"Converting documents of {experiment_name} to SQLite")
+                _convert_jsonl_docstore(experiment_dir)
+                manifest["format_version"] = EXPERIMENT_FORMAT_VERSION
+                with open(manifest_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+
+            embeddings = self.embeddings_factory(config.get("embedding_model"))
+            index = _read_index(os.path.join(experiment_dir, INDEX_FILE), read_only)
+
+            database = DocumentDatabase(os.path.join(experiment_dir, DOCSTORE_FILE), read_only=True)
+            if not read_only:
+                database = database.copy()
+
+            vectorstore = FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=database.children,
+                index_to_docstore_id=database.children.index_mapping,
+            )
+
+            tokenizer = None
+            if settings.get("chunk_unit") == ChunkUnit.TOKENS.value:
+                tokenizer = embedding_registry.tokenizer(config.get("embedding_model"))
+            parent_splitter, child_splitter = create_splitters(
+                settings["child_chunk_size"],
+                tokenizer=tokenizer,
+            )
+            retriever = HybridParentDocumentRetriever(
+                vectorstore=vectorstore,
+                docstore=database.parents,
+                parent_splitter=parent_splitter,
+                child_splitter=child_splitter,
+                id_key=settings["id_key"],
+                search_kwargs=settings["search_kwargs"],
+                sparse_index=self._read_sparse_index(experiment_dir, index.ntotal),
+            )
 
             return retriever, config
 
@@ -99,6 +418,88 @@ class ExperimentStore:
             logging.error(f"Error loading experiment {experiment_name}: {str(e)}")
             return None, None
 
+    def _read_sparse_index(self, experiment_dir: str, num_vectors: int) -> Optional[SparseIndex]:
+        """Read the BM25 index of an experiment if it has one that matches its vectors."""
+        path = os.path.join(experiment_dir, SPARSE_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+
+        sparse_index = SparseIndex.load(path)
+        if len(sparse_index) != num_vectors:
+            logging.warning(
+                f"Ignoring sparse index in {experiment_dir}: {len(sparse_index)} documents "
+                f"for {num_vectors} vectors"
+            )
+            return None
+        return sparse_index
+
+    def _read_manifest(self, experiment_name: str) -> dict:
+        with open(self.manifest_path(experiment_name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def migrate(self, experiment_name: str) -> bool:
+        """
+        Convert a legacy pickled experiment to the on-disk layout.
+
+        Args:
+            experiment_name: Name of the experiment to migrate
+
+        Returns:
+            True if a legacy experiment was found and converted
+        """
+        retriever_path, config_path = self._get_paths(experiment_name)
+        if not (os.path.exists(retriever_path) and os.path.exists(config_path)):
+            return False
+
+        with open(retriever_path, "rb") as f:
+            retriever = pickle.load(f)
+        with open(config_path, "rb") as f:
+            config = pickle.load(f)
+
+        logging.info(f"Migrating pickled experiment {experiment_name}")
+        return self.save(experiment_name, retriever, config)
+
+    def migrate_all(self) -> list[str]:
+        """
+        Migrate every legacy pickled experiment.
+
+        Returns:
+            Names of the migrated experiments
+        """
+        migrated = []
+        for filename in os.listdir(self.base_dir):
+            if filename.endswith("_config.pkl"):
+                experiment_name = filename[:-11]  # Remove _config.pkl
+                if self.migrate(experiment_name):
+                    migrated.append(experiment_name)
+        return migrated
+
+    def _remove_legacy(self, experiment_name: str) -> None:
+        for path in self._get_paths(experiment_name):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load_config(self, experiment_name: str) -> Optional[dict]:
+        """
+        Load only the configuration of a saved experiment.
+
+        Args:
+            experiment_name: Name of the experiment
+
+        Returns:
+            Configuration dictionary or None on error
+        """
+        try:
+            if os.path.exists(self.manifest_path(experiment_name)):
+                return self._read_manifest(experiment_name)["config"]
+
+            _, config_path = self._get_paths(experiment_name)
+            with open(config_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.error(f"Error loading config for {experiment_name}: {str(e)}")
+            return None
+
     def delete(self, experiment_name: str) -> bool:
         """
         Delete a saved experiment.
@@ -110,13 +511,8 @@ class ExperimentStore:
             True if deletion was successful
         """
         try:
-            retriever_path, config_path = self._get_paths(experiment_name)
-
-            if os.path.exists(retriever_path):
-                os.remove(retriever_path)
-            if os.path.exists(config_path):
-                os.remove(config_path)
-
+            shutil.rmtree(self._get_dir(experiment_name), ignore_errors=True)
+            self._remove_legacy(experiment_name)
             return True
 
         except Exception as e:
@@ -137,14 +533,32 @@ class ExperimentStore:
                 return experiments
 
             for filename in os.listdir(self.base_dir):
+                path = os.path.join(self.base_dir, filename)
+
+                if any(marker in filename for marker in _LEFTOVER_MARKERS):
+                    self._recover_leftover(filename)
+                    continue
+
+                version = self._current_version(path) if os.path.isdir(path) else None
+                if version:
+                    try:
+                        manifest_path = os.path.join(path, version, MANIFEST_FILE)
+                        with open(manifest_path, "r", encoding="utf-8") as f:
+                            manifest = json.load(f)
+                        experiments.append((manifest["name"], manifest["config"]))
+                    except (OSError, json.JSONDecodeError, KeyError) as e:
+                        logging.error(f"Error loading manifest in {filename}: {str(e)}")
+                    continue
+
                 if not filename.endswith("_config.pkl"):
                     continue
 
                 experiment_name = filename[:-11]  # Remove _config.pkl
-                config_path = os.path.join(self.base_dir, filename)
+                if os.path.exists(self.manifest_path(experiment_name)):
+                    continue
 
                 try:
-                    with open(config_path, "rb") as f:
+                    with open(path, "rb") as f:
                         config = pickle.load(f)
                         experiments.append((experiment_name, config))
                 except (pickle.UnpicklingError, KeyError) as e:
@@ -157,7 +571,34 @@ class ExperimentStore:
             logging.error(f"Error listing experiments: {str(e)}")
             return []
 
+    def _recover_leftover(self, filename: str) -> None:
+        """
+        Clean up a directory left by a save interrupted under the previous layout.
+
+        Saves used to move the experiment aside to <name>.old-<id> before
+        moving <name>.tmp-<id> into place; if the process died in between,
+        the moved-aside copy is the only one and is restored.
+        """
+        path = os.path.join(self.base_dir, filename)
+        name, marker, _ = filename.rpartition(".old-")
+        target = os.path.join(self.base_dir, name)
+        try:
+            if (
+                marker
+                and self._current_version(target) is None
+                and self._current_version(path) is not None
+            ):
+                shutil.rmtree(target, ignore_errors=True)
+                os.rename(path, target)
+                logging.info(f"Restored experiment {name} from an interrupted save")
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            logging.warning(f"Could not clean up {filename}: {str(e)}")
+
     def exists(self, experiment_name: str) -> bool:
         """Check if an experiment exists."""
+        if os.path.exists(self.manifest_path(experiment_name)):
+            return True
         retriever_path, config_path = self._get_paths(experiment_name)
-        return os.path.exists(retriever_path) and os.path.exists(config_path)
\ No newline at end of file
+        return os.path.exists(retriever_path) and os.path.exists(config_path)
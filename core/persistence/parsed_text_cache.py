@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from config import PARSED_TEXT_CACHE_FILE, PARSED_TEXT_CACHE_MAX_BYTES
+
+# Evict down to this fraction of the budget so eviction is not run on every insert
+_EVICTION_TARGET_RATIO = 0.9
+# Fast compression; page text shrinks several times even at the lowest level
+_COMPRESSION_LEVEL = 1
+
+
+class ParsedTextCache:
+    """
+    Persistent cache of the page texts extracted from PDF files.
+
+    Entries are keyed by the SHA-256 of the file bytes and the version of
+    the extractor, so a file is parsed once however often it is uploaded
+    or renamed, and a new extractor never serves stale text. Page texts are
+    stored compressed, and least recently used files are evicted to stay
+    within a byte budget.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        Initialize ParsedTextCache.
+
+        Args:
+            path: SQLite database file for cached text
+            max_bytes: Size budget for stored, compressed text
+        """
+        self.path = path or str(PARSED_TEXT_CACHE_FILE)
+        self.max_bytes = max_bytes or PARSED_TEXT_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS parsed_files (
+                    file_hash TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    pages BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (file_hash, extractor)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_parsed_files_last_access "
+                "ON parsed_files (last_access)"
+            )
+            conn.commit()
+            self._size_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM parsed_files"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, file_hash: str, extractor: str) -> Optional[list[str]]:
+        """
+        Look up the page texts of a file.
+
+        Args:
+            file_hash: SHA-256 of the file bytes
+            extractor: Version of the extractor that produced the text
+
+        Returns:
+            Text of every page in order, or None on a cache miss
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT pages FROM parsed_files WHERE file_hash = ? AND extractor = ?",
+                (file_hash, extractor),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE parsed_files SET last_access = ? WHERE file_hash = ? AND extractor = ?",
+                (time.time(), file_hash, extractor),
+            )
+            conn.commit()
+            self.hits += 1
+
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, file_hash: str, extractor: str, pages: list[str]) -> None:
+        """
+        Store the page texts of a file and evict old entries if the budget is exceeded.
+
+        Args:
+            file_hash: SHA-256 of the file bytes
+            extractor: Version of the extractor that produced the text
+            pages: Text of every page in order
+        """
+        blob = zlib.compress(json.dumps(pages).encode("utf-8"), _COMPRESSION_LEVEL)
+        if len(blob) > self.max_bytes:
+            logging.info(f"Parsed text of {file_hash[:12]} exceeds the cache budget, not cached")
+            return
+
+        with self._lock:
+            conn = self._connect()
+            previous = conn.execute(
+                "SELECT size FROM parsed_files WHERE file_hash = ? AND extractor = ?",
+                (file_hash, extractor),
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO parsed_files "
+                "(file_hash, extractor, page_count, pages, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (file_hash, extractor, len(pages), blob, len(blob), time.time()),
+            )
+            conn.commit()
+            self._size_bytes += len(blob) - (previous[0] if previous else 0)
+
+            if self._size_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used files until back under budget."""
+        target = int(self.max_bytes * _EVICTION_TARGET_RATIO)
+        cursor = conn.execute(
+            "SELECT file_hash, extractor, size FROM parsed_files ORDER BY last_access"
+        )
+        victims = []
+        size = self._size_bytes
+        for file_hash, extractor, entry_size in cursor:
+            if size <= target:
+                break
+            victims.append((file_hash, extractor))
+            size -= entry_size
+        cursor.close()
+
+        conn.executemany(
+            "DELETE FROM parsed_files WHERE file_hash = ? AND extractor = ?",
+            victims,
+        )
+        conn.commit()
+        self._size_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM parsed_files"
+        ).fetchone()[0]
+        self.evictions += len(victims)
+        logging.info(f"Evicted parsed text of {len(victims)} files")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove every cached file."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM parsed_files")
+            conn.commit()
+            self._size_bytes = 0
+
+
+# Process-wide cache shared by every RAGEngine
+parsed_text_cache = ParsedTextCache()
@@ -0,0 +1,258 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from config import INGESTION_PROFILE_SAMPLE_SECONDS, INGESTION_TRACE_MEMORY
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_MB = 1024 ** 2
+
+# Profilers of the builds running in this process
+_running: set["PipelineProfiler"] = set()
+_running_lock = threading.Lock()
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where it cannot be read."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        # Peak rather than current RSS, which is what we report anyway
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+@dataclass
+class StageMetrics:
+    """Resource usage of one pipeline stage."""
+
+    wall_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    peak_traced_bytes: Optional[int] = None
+    items: int = 0
+
+    @property
+    def busy_seconds(self) -> float:
+        """Time the stage spent working rather than waiting on its neighbours."""
+        return max(self.wall_seconds - self.wait_seconds, 0.0)
+
+    def to_dict(self) -> dict:
+        busy = self.busy_seconds
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "busy_seconds": round(busy, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "peak_rss_mb": round(self.peak_rss_bytes / _MB, 1),
+            "peak_traced_mb": (
+                round(self.peak_traced_bytes / _MB, 1)
+                if self.peak_traced_bytes is not None else None
+            ),
+            "items": self.items,
+            "items_per_second": round(self.items / busy, 1) if busy else None,
+        }
+
+
+class PipelineProfiler:
+    """
+    Per-stage wall time, CPU time and peak memory of a pipeline run.
+
+    Every stage is timed on its own thread: wall time from the stage's start
+    to its end, wait time spent blocked on its queues, and the CPU time of
+    that thread. CPU burnt in native thread pools (such as PyTorch's) is
+    only part of the run total, while CPU of worker processes can be added
+    to a stage explicitly. Stages overlap, so memory is sampled by a
+    background thread and each sample counts toward the peak of every stage
+    active at the time. Python allocations are traced with tracemalloc only
+    when enabled, since tracing slows allocation-heavy code down noticeably.
+
+    RSS and tracemalloc are process-wide, so builds running side by side
+    (background jobs next to each other or next to chat) share their memory
+    figures. Every profile records the most other builds that overlapped it
+    in concurrent_builds; memory is attributable to the build alone only
+    when that is 0. Only the profiler that started tracemalloc reads,
+    resets or stops it, so overlapping profilers never disturb each other.
+    """
+
+    def __init__(
+        self,
+        stages: list[str],
+        sample_interval: float = None,
+        trace_memory: bool = None,
+    ):
+        """
+        Initialize PipelineProfiler.
+
+        Args:
+            stages: Names of the stages to profile
+            sample_interval: Seconds between memory samples
+            trace_memory: Also record peak traced Python allocations
+        """
+        self.metrics = {stage: StageMetrics() for stage in stages}
+        self.sample_interval = sample_interval or INGESTION_PROFILE_SAMPLE_SECONDS
+        self.trace_memory = INGESTION_TRACE_MEMORY if trace_memory is None else trace_memory
+        self._active: set[str] = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._tracing = False
+        self._started_at = 0.0
+        self._cpu_at_start = 0.0
+        self._external_cpu = 0.0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = 0
+        self.peak_traced_bytes: Optional[int] = None
+        self.concurrent_builds = 0
+
+    def start(self) -> None:
+        """Start the run clock and the memory sampler."""
+        with _running_lock:
+            for other in _running:
+                other.concurrent_builds = max(other.concurrent_builds, len(_running))
+            self.concurrent_builds = len(_running)
+            _running.add(self)
+            # Leave tracemalloc alone if another build or someone else is already tracing
+            self._tracing = self.trace_memory and not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start()
+                self.peak_traced_bytes = 0
+        self._started_at = time.perf_counter()
+        self._cpu_at_start = time.process_time()
+        self._sampler = threading.Thread(
+            target=self._sample_loop,
+            name="ingestion-profiler",
+            daemon=True,
+        )
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop sampling and record the run totals."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._sample()
+        self.wall_seconds = time.perf_counter() - self._started_at
+        self.cpu_seconds = time.process_time() - self._cpu_at_start + self._external_cpu
+        with _running_lock:
+            _running.discard(self)
+            if self._tracing:
+                with self._lock:
+                    tracemalloc.stop()
+                    self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the calling thread as the given stage."""
+        metrics = self.metrics[name]
+        self._local.stage = name
+        with self._lock:
+            self._active.add(name)
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self._sample()
+            with self._lock:
+                metrics.wall_seconds += time.perf_counter() - start
+                metrics.cpu_seconds += time.thread_time() - cpu_start
+                self._active.discard(name)
+            self._local.stage = None
+
+    @contextmanager
+    def waiting(self) -> Iterator[None]:
+        """Count time in the block as waiting for the calling thread's stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            name = getattr(self._local, "stage", None)
+            if name is not None:
+                with self._lock:
+                    self.metrics[name].wait_seconds += time.perf_counter() - start
+
+    def add_cpu(self, name: str, seconds: float) -> None:
+        """Attribute CPU time spent outside this process's threads to a stage."""
+        with self._lock:
+            self.metrics[name].cpu_seconds += seconds
+            self._external_cpu += seconds
+
+    def add_items(self, name: str, count: int) -> None:
+        with self._lock:
+            self.metrics[name].items += count
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        """Record current memory toward the peak of the run and of every active stage."""
+        rss = current_rss() or 0
+        with self._lock:
+            traced = None
+            if self._tracing:
+                # Peak since the previous sample, so short spikes are not missed
+                traced = tracemalloc.get_traced_memory()[1]
+                tracemalloc.reset_peak()
+
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+            if traced is not None:
+                self.peak_traced_bytes = max(self.peak_traced_bytes or 0, traced)
+            for name in self._active:
+                metrics = self.metrics[name]
+                metrics.peak_rss_bytes = max(metrics.peak_rss_bytes, rss)
+                if traced is not None:
+                    metrics.peak_traced_bytes = max(metrics.peak_traced_bytes or 0, traced)
+
+    def report(self, pages: int, chunks: int) -> dict:
+        """
+        Summarize the run for an experiment config.
+
+        Args:
+            pages: Pages ingested
+            chunks: Child chunks ingested
+
+        Returns:
+            Run totals, throughput and a metrics dict per stage
+        """
+        with self._lock:
+            stages = {name: metrics.to_dict() for name, metrics in self.metrics.items()}
+        report = {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "peak_rss_mb": round(self.peak_rss_bytes / _MB, 1),
+            "peak_traced_mb": (
+                round(self.peak_traced_bytes / _MB, 1)
+                if self.peak_traced_bytes is not None else None
+            ),
+            "pages_per_second": round(pages / self.wall_seconds, 1) if self.wall_seconds else None,
+            "chunks_per_second": round(chunks / self.wall_seconds, 1) if self.wall_seconds else None,
+            "cpu_count": os.cpu_count(),
+            # Other builds overlapping this one; memory and CPU totals include theirs
+            "concurrent_builds": self.concurrent_builds,
+            "stages": stages,
+        }
+        logging.info(
+            f"Ingestion profile: {report['wall_seconds']}s wall, {report['cpu_seconds']}s CPU, "
+            f"{report['peak_rss_mb']} MB peak RSS, {report['pages_per_second']} pages/s, "
+            f"{report['chunks_per_second']} chunks/s, "
+            f"{report['concurrent_builds']} concurrent builds"
+        )
+        return report
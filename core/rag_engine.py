@@ -1,76 +1,54 @@
-import json
 import logging
-import tempfile
 import os
+import uuid
 from typing import Optional
 
-import torch
 from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
-from langchain.chains import RetrievalQA
-from langchain.embeddings import HuggingFaceEmbeddings, OllamaEmbeddings
-from langchain.document_loaders import PyPDFLoader
-from langchain.vectorstores import FAISS
-from langchain.retrievers import ParentDocumentRetriever
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.storage import InMemoryStore
+from langchain_core.documents import Document
 
 from config import (
-    OLLAMA_BASE_URL,
+    CONTEXT_RESERVED_TOKENS,
+    RETRIEVAL_BATCH_SIZE,
     DEFAULT_TEMPERATURE,
-    EMBEDDING_MODELS_FILE,
     PARENT_CHUNK_MULTIPLIER,
-    CHUNK_OVERLAP_RATIO,
     TEXT_SEPARATORS,
 )
-from config.constants import EmbeddingModelType
-from core.persistence import ExperimentStore
+from config.constants import ChunkUnit, IndexType, IngestionStage, RetrievalMode
+from core.answer_cache import answer_cache
+from core.batch_scheduler import retrieval_scheduler
+from core.context import ContextAssembler, PackedRetrievalQA, estimate_tokens
+from core.embedding_registry import EmbeddingModels, RegisteredEmbeddings, embedding_registry
+from core.ingestion import IngestionPipeline, IngestionResult
+from core.llm_factory import chain_cache, get_llm
+from core.ollama_client import get_context_length
+from core.pdf_parser import PDFParser
+from core.persistence import ExperimentStore, CachedEmbeddings, DocumentDatabase
+from core.persistence.docstore import docstore_sources, find_source_chunks
+from core.persistence.embedding_cache import embedding_cache, query_embedding_cache
+from core.persistence.experiment_cache import experiment_cache
+from core.persistence.parsed_text_cache import parsed_text_cache
+from core.reranker import cross_encoder_reranker
+from core.retrieval import (
+    BatchedRetriever,
+    CachedRetriever,
+    HybridParentDocumentRetriever,
+    retrieval_cache,
+)
+from core.splitters import create_splitters
+from core.vector_index import delete_vectors, index_summary
 
 import warnings
 warnings.filterwarnings("ignore", category=Warning)
 
+QA_PROMPT = PromptTemplate(
+    template="""
+        Context: {context}
+        Question: {question}
 
-class EmbeddingModels:
-    """Manages embedding model configurations."""
-
-    _cache: Optional[dict] = None
-
-    @classmethod
-    def load(cls) -> dict:
-        """Load embedding models from JSON configuration."""
-        if cls._cache is None:
-            try:
-                with open(EMBEDDING_MODELS_FILE, "r") as f:
-                    cls._cache = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                cls._cache = cls._get_defaults()
-        return cls._cache
-
-    @classmethod
-    def _get_defaults(cls) -> dict:
-        """Return default embedding models if config file missing."""
-        return {
-            "bge-small": {
-                "name": "BAAI/bge-small-en-v1.5",
-                "type": "huggingface",
-                "description": "Optimized for retrieval tasks, good balance of speed/quality",
-            },
-            "minilm": {
-                "name": "sentence-transformers/all-MiniLM-L6-v2",
-                "type": "huggingface",
-                "description": "Lightweight, fast, good general purpose model",
-            },
-        }
-
-    @classmethod
-    def get_model_names(cls) -> list[str]:
-        """Get list of available embedding model names."""
-        return list(cls.load().keys())
-
-    @classmethod
-    def get_model_config(cls, name: str) -> dict:
-        """Get configuration for a specific embedding model."""
-        return cls.load().get(name, {})
+        Provide a detailed, well-structured answer based only on the above context.
+        """,
+    input_variables=["context", "question"],
+)
 
 
 class RAGEngine:
@@ -85,8 +63,22 @@ class RAGEngine:
         self.vectorstore = None
         self.store = None
         self.retriever = None
+        self.build_info = {}
         self._separators = TEXT_SEPARATORS
-        self.experiment_store = ExperimentStore()
+        self.experiment_store = ExperimentStore(embeddings_factory=self._create_embeddings)
+        self.parsed_text_cache = parsed_text_cache
+        self.pdf_parser = PDFParser(cache=self.parsed_text_cache)
+        self.embedding_cache = embedding_cache
+        self.embedding_registry = embedding_registry
+        self.experiment_cache = experiment_cache
+        self.reranker = cross_encoder_reranker
+        self.query_embedding_cache = query_embedding_cache
+        self.retrieval_cache = retrieval_cache
+        self.answer_cache = answer_cache
+        self.chain_cache = chain_cache
+        self.retrieval_scheduler = retrieval_scheduler
+        # (manifest path or None, version) of the experiment behind self.retriever
+        self.experiment_revision: Optional[tuple] = None
 
     def process_pdfs(
         self,
@@ -96,6 +88,10 @@ class RAGEngine:
         child_chunk_size: int = 50,
         top_k: int = 4,
         llm_model: str = None,
+        progress_callback=None,
+        index_type: str = IndexType.AUTO.value,
+        retrieval_mode: str = RetrievalMode.HYBRID.value,
+        chunk_unit: str = ChunkUnit.CHARACTERS.value,
     ) -> int:
         """
         Process PDF files and create retriever.
@@ -104,11 +100,15 @@ class RAGEngine:
             pdf_files: List of uploaded PDF file objects
             experiment_name: Name for this experiment
             embedding_model: Name of embedding model to use
-            child_chunk_size: Size of child chunks in characters
+            child_chunk_size: Size of child chunks in chunk_unit
             top_k: Number of documents to retrieve
+            progress_callback: Optional callback receiving per-stage progress
+            index_type: FAISS index type, or "auto" to choose by corpus size
+            retrieval_mode: "hybrid" to also build a BM25 index, or "dense"
+            chunk_unit: "characters", or "tokens" of the embedding model
 
         Returns:
-            Number of documents processed
+            Number of pages processed
         """
         if not experiment_name:
             raise ValueError("Experiment name must be provided")
@@ -117,156 +117,497 @@ class RAGEngine:
             raise ValueError("No PDF files provided for processing")
 
         try:
-            # Load documents
-            documents = self._load_pdf_documents(pdf_files)
+            self.build_info = {}
+            retriever, self.build_info, result = self.build_retriever(
+                pdf_files,
+                embedding_model=embedding_model,
+                child_chunk_size=child_chunk_size,
+                top_k=top_k,
+                progress_callback=progress_callback,
+                index_type=index_type,
+                retrieval_mode=retrieval_mode,
+                chunk_unit=chunk_unit,
+            )
+            logging.info(f"Parsed text cache after ingestion: {self.parsed_text_cache.stats()}")
+            logging.info(f"Embedding cache after ingestion: {self.embedding_cache.stats()}")
 
-            # Setup embeddings
-            embeddings = self._create_embeddings(embedding_model)
+            self.vectorstore = retriever.vectorstore
+            self.store = retriever.docstore
+            self.retriever = retriever
+            self._set_revision((None, uuid.uuid4().hex))
 
-            # Initialize vectorstore
-            vectorstore = FAISS.from_texts(
-                texts=["placeholder"],
-                embedding=embeddings,
-            )
+            return result.pages
 
-            # Calculate chunk sizes
-            parent_chunk_size = child_chunk_size * PARENT_CHUNK_MULTIPLIER
-            child_overlap = int(child_chunk_size * CHUNK_OVERLAP_RATIO)
-            parent_overlap = int(parent_chunk_size * CHUNK_OVERLAP_RATIO)
-
-            # Setup splitters
-            parent_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=parent_chunk_size,
-                chunk_overlap=parent_overlap,
-                length_function=len,
-                separators=self._separators,
-            )
+        except Exception as e:
+            logging.error(f"Error processing PDFs: {str(e)}")
+            raise
 
-            child_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=child_chunk_size,
-                chunk_overlap=child_overlap,
-                length_function=len,
-                separators=self._separators,
-            )
+    def build_retriever(
+        self,
+        pdf_files: list,
+        embedding_model: str,
+        child_chunk_size: int,
+        top_k: int,
+        progress_callback=None,
+        index_type: str = IndexType.AUTO.value,
+        retrieval_mode: str = RetrievalMode.HYBRID.value,
+        chunk_unit: str = ChunkUnit.CHARACTERS.value,
+        parser=None,
+        cancel_event=None,
+        shared_splits=None,
+    ) -> tuple[HybridParentDocumentRetriever, dict, IngestionResult]:
+        """
+        Build a retriever over PDF files without changing the engine's state.
 
-            # Setup storage
-            self.store = InMemoryStore()
+        Args:
+            parser: Parser for the files, the engine's PDF parser if None
+            cancel_event: threading.Event that stops ingestion once set, which
+                then raises IngestionCancelled
+            shared_splits: Character splits shared with other builds of the
+                same chunk size (see core.sweep), used instead of splitting
+                anew; see process_pdfs for the other arguments
 
-            # Initialize retriever
-            self.retriever = ParentDocumentRetriever(
-                vectorstore=vectorstore,
-                docstore=self.store,
-                parent_splitter=parent_splitter,
-                child_splitter=child_splitter,
-                search_kwargs={"k": top_k},
+        Returns:
+            Tuple of (retriever, build info for the experiment config, ingestion result)
+        """
+        embeddings = self._create_embeddings(embedding_model)
+        if shared_splits is not None:
+            parent_splitter = shared_splits.parent_splitter
+            child_splitter = shared_splits.child_splitter
+        else:
+            tokenizer = None
+            if chunk_unit == ChunkUnit.TOKENS.value:
+                tokenizer, child_chunk_size = self._chunk_tokenizer(embedding_model, child_chunk_size)
+            parent_splitter, child_splitter = create_splitters(
+                child_chunk_size,
+                self._separators,
+                tokenizer=tokenizer,
             )
 
-            # Add documents
-            self.retriever.add_documents(documents)
+        # Setup disk-backed storage for parent and child documents
+        database = DocumentDatabase()
+
+        # Stream documents through parsing, splitting, embedding and indexing
+        pipeline = IngestionPipeline(
+            embeddings=embeddings,
+            parent_splitter=parent_splitter,
+            child_splitter=child_splitter,
+            docstore=database.parents,
+            parser=parser or self.pdf_parser,
+            progress_callback=progress_callback,
+            child_docstore=database.children,
+            build_sparse_index=retrieval_mode == RetrievalMode.HYBRID.value,
+            cancel_event=cancel_event,
+            split_documents=shared_splits,
+        )
+        result = pipeline.run(pdf_files, index_type=index_type)
 
-            return len(documents)
+        if result.vectorstore is None:
+            raise ValueError("No text could be extracted from the provided PDF files")
 
-        except Exception as e:
-            logging.error(f"Error processing PDFs: {str(e)}")
-            raise
+        build_info = {
+            "chunk_size": child_chunk_size,
+            "chunk_unit": child_splitter.unit,
+            "index": result.index_stats,
+            "retrieval": _retrieval_summary(result.sparse_index),
+            "ingestion_profile": result.profile,
+        }
+        retriever = HybridParentDocumentRetriever(
+            vectorstore=result.vectorstore,
+            docstore=database.parents,
+            parent_splitter=parent_splitter,
+            child_splitter=child_splitter,
+            search_kwargs={"k": top_k},
+            sparse_index=result.sparse_index,
+        )
+        return retriever, build_info, result
 
-    def _load_pdf_documents(self, pdf_files: list) -> list:
-        """Load documents from PDF files."""
-        documents = []
-        with tempfile.TemporaryDirectory() as temp_dir:
-            for pdf_file in pdf_files:
-                temp_path = os.path.join(temp_dir, pdf_file.name)
-                with open(temp_path, "wb") as f:
-                    f.write(pdf_file.getbuffer())
-                loader = PyPDFLoader(temp_path)
-                documents.extend(loader.load())
-        return documents
+    def _chunk_tokenizer(self, embedding_model: str, child_chunk_size: int) -> tuple:
+        """
+        Get the tokenizer for token-sized chunks and the chunk size it allows.
+
+        Returns:
+            Tuple of (tokenizer or None, child chunk size); without a local
+            tokenizer the chunks are sized in characters instead
+        """
+        tokenizer = self.embedding_registry.tokenizer(embedding_model)
+        if tokenizer is None:
+            logging.warning(
+                f"Embedding model {embedding_model} has no local tokenizer, "
+                f"sizing chunks in characters"
+            )
+            return None, child_chunk_size
+
+        if child_chunk_size > tokenizer.max_tokens:
+            logging.info(
+                f"Reducing child chunk size from {child_chunk_size} to the "
+                f"{tokenizer.max_tokens} tokens {embedding_model} embeds without truncation"
+            )
+            child_chunk_size = tokenizer.max_tokens
+        return tokenizer, child_chunk_size
 
     def _create_embeddings(self, embedding_model: str):
-        """Create embedding model instance."""
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        """Create embeddings backed by the shared model registry and embedding cache."""
         model_config = EmbeddingModels.get_model_config(embedding_model)
+        embeddings = RegisteredEmbeddings(embedding_model, self.embedding_registry)
+        return CachedEmbeddings(
+            embeddings,
+            model_config["name"],
+            self.embedding_cache,
+            query_cache=self.query_embedding_cache,
+        )
 
-        if model_config.get("type") == EmbeddingModelType.OLLAMA.value:
-            return OllamaEmbeddings(
-                model=model_config["name"],
-                base_url=OLLAMA_BASE_URL,
-            )
-        else:
-            return HuggingFaceEmbeddings(
-                model_name=model_config["name"],
-                model_kwargs={"device": device},
-                encode_kwargs={"normalize_embeddings": True},
-                multi_process=True,
+    def get_retrieval_chain(
+        self,
+        ollama_model: str,
+        rerank: bool = False,
+        temperature: float = None,
+    ) -> PackedRetrievalQA:
+        """
+        Get the retrieval QA chain for the current experiment.
+
+        Chains are shared per (experiment revision, model, temperature,
+        rerank) and carry no callbacks; pass streaming handlers through the
+        ``config`` argument of ``invoke``.
+
+        Args:
+            ollama_model: Ollama model answering the question
+            rerank: Rerank retrieved chunks with the cross-encoder
+            temperature: LLM temperature setting
+
+        Returns:
+            Configured chain packing documents into the model's context window
+        """
+        if temperature is None:
+            temperature = DEFAULT_TEMPERATURE
+        if self.experiment_revision is None:
+            return self._create_retrieval_chain(ollama_model, rerank, temperature)
+
+        key = (self.experiment_revision, ollama_model, temperature, rerank)
+        chain = self.chain_cache.get(key)
+        if chain is None:
+            chain = self._create_retrieval_chain(ollama_model, rerank, temperature)
+            self.chain_cache.put(key, chain)
+        return chain
+
+    def _create_retrieval_chain(self, ollama_model: str, rerank: bool, temperature: float) -> PackedRetrievalQA:
+        """Build a retrieval QA chain around the current retriever."""
+        retriever = self.retriever
+        if rerank:
+            # The retriever may be shared with other sessions, so attach the reranker to a copy
+            retriever = retriever.model_copy(update={"reranker": self.reranker})
+
+        if self.experiment_revision is not None:
+            search_kwargs = repr(sorted(retriever.search_kwargs.items()))
+            # Chains are shared, so sessions asking at the same time are batched together
+            retriever = BatchedRetriever(retriever=retriever, scheduler=self.retrieval_scheduler)
+            retriever = CachedRetriever(
+                retriever=retriever,
+                cache=self.retrieval_cache,
+                namespace=(self.experiment_revision, search_kwargs, rerank),
             )
 
-    def get_retrieval_chain(self, ollama_model: str, stream_handler=None):
+        # Leave room in the context window for the generated answer
+        max_tokens = get_context_length(ollama_model) - CONTEXT_RESERVED_TOKENS
+        return PackedRetrievalQA.from_chain_type(
+            llm=get_llm(ollama_model, temperature),
+            chain_type="stuff",
+            retriever=retriever,
+            return_source_documents=True,
+            chain_type_kwargs={"prompt": QA_PROMPT},
+            assembler=ContextAssembler(max_tokens=max_tokens),
+            prompt_tokens=estimate_tokens(QA_PROMPT.template),
+        )
+
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        rerank: bool = False,
+        batch_size: int = None,
+    ) -> list[list[Document]]:
         """
-        Create retrieval QA chain.
+        Retrieve documents for many queries with batched embedding and search.
+
+        Args:
+            queries: Query texts
+            rerank: Rerank retrieved chunks with the cross-encoder
+            batch_size: Queries embedded and searched together
 
         Returns:
-            Configured RetrievalQA chain
+            Retrieved parent documents per query, in query order
         """
-        llm = Ollama(
-            model=ollama_model,
-            temperature=DEFAULT_TEMPERATURE,
-            base_url=OLLAMA_BASE_URL,
-            callbacks=[stream_handler] if stream_handler else None,
-        )
+        if self.retriever is None:
+            raise ValueError("No experiment is loaded")
 
-        template = """
-        Context: {context}
-        Question: {question}
+        retriever = self.retriever
+        if rerank:
+            retriever = retriever.model_copy(update={"reranker": self.reranker})
 
-        Provide a detailed, well-structured answer based only on the above context.
+        batch_size = batch_size or RETRIEVAL_BATCH_SIZE
+        results = []
+        for start in range(0, len(queries), batch_size):
+            results.extend(retriever.retrieve_batch(queries[start:start + batch_size]))
+        return results
+
+    def answer_question(
+        self,
+        question: str,
+        ollama_model: str,
+        stream_handler=None,
+        rerank: bool = False,
+    ) -> dict:
         """
+        Answer a question, reusing the answer to a near-identical earlier question.
 
-        prompt = PromptTemplate(
-            template=template,
-            input_variables=["context", "question"],
-        )
+        Args:
+            question: User question
+            ollama_model: Ollama model answering the question
+            stream_handler: Optional callback streaming a newly generated answer
+            rerank: Rerank retrieved chunks with the cross-encoder
 
-        return RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=self.retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": prompt},
-        )
+        Returns:
+            RetrievalQA result with "result" and "source_documents", plus
+            "cached" telling whether it came from the answer cache
+        """
+        chain = self.get_retrieval_chain(ollama_model, rerank=rerank)
+        config = {"callbacks": [stream_handler]} if stream_handler else None
+        if self.experiment_revision is None:
+            return {**chain.invoke({"query": question}, config=config), "cached": False}
+
+        namespace = (self.experiment_revision, ollama_model, rerank)
+        # The query embedding cache lets retrieval reuse this embedding on a miss
+        embedding = self.retriever.vectorstore.embedding_function.embed_query(question)
+        cached = self.answer_cache.lookup(namespace, question, embedding)
+        if cached is not None:
+            logging.info(f"Answer cache: {self.answer_cache.stats()}")
+            return {**cached, "cached": True}
+
+        result = chain.invoke({"query": question}, config=config)
+        self.answer_cache.store(namespace, question, embedding, result)
+        return {**result, "cached": False}
 
     def save_experiment(
         self,
         experiment_name: str,
         config: dict,
     ) -> bool:
-        """Save current experiment state."""
-        return self.experiment_store.save(
-            experiment_name,
-            self.retriever,
-            config,
-        )
+        """Save current experiment state, including build statistics."""
+        return self.save_retriever(experiment_name, self.retriever, {**config, **self.build_info})
+
+    def save_retriever(self, experiment_name: str, retriever, config: dict) -> bool:
+        """Save a retriever built with build_retriever as an experiment."""
+        self._invalidate_experiment(experiment_name)
+        return self.experiment_store.save(experiment_name, retriever, config)
 
     def load_experiment(self, experiment_name: str) -> tuple[bool, dict]:
-        """Load a saved experiment."""
+        """Load a saved experiment, sharing it with other sessions through the cache."""
         try:
-            retriever, config = self.experiment_store.load(experiment_name)
+            # Read the revision first so a concurrent update can only make it stale, never newer
+            revision = self.experiment_cache.revision(self.experiment_store, experiment_name)
+            retriever, config = self.experiment_cache.get(self.experiment_store, experiment_name)
             if retriever and config:
+                # Load the embedding model now rather than on the first query
+                self.embedding_registry.warm_up([config.get("embedding_model")])
                 self.retriever = retriever
+                self._set_revision(revision)
                 return True, config
             return False, {}
         except Exception as e:
             logging.error(f"Error loading experiment {experiment_name}: {str(e)}")
             return False, {}
 
+    def add_documents_to_experiment(
+        self,
+        experiment_name: str,
+        pdf_files: list,
+        progress_callback=None,
+    ) -> int:
+        """
+        Add PDF files to a saved experiment without rebuilding it.
+
+        Files whose names are already part of the experiment are replaced.
+
+        Args:
+            experiment_name: Name of the saved experiment
+            pdf_files: List of uploaded PDF file objects
+            progress_callback: Optional callback receiving per-stage progress
+
+        Returns:
+            Number of pages added
+        """
+        if not pdf_files:
+            raise ValueError("No PDF files provided for processing")
+
+        retriever, config = self._load_for_update(experiment_name)
+        new_names = [pdf_file.name for pdf_file in pdf_files]
+        self._remove_sources(retriever, new_names)
+
+        pipeline = IngestionPipeline(
+            embeddings=retriever.vectorstore.embedding_function,
+            parent_splitter=retriever.parent_splitter,
+            child_splitter=retriever.child_splitter,
+            docstore=retriever.docstore,
+            parser=self.pdf_parser,
+            id_key=retriever.id_key,
+            progress_callback=progress_callback,
+            build_sparse_index=retriever.sparse_index is not None,
+        )
+        result = pipeline.run(pdf_files, vectorstore=retriever.vectorstore)
+        if result.sparse_index is not None:
+            retriever.sparse_index = retriever.sparse_index.extend(result.sparse_index)
+
+        documents = [name for name in config["documents"] if name not in new_names]
+        self._save_update(experiment_name, retriever, config, documents + new_names)
+        return result.pages
+
+    def remove_documents_from_experiment(
+        self,
+        experiment_name: str,
+        file_names: list[str],
+    ) -> int:
+        """
+        Remove PDF files from a saved experiment without rebuilding it.
+
+        Args:
+            experiment_name: Name of the saved experiment
+            file_names: Names of the uploaded files to remove
+
+        Returns:
+            Number of child chunks removed
+        """
+        retriever, config = self._load_for_update(experiment_name)
+        removed = self._remove_sources(retriever, file_names)
+
+        if retriever.vectorstore.index.ntotal == 0:
+            raise ValueError("Cannot remove every document from an experiment")
+
+        documents = [name for name in config["documents"] if name not in file_names]
+        self._save_update(experiment_name, retriever, config, documents)
+        return removed
+
+    def _load_for_update(self, experiment_name: str) -> tuple[HybridParentDocumentRetriever, dict]:
+        """Load a saved experiment and make sure its config lists its documents."""
+        retriever, config = self.experiment_store.load(experiment_name, read_only=False)
+        if not retriever or not config:
+            raise ValueError(f"Experiment not found: {experiment_name}")
+
+        if "documents" not in config:
+            config["documents"] = sorted(docstore_sources(retriever.vectorstore.docstore))
+
+        return retriever, config
+
+    def _remove_sources(self, retriever: HybridParentDocumentRetriever, file_names: list[str]) -> int:
+        """Delete every child chunk and parent document of the given files."""
+        chunks = find_source_chunks(retriever.vectorstore, file_names, retriever.id_key)
+        child_ids = [child_id for _, child_id, _ in chunks]
+        parent_ids = {parent_id for _, _, parent_id in chunks if parent_id is not None}
+
+        if retriever.sparse_index is not None and child_ids:
+            retriever.sparse_index = retriever.sparse_index.remove(
+                position for position, _, _ in chunks if position is not None
+            )
+
+        removed = delete_vectors(retriever.vectorstore, child_ids)
+        retriever.docstore.mdelete(list(parent_ids))
+        return removed
+
+    def _save_update(
+        self,
+        experiment_name: str,
+        retriever: HybridParentDocumentRetriever,
+        config: dict,
+        documents: list[str],
+    ) -> None:
+        """Persist an incrementally updated experiment."""
+        config["documents"] = documents
+        config["total_documents"] = len(documents)
+        config["index"] = {
+            **config.get("index", {}),
+            **index_summary(retriever.vectorstore.index),
+        }
+        config["retrieval"] = _retrieval_summary(retriever.sparse_index)
+
+        if not self.experiment_store.save(experiment_name, retriever, config):
+            raise RuntimeError(f"Failed to save experiment {experiment_name}")
+        self._invalidate_experiment(experiment_name)
+
+        self.retriever = retriever
+        self.vectorstore = retriever.vectorstore
+        self.store = retriever.docstore
+        self._set_revision(self.experiment_cache.revision(self.experiment_store, experiment_name))
+
+    def _set_revision(self, revision: Optional[tuple]) -> None:
+        """Switch to a new experiment revision, dropping results of an unsaved one."""
+        previous = self.experiment_revision
+        if previous is not None and previous != revision and previous[0] is None:
+            self._discard_revisions(lambda candidate: candidate == previous)
+        self.experiment_revision = revision
+
+    def _invalidate_experiment(self, experiment_name: str) -> None:
+        """Drop the loaded copies and everything cached for a saved experiment."""
+        self.experiment_cache.invalidate(self.experiment_store, experiment_name)
+        path = self.experiment_store.experiment_path(experiment_name)
+        self._discard_revisions(lambda revision: revision[0] == path)
+
+    def _discard_revisions(self, predicate) -> None:
+        """Drop chains, retrieval results and answers of matching experiment revisions."""
+        self.chain_cache.discard_where(lambda key: predicate(key[0]))
+        self.retrieval_cache.discard_where(lambda key: predicate(key[0]))
+        self.answer_cache.discard_where(lambda namespace: predicate(namespace[0]))
+
     def list_experiments(self) -> list[tuple[str, dict]]:
         """List all saved experiments."""
         return self.experiment_store.list_all()
 
     def delete_experiment(self, experiment_name: str) -> bool:
         """Delete a saved experiment."""
+        self._invalidate_experiment(experiment_name)
         return self.experiment_store.delete(experiment_name)
 
 
+def _retrieval_summary(sparse_index) -> dict:
+    """Describe the retrieval mode and sparse index for the experiment config."""
+    if sparse_index is None:
+        return {"mode": RetrievalMode.DENSE.value}
+    return {"mode": RetrievalMode.HYBRID.value, **sparse_index.stats()}
+
+
+def _profile_lines(profile: dict) -> list[str]:
+    """Format the ingestion profile of an experiment config for display."""
+    if not profile:
+        return ["• Not recorded"]
+
+    def memory(metrics: dict) -> str:
+        text = f"{metrics['peak_rss_mb']} MB peak RSS"
+        if metrics.get("peak_traced_mb") is not None:
+            text += f", {metrics['peak_traced_mb']} MB traced"
+        return text
+
+    lines = [
+        f"• Total: {profile['wall_seconds']} s wall, {profile['cpu_seconds']} s CPU "
+        f"on {profile.get('cpu_count', 'N/A')} cores, {memory(profile)}",
+        f"• Throughput: {profile['pages_per_second']} pages/s, "
+        f"{profile['chunks_per_second']} chunks/s",
+        "• Memory is the peak of the whole app process, including loaded models",
+    ]
+    concurrent = profile.get("concurrent_builds")
+    if concurrent:
+        lines.append(
+            f"• ⚠️ {concurrent} other builds ran at the same time; "
+            "memory and total CPU include theirs"
+        )
+    elif concurrent is None:
+        lines.append("• ⚠️ Not known whether other builds ran at the same time")
+    for stage, metrics in profile.get("stages", {}).items():
+        unit = "pages" if stage in (IngestionStage.PARSE.value, IngestionStage.SPLIT.value) else "chunks"
+        lines.append(
+            f"• {stage.capitalize()}: {metrics['busy_seconds']} s busy of {metrics['wall_seconds']} s, "
+            f"{metrics['cpu_seconds']} s CPU, {memory(metrics)}, "
+            f"{metrics['items_per_second']} {unit}/s"
+        )
+    return lines
+
+
 def get_rag_configurations(rag_system: RAGEngine) -> Optional[str]:
     """
     Get formatted display of all RAG configurations.
@@ -286,9 +627,12 @@ def get_rag_configurations(rag_system: RAGEngine) -> Optional[str]:
                 "llm_model": config.get("llm_model", "N/A"),
                 "embedding_model": config.get("embedding_model", "N/A"),
                 "chunk_size": config.get("chunk_size", 0),
+                "chunk_unit": config.get("chunk_unit", ChunkUnit.CHARACTERS.value),
                 "top_k": config.get("top_k", 0),
                 "total_documents": config.get("total_documents", 0),
             }
+            index_info = config.get("index", {})
+            retrieval_info = config.get("retrieval", {"mode": RetrievalMode.DENSE.value})
 
             display_text = [
                 "",
@@ -302,10 +646,24 @@ def get_rag_configurations(rag_system: RAGEngine) -> Optional[str]:
                 "",
                 "📊 Processing Settings",
                 "-------------------",
-                f"• Child Chunk Size: {formatted_config['chunk_size']} characters",
-                f"• Parent Chunk Size: {formatted_config['chunk_size'] * PARENT_CHUNK_MULTIPLIER} characters",
+                f"• Child Chunk Size: {formatted_config['chunk_size']} {formatted_config['chunk_unit']}",
+                f"• Parent Chunk Size: {formatted_config['chunk_size'] * PARENT_CHUNK_MULTIPLIER} {formatted_config['chunk_unit']}",
                 f"• Top K Documents: {formatted_config['top_k']}",
                 "",
+                "🗂️ Vector Index",
+                "-------------------",
+                f"• Index Type: {index_info.get('type', 'flat')}",
+                f"• Vectors: {index_info.get('vectors', 'N/A')}",
+                f"• Memory: {index_info.get('memory_bytes', 0) / 1024 ** 2:.1f} MB",
+                f"• Build Time: {index_info.get('build_seconds', 'N/A')} s",
+                f"• Query Latency: {index_info.get('query_latency_ms', 'N/A')} ms",
+                f"• Retrieval: {retrieval_info['mode']}",
+                f"• BM25 Terms: {retrieval_info.get('terms', 'N/A')}",
+                "",
+                "⏱️ Ingestion Profile",
+                "-------------------",
+                *_profile_lines(config.get("ingestion_profile", {})),
+                "",
                 "📚 Document Information",
                 "-------------------",
                 f"• Total Uploaded Files: {formatted_config['total_documents']}",
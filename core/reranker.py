@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from config import (
+    RERANK_MODEL,
+    RERANK_MAX_LENGTH,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_SCORE_CACHE_SIZE,
+)
+from core.cache import LRUCache
+from core.persistence.embedding_cache import normalize_text, text_hash
+
+# Weight of the newest measurement in the per-pair latency estimate
+_LATENCY_SMOOTHING = 0.2
+
+# Skipped requests after which the smallest useful batch is scored anyway,
+# so an estimate inflated by a slow moment can come back down
+_LATENCY_PROBE_INTERVAL = 20
+
+
+def _chunk_key(chunk: Document) -> str:
+    return chunk.id or text_hash(chunk.page_content)
+
+
+class CrossEncoderReranker:
+    """
+    Batched CPU cross-encoder reranker for retrieved child chunks.
+
+    All uncached (query, chunk) pairs of a request are scored in a single
+    forward pass. Scores are cached by normalized query and chunk id, and a
+    running estimate of the per-pair cost is used to rerank only as many
+    candidates as fit in the latency budget, or none if even the requested
+    number of results would not fit. The model is loaded and warmed up
+    before any timing, and while reranking is skipped every
+    _LATENCY_PROBE_INTERVAL-th request still scores the requested number of
+    results, so the estimate keeps tracking the actual cost.
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        latency_budget_ms: float = None,
+        cache_size: int = None,
+        max_length: int = None,
+    ):
+        """
+        Initialize CrossEncoderReranker.
+
+        Args:
+            model_name: Sentence-transformers cross-encoder model
+            latency_budget_ms: Maximum expected scoring time per request
+            cache_size: Number of cached (query, chunk) scores
+            max_length: Maximum tokens per query/chunk pair
+        """
+        self.model_name = model_name or RERANK_MODEL
+        self.latency_budget_ms = latency_budget_ms or RERANK_LATENCY_BUDGET_MS
+        self.max_length = max_length or RERANK_MAX_LENGTH
+        self.scores = LRUCache(max_entries=cache_size or RERANK_SCORE_CACHE_SIZE)
+        self.pair_latency_ms: Optional[float] = None
+        self.reranked = 0
+        self.skipped = 0
+        self._skipped_since_probe = 0
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        """Load and warm up the cross-encoder on first use."""
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+                # The first forward pass pays one-off setup costs that must not
+                # end up in the latency estimate
+                model.predict([("warm up", "warm up")], show_progress_bar=False)
+                self._model = model
+            return self._model
+
+    def rerank(
+        self,
+        query: str,
+        candidates: list[tuple[Document, float]],
+        min_results: int,
+    ) -> list[tuple[Document, float]]:
+        """
+        Order candidate chunks by cross-encoder relevance.
+
+        Args:
+            query: User query
+            candidates: (chunk, first-stage score) pairs in ranking order
+            min_results: Fewest candidates worth reranking within the budget
+
+        Returns:
+            Reranked (chunk, cross-encoder score) pairs, followed by any that
+            did not fit the budget scored just below the reranked ones; the
+            candidates unchanged if reranking was skipped
+        """
+        if not candidates:
+            return candidates
+
+        scored = candidates
+        candidates = [candidate for candidate, _ in scored]
+
+        normalized = normalize_text(query)
+        keys = [_chunk_key(candidate) for candidate in candidates]
+        cached = {key: self.scores.get((normalized, key)) for key in keys}
+
+        limit = len(candidates)
+        if self.pair_latency_ms:
+            uncached = 0
+            for position, key in enumerate(keys):
+                if cached[key] is None:
+                    uncached += 1
+                    if uncached * self.pair_latency_ms > self.latency_budget_ms:
+                        limit = position
+                        break
+
+        wanted = min(min_results, len(candidates))
+        if limit < wanted:
+            with self._lock:
+                self._skipped_since_probe += 1
+                probe = self._skipped_since_probe >= _LATENCY_PROBE_INTERVAL
+                if probe:
+                    self._skipped_since_probe = 0
+            if not probe:
+                self.skipped += 1
+                return scored
+            # Re-measure on the smallest batch worth reranking
+            limit = wanted
+        else:
+            probe = False
+
+        missing = [
+            (key, candidate)
+            for key, candidate in zip(keys[:limit], candidates[:limit])
+            if cached[key] is None
+        ]
+        if missing:
+            model = self._get_model()
+            start = time.perf_counter()
+            scores = model.predict(
+                [(query, candidate.page_content) for _, candidate in missing],
+                batch_size=len(missing),
+                show_progress_bar=False,
+            )
+            self._record_latency((time.perf_counter() - start) * 1000 / len(missing), replace=probe)
+
+            for (key, _), score in zip(missing, scores):
+                cached[key] = float(score)
+                self.scores.put((normalized, key), float(score))
+
+        self.reranked += 1
+        order = sorted(range(limit), key=lambda i: cached[keys[i]], reverse=True)
+        reranked = [(candidates[i], cached[keys[i]]) for i in order]
+        if not reranked:
+            return scored
+        floor = reranked[-1][1]
+        return reranked + [(candidate, floor - 1.0) for candidate in candidates[limit:]]
+
+    def _record_latency(self, pair_ms: float, replace: bool = False) -> None:
+        """Update the per-pair estimate; a probe's fresh measurement replaces it outright."""
+        if self.pair_latency_ms is None or replace:
+            self.pair_latency_ms = pair_ms
+        else:
+            self.pair_latency_ms += _LATENCY_SMOOTHING * (pair_ms - self.pair_latency_ms)
+        logging.debug(f"Cross-encoder latency estimate: {self.pair_latency_ms:.2f} ms per pair")
+
+    def stats(self) -> dict:
+        """Return rerank/skip counters, score cache stats and the latency estimate."""
+        return {
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "pair_latency_ms": self.pair_latency_ms,
+            "score_cache": self.scores.stats(),
+        }
+
+
+# Process-wide reranker shared by every RAGEngine
+cross_encoder_reranker = CrossEncoderReranker()
@@ -0,0 +1,297 @@
+from typing import Optional
+
+import faiss
+import numpy as np
+from langchain.retrievers import ParentDocumentRetriever
+from langchain.retrievers.multi_vector import SearchType
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from config import (
+    HYBRID_RRF_K,
+    HYBRID_FETCH_MULTIPLIER,
+    RERANK_FETCH_MULTIPLIER,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL_SECONDS,
+)
+from core.batch_scheduler import MicroBatchScheduler
+from core.cache import LRUCache
+from core.persistence.embedding_cache import embed_queries, normalize_text
+from core.reranker import CrossEncoderReranker
+from core.sparse_index import SparseIndex
+
+# Metadata key holding the relevance score of a retrieved parent
+RELEVANCE_SCORE_KEY = "relevance_score"
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = HYBRID_RRF_K) -> list[tuple[str, float]]:
+    """
+    Merge ranked id lists with reciprocal rank fusion.
+
+    Args:
+        rankings: Ranked lists of ids, best first
+        k: Damping constant; larger values flatten the rank contribution
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridParentDocumentRetriever(ParentDocumentRetriever):
+    """
+    Parent document retriever with hybrid ranking and optional reranking.
+
+    Child chunks are ranked both by FAISS similarity and by a precomputed
+    BM25 index, the two rankings are merged with reciprocal rank fusion,
+    and the parents of the best fused chunks are returned. With a reranker,
+    more candidates are fetched and reordered by a cross-encoder before the
+    best parents are kept. Without a sparse index or reranker it ranks like
+    ParentDocumentRetriever.
+
+    Every returned parent is a copy carrying the score of its best chunk
+    under ``RELEVANCE_SCORE_KEY``, higher meaning more relevant. Scores are
+    only comparable within one result list.
+    """
+
+    sparse_index: Optional[SparseIndex] = None
+    """BM25 index over child chunks, numbered by FAISS position."""
+    rrf_k: int = HYBRID_RRF_K
+    """Reciprocal rank fusion damping constant."""
+    fetch_multiplier: int = HYBRID_FETCH_MULTIPLIER
+    """Candidates fetched from each ranking per requested chunk."""
+    reranker: Optional[CrossEncoderReranker] = None
+    """Cross-encoder reordering the candidate chunks."""
+    rerank_multiplier: int = RERANK_FETCH_MULTIPLIER
+    """Candidates reranked per requested parent."""
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        if self.search_type != SearchType.similarity:
+            return super()._get_relevant_documents(query, run_manager=run_manager)
+
+        k = self.search_kwargs.get("k", 4)
+        if self.reranker is None:
+            return self._parents_of(self._rank_children(query, k))
+
+        candidates = self._rank_children(query, k * self.rerank_multiplier)
+        reranked = self.reranker.rerank(query, candidates, min_results=k)
+        return self._parents_of(reranked, limit=k)
+
+    def retrieve_batch(self, queries: list[str]) -> list[list[Document]]:
+        """
+        Retrieve parents for many queries at once.
+
+        All queries are embedded in one batch and searched with a single
+        FAISS call, and the chunks and parents of every query are fetched
+        with one docstore lookup each. Results match invoking the retriever
+        per query, except that search filters are not supported here.
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            Scored parent documents per query, in query order
+        """
+        if not queries:
+            return []
+        if self.search_type != SearchType.similarity or "filter" in self.search_kwargs:
+            return [self.invoke(query) for query in queries]
+
+        k = self.search_kwargs.get("k", 4)
+        rank_k = k * self.rerank_multiplier if self.reranker is not None else k
+        fetch_k = rank_k * self.fetch_multiplier if self.sparse_index is not None else rank_k
+
+        vectorstore = self.vectorstore
+        vectors = np.asarray(embed_queries(vectorstore.embedding_function, queries), dtype=np.float32)
+        if getattr(vectorstore, "_normalize_L2", False):
+            faiss.normalize_L2(vectors)
+        distances, positions = vectorstore.index.search(vectors, fetch_k)
+
+        sparse_positions = [
+            [position for position, _ in self.sparse_index.search(query, fetch_k)]
+            if self.sparse_index is not None else []
+            for query in queries
+        ]
+        wanted = set(positions[positions >= 0].tolist()).union(*sparse_positions)
+        children = self._children_by_position(sorted(wanted))
+
+        ranked = []
+        for query, row_positions, row_distances, sparse in zip(
+            queries, positions.tolist(), distances.tolist(), sparse_positions
+        ):
+            candidates = [
+                (children[position], self._relevance(distance))
+                for position, distance in zip(row_positions, row_distances)
+                if position in children
+            ]
+            if self.sparse_index is not None:
+                sparse_children = [children[position] for position in sparse if position in children]
+                candidates = self._fuse(candidates, sparse_children, rank_k)
+            if self.reranker is not None:
+                candidates = self.reranker.rerank(query, candidates, min_results=k)
+            ranked.append(self._select_parents(candidates, limit=k))
+
+        parent_ids = list(dict.fromkeys(parent_id for scores in ranked for parent_id in scores))
+        parents = dict(zip(parent_ids, self.docstore.mget(parent_ids)))
+        return [self._scored_parents(scores, parents) for scores in ranked]
+
+    def _rank_children(self, query: str, k: int) -> list[tuple[Document, float]]:
+        """Rank the k best child chunks, fusing dense and BM25 rankings if possible."""
+        if self.sparse_index is None:
+            return self._dense_children(query, k)
+
+        fetch_k = k * self.fetch_multiplier
+        positions = [position for position, _ in self.sparse_index.search(query, fetch_k)]
+        return self._fuse(self._dense_children(query, fetch_k), self._children_at(positions), k)
+
+    def _fuse(
+        self,
+        dense: list[tuple[Document, float]],
+        sparse: list[Document],
+        k: int,
+    ) -> list[tuple[Document, float]]:
+        """Merge dense and BM25 chunk rankings into the k best chunks."""
+        dense = [child for child, _ in dense]
+        dense_ids = [child.id or f"dense-{rank}" for rank, child in enumerate(dense)]
+        children = dict(zip(dense_ids, dense))
+        children.update({child.id: child for child in sparse})
+
+        fused = reciprocal_rank_fusion(
+            [dense_ids, [child.id for child in sparse]],
+            k=self.rrf_k,
+        )
+        return [(children[child_id], score) for child_id, score in fused[:k]]
+
+    def _dense_children(self, query: str, k: int) -> list[tuple[Document, float]]:
+        """Rank child chunks by vector similarity, higher scores first."""
+        vectorstore = self.vectorstore
+        results = vectorstore.similarity_search_with_score(query, **{**self.search_kwargs, "k": k})
+        return [(child, self._relevance(distance)) for child, distance in results]
+
+    def _relevance(self, distance: float) -> float:
+        """Turn a FAISS distance into a score where higher is more relevant."""
+        if getattr(self.vectorstore, "distance_strategy", None) == DistanceStrategy.MAX_INNER_PRODUCT:
+            return float(distance)
+        return -float(distance)
+
+    def _parents_of(self, children: list[tuple[Document, float]], limit: int = None) -> list[Document]:
+        """Fetch the parents of ranked chunks in rank order, one entry per parent."""
+        parent_scores = self._select_parents(children, limit)
+        parent_ids = list(parent_scores)
+        return self._scored_parents(parent_scores, dict(zip(parent_ids, self.docstore.mget(parent_ids))))
+
+    def _select_parents(self, children: list[tuple[Document, float]], limit: int = None) -> dict[str, float]:
+        """Score the parents of ranked chunks by their best chunk, in rank order."""
+        parent_scores: dict[str, float] = {}
+        for child, score in children:
+            parent_id = child.metadata.get(self.id_key)
+            if parent_id is not None and parent_id not in parent_scores:
+                parent_scores[parent_id] = score
+                if limit is not None and len(parent_scores) >= limit:
+                    break
+        return parent_scores
+
+    @staticmethod
+    def _scored_parents(parent_scores: dict[str, float], parents: dict[str, Optional[Document]]) -> list[Document]:
+        """Copy fetched parents with their scores; parents may be shared with other requests."""
+        return [
+            Document(
+                id=doc.id if doc.id is not None else parent_id,
+                page_content=doc.page_content,
+                metadata={**doc.metadata, RELEVANCE_SCORE_KEY: score},
+            )
+            for parent_id, score in parent_scores.items()
+            if (doc := parents.get(parent_id)) is not None
+        ]
+
+    def _children_at(self, positions: list[int]) -> list[Document]:
+        """Look up the chunks stored at FAISS positions, keeping their order."""
+        found = self._children_by_position(positions)
+        return [found[position] for position in positions if position in found]
+
+    def _children_by_position(self, positions: list[int]) -> dict[int, Document]:
+        """Look up the chunks stored at FAISS positions."""
+        vectorstore = self.vectorstore
+        docstore = vectorstore.docstore
+        if hasattr(docstore, "mget_by_positions"):
+            return docstore.mget_by_positions(positions)
+
+        children = {}
+        for position in positions:
+            child_id = vectorstore.index_to_docstore_id.get(position)
+            child = docstore.search(child_id) if child_id is not None else None
+            if isinstance(child, Document):
+                if child.id is None:
+                    child.id = child_id
+                children[position] = child
+        return children
+
+
+class BatchedRetriever(BaseRetriever):
+    """
+    Retriever that lets a scheduler batch its queries with concurrent ones.
+
+    Sessions sharing the same wrapped retriever have their simultaneous
+    queries embedded and searched together.
+    """
+
+    retriever: HybridParentDocumentRetriever
+    """Retriever serving the batches."""
+    scheduler: MicroBatchScheduler
+    """Scheduler coalescing concurrent queries."""
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return self.scheduler.retrieve(self.retriever, query)
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Retriever that memoizes another retriever's results per query.
+
+    Results are cached under a namespace identifying the experiment revision
+    and retrieval settings, so a rebuilt or changed experiment never serves
+    stale documents. Cached documents are shared and must not be mutated.
+    """
+
+    retriever: BaseRetriever
+    """Retriever used on cache misses."""
+    cache: LRUCache
+    """Cache shared by all cached retrievers."""
+    namespace: tuple
+    """Experiment revision and retrieval settings prefixed to every key."""
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        key = (*self.namespace, normalize_text(query))
+        documents = self.cache.get(key)
+        if documents is None:
+            documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            self.cache.put(key, documents)
+        return list(documents)
+
+
+# Process-wide retrieval result cache shared by every RAGEngine
+retrieval_cache = LRUCache(
+    max_entries=RETRIEVAL_CACHE_SIZE,
+    ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS,
+)
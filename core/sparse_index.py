@@ -0,0 +1,293 @@
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+
+from config import BM25_K1, BM25_B
+
+# Words, plus identifiers joined by "-", "_", "." or "/" such as "AB-1234" or "v2.1"
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_COMPOUND_SPLIT = re.compile(r"[-_./]")
+_TERM_SEPARATOR = "\n"
+# Queries whose postings exceed 1/16 of the document count are scored densely
+_DENSE_SCORING_RATIO = 16
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase BM25 terms.
+
+    Compound identifiers are kept whole and also contribute their parts, so
+    "XR-2000" matches queries for "xr-2000" as well as "2000".
+    """
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in _COMPOUND_SPLIT.split(token) if part)
+    return terms
+
+
+class SparseIndex:
+    """
+    BM25 inverted index in compressed sparse row form.
+
+    Postings are stored per term as contiguous slices of a document index
+    array, with a BM25 weight precomputed for every posting. A query only
+    gathers the slices of its terms and sums them per document with
+    vectorized NumPy operations. Document numbers are the positions of the
+    matching chunks in the experiment's FAISS index.
+    """
+
+    def __init__(
+        self,
+        terms: list[str],
+        indptr: np.ndarray,
+        doc_indices: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = None,
+        b: float = None,
+    ):
+        """
+        Initialize SparseIndex.
+
+        Args:
+            terms: Vocabulary, where term i owns postings indptr[i]:indptr[i + 1]
+            indptr: Posting offsets per term
+            doc_indices: Document number of every posting
+            term_freqs: Term frequency of every posting
+            doc_lengths: Number of terms in every document
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.terms = terms
+        self.indptr = indptr.astype(np.int64, copy=False)
+        self.doc_indices = doc_indices.astype(np.int32, copy=False)
+        self.term_freqs = term_freqs.astype(np.float32, copy=False)
+        self.doc_lengths = doc_lengths.astype(np.float32, copy=False)
+        self.k1 = BM25_K1 if k1 is None else k1
+        self.b = BM25_B if b is None else b
+        self._term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self.weights = self._compute_weights()
+
+    @classmethod
+    def from_postings(
+        cls,
+        terms: list[str],
+        term_ids: np.ndarray,
+        doc_indices: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = None,
+        b: float = None,
+    ) -> "SparseIndex":
+        """Build an index from unordered (term, document, frequency) postings."""
+        # Drop terms without postings and renumber the rest
+        used = np.bincount(term_ids, minlength=len(terms)) > 0
+        remap = np.cumsum(used) - 1
+        terms = [term for term, keep in zip(terms, used) if keep]
+        term_ids = remap[term_ids]
+
+        order = np.lexsort((doc_indices, term_ids))
+        counts = np.bincount(term_ids, minlength=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(
+            terms,
+            indptr,
+            doc_indices[order],
+            term_freqs[order],
+            doc_lengths,
+            k1=k1,
+            b=b,
+        )
+
+    def _compute_weights(self) -> np.ndarray:
+        """Precompute the BM25 contribution of every posting."""
+        num_docs = len(self.doc_lengths)
+        if not num_docs or not len(self.doc_indices):
+            return np.zeros(len(self.doc_indices), dtype=np.float32)
+
+        doc_freqs = np.diff(self.indptr).astype(np.float32)
+        idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        avg_length = max(float(self.doc_lengths.mean()), 1.0)
+
+        posting_terms = np.repeat(np.arange(len(self.terms)), np.diff(self.indptr))
+        lengths = self.doc_lengths[self.doc_indices]
+        tf = self.term_freqs
+        norm = tf + self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        return (idf[posting_terms] * tf * (self.k1 + 1) / norm).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """
+        Score documents against a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            Up to k (document number, BM25 score) pairs, best first
+        """
+        term_ids = [
+            self._term_ids[term]
+            for term in dict.fromkeys(tokenize(query))
+            if term in self._term_ids
+        ]
+        if not term_ids or k <= 0:
+            return []
+
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_indices[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+
+        # Common terms touch many documents: a dense accumulator avoids sorting
+        if len(docs) * _DENSE_SCORING_RATIO > len(self):
+            scores = np.bincount(docs, weights=weights, minlength=len(self))
+            matched = np.flatnonzero(scores)
+            scores = scores[matched]
+        else:
+            matched, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights)
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(matched[i]), float(scores[i])) for i in top]
+
+    def _postings(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        term_ids = np.repeat(np.arange(len(self.terms)), np.diff(self.indptr))
+        return term_ids, self.doc_indices, self.term_freqs
+
+    def extend(self, other: "SparseIndex") -> "SparseIndex":
+        """Return an index with the documents of another index appended."""
+        term_ids, doc_indices, term_freqs = self._postings()
+        other_terms, other_docs, other_freqs = other._postings()
+
+        vocabulary = dict(self._term_ids)
+        remap = np.array(
+            [vocabulary.setdefault(term, len(vocabulary)) for term in other.terms],
+            dtype=np.int64,
+        )
+
+        return SparseIndex.from_postings(
+            list(vocabulary),
+            np.concatenate([term_ids, remap[other_terms]]),
+            np.concatenate([doc_indices, other_docs + len(self)]),
+            np.concatenate([term_freqs, other_freqs]),
+            np.concatenate([self.doc_lengths, other.doc_lengths]),
+            k1=self.k1,
+            b=self.b,
+        )
+
+    def remove(self, positions: Iterable[int]) -> "SparseIndex":
+        """Return an index without the given documents, renumbering the rest."""
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.fromiter(positions, dtype=np.int64)] = False
+        new_numbers = np.cumsum(keep) - 1
+
+        term_ids, doc_indices, term_freqs = self._postings()
+        kept = keep[doc_indices]
+        return SparseIndex.from_postings(
+            self.terms,
+            term_ids[kept],
+            new_numbers[doc_indices[kept]],
+            term_freqs[kept],
+            self.doc_lengths[keep],
+            k1=self.k1,
+            b=self.b,
+        )
+
+    def save(self, path: str) -> None:
+        """Write the index to an uncompressed NumPy archive."""
+        vocabulary = _TERM_SEPARATOR.join(self.terms).encode("utf-8")
+        np.savez(
+            path,
+            terms=np.frombuffer(vocabulary, dtype=np.uint8),
+            indptr=self.indptr,
+            doc_indices=self.doc_indices,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+            params=np.array([self.k1, self.b], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SparseIndex":
+        """Read an index written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = data["terms"].tobytes().decode("utf-8")
+            k1, b = data["params"]
+            return cls(
+                vocabulary.split(_TERM_SEPARATOR) if vocabulary else [],
+                data["indptr"],
+                data["doc_indices"],
+                data["term_freqs"],
+                data["doc_lengths"],
+                k1=float(k1),
+                b=float(b),
+            )
+
+    def stats(self) -> dict:
+        """Describe the index for the experiment config."""
+        arrays = (self.indptr, self.doc_indices, self.term_freqs, self.weights, self.doc_lengths)
+        return {
+            "documents": len(self),
+            "terms": len(self.terms),
+            "postings": int(len(self.doc_indices)),
+            "memory_bytes": int(sum(array.nbytes for array in arrays)),
+        }
+
+
+class SparseIndexBuilder:
+    """Accumulates term counts of documents in FAISS position order."""
+
+    def __init__(self):
+        self._vocabulary: dict[str, int] = {}
+        self._term_ids: list[np.ndarray] = []
+        self._doc_indices: list[np.ndarray] = []
+        self._term_freqs: list[np.ndarray] = []
+        self._doc_lengths: list[int] = []
+
+    @staticmethod
+    def analyze(text: str) -> Counter:
+        """Count the terms of a document; safe to call from any thread."""
+        return Counter(tokenize(text))
+
+    def add(self, term_counts: list[Counter]) -> None:
+        """Append analyzed documents in the order they were indexed."""
+        for counts in term_counts:
+            doc_index = len(self._doc_lengths)
+            self._doc_lengths.append(sum(counts.values()))
+            if not counts:
+                continue
+            self._term_ids.append(np.fromiter(
+                (self._vocabulary.setdefault(term, len(self._vocabulary)) for term in counts),
+                dtype=np.int64,
+                count=len(counts),
+            ))
+            self._term_freqs.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            self._doc_indices.append(np.full(len(counts), doc_index, dtype=np.int32))
+
+    def build(self) -> Optional[SparseIndex]:
+        """Create the index, or None if nothing was added."""
+        if not self._doc_lengths:
+            return None
+
+        def concatenate(arrays: list[np.ndarray], dtype) -> np.ndarray:
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+        return SparseIndex.from_postings(
+            list(self._vocabulary),
+            concatenate(self._term_ids, np.int64),
+            concatenate(self._doc_indices, np.int32),
+            concatenate(self._term_freqs, np.float32),
+            np.asarray(self._doc_lengths, dtype=np.float32),
+        )
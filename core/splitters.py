@@ -0,0 +1,475 @@
+import argparse
+import bisect
+import io
+import os
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from config import (
+    PARENT_CHUNK_MULTIPLIER,
+    CHUNK_OVERLAP_RATIO,
+    TEXT_SEPARATORS,
+)
+from config.constants import ChunkUnit
+from core.embedding_registry import ModelTokenizer
+
+Span = tuple[int, int]
+
+
+# Piece counts above which boundary arithmetic is vectorized
+_VECTORIZE_PIECES = 64
+
+
+class _SeparatorIndex:
+    """
+    Positions of single-character separators in a text, found in one vectorized scan each.
+
+    Optionally holds the (start, end) offsets of the text's tokens, to
+    measure ranges of the text in tokens.
+    """
+
+    def __init__(self, text: str, token_offsets: np.ndarray = None):
+        self.text = text
+        self.token_starts: Optional[np.ndarray] = None
+        self.token_ends: Optional[np.ndarray] = None
+        if token_offsets is not None:
+            self.token_starts = np.ascontiguousarray(token_offsets[:, 0])
+            self.token_ends = np.ascontiguousarray(token_offsets[:, 1])
+        self._codes: Optional[np.ndarray] = None
+        self._positions: dict[str, list[int]] = {}
+
+    def cuts(self, separator: str, start: int, end: int) -> list[int]:
+        """Offsets in [start, end) where the separator begins."""
+        if len(separator) > 1:
+            cuts = []
+            position = self.text.find(separator, start, end)
+            while position != -1:
+                cuts.append(position)
+                position = self.text.find(separator, position + len(separator), end)
+            return cuts
+
+        positions = self._positions.get(separator)
+        if positions is None:
+            if self._codes is None:
+                self._codes = np.frombuffer(self.text.encode("utf-32-le"), dtype=np.uint32)
+            positions = np.flatnonzero(self._codes == ord(separator)).tolist()
+            self._positions[separator] = positions
+        first = bisect.bisect_left(positions, start)
+        return positions[first:bisect.bisect_left(positions, end, first)]
+
+
+class OffsetTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    RecursiveCharacterTextSplitter that splits by character offsets.
+
+    Produces exactly the chunks of RecursiveCharacterTextSplitter, but
+    works on (start, end) offsets into the original text. Separator
+    positions are found once per text, and since the pieces between them
+    are contiguous, merging them into overlapping chunks only needs a
+    binary search over piece boundaries per chunk instead of a pass over
+    every piece. No intermediate strings are created. Settings the offset
+    algorithm cannot reproduce, such as regex separators or a custom length
+    function, fall back to the recursive implementation.
+    """
+
+    unit = ChunkUnit.CHARACTERS.value
+
+    def supports_offsets(self) -> bool:
+        """Whether split_spans reproduces split_text for these settings."""
+        return self._length_function is len and self._offset_settings()
+
+    def _offset_settings(self) -> bool:
+        return (
+            self._keep_separator in (True, "start")
+            and not self._is_separator_regex
+            and self._strip_whitespace
+        )
+
+    def index_texts(self, texts: list[str]) -> list[_SeparatorIndex]:
+        """Prepare texts for split_spans, to share between splitters."""
+        return [_SeparatorIndex(text) for text in texts]
+
+    def _measure(self, index: _SeparatorIndex, bounds: list[int]) -> tuple[list[int], list[int]]:
+        """
+        Cumulative lengths at each offset, in the splitter's unit.
+
+        Returns (upper, lower) such that the range bounds[i]:bounds[j]
+        measures upper[j] - lower[i]. They differ where a unit, such as a
+        token, straddles the offset.
+        """
+        return bounds, bounds
+
+    def split_text(self, text: str) -> list[str]:
+        if not self.supports_offsets():
+            return super().split_text(text)
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(
+        self,
+        text: str,
+        start: int = 0,
+        end: int = None,
+        index: "_SeparatorIndex" = None,
+    ) -> list[Span]:
+        """
+        Split a range of a text into chunk offsets.
+
+        Args:
+            text: Text to split
+            start: Offset of the first character of the range
+            end: Offset just past the range, the end of the text if None
+            index: Separator positions of the text, to share between calls
+
+        Returns:
+            (start, end) offsets of the chunks, in text order
+        """
+        spans: list[Span] = []
+        index = index or self.index_texts([text])[0]
+        self._split_span(index, start, len(text) if end is None else end, self._separators, spans)
+        return spans
+
+    def _split_span(
+        self,
+        index: _SeparatorIndex,
+        start: int,
+        end: int,
+        separators: list[str],
+        out: list[Span],
+    ) -> None:
+        # Use the first separator present in the range, like the recursive splitter
+        separator = separators[-1]
+        remaining: list[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if index.text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1:]
+                break
+
+        # Separators stay attached to the start of the following piece
+        if separator:
+            cuts = index.cuts(separator, start, end)
+            if cuts and cuts[0] == start:
+                del cuts[0]
+            bounds = [start, *cuts, end]
+        else:
+            bounds = list(range(start, end + 1))
+
+        # Pieces at least chunk_size long are split further; runs of shorter ones are merged
+        size = self._chunk_size
+        upper, lower = self._measure(index, bounds)
+        if len(bounds) > _VECTORIZE_PIECES:
+            oversized = np.flatnonzero(
+                np.subtract(upper[1:], lower[:-1]) >= size
+            ).tolist()
+        else:
+            oversized = [i for i in range(len(bounds) - 1) if upper[i + 1] - lower[i] >= size]
+
+        previous = 0
+        for piece in oversized:
+            if piece > previous:
+                self._merge_bounds(
+                    index.text,
+                    bounds[previous:piece + 1],
+                    upper[previous:piece + 1],
+                    lower[previous:piece + 1],
+                    out,
+                )
+            if remaining:
+                self._split_span(index, bounds[piece], bounds[piece + 1], remaining, out)
+            else:
+                out.append((bounds[piece], bounds[piece + 1]))
+            previous = piece + 1
+        if previous < len(bounds) - 1:
+            self._merge_bounds(index.text, bounds[previous:], upper[previous:], lower[previous:], out)
+
+    def _merge_bounds(
+        self,
+        text: str,
+        bounds: list[int],
+        upper: list[int],
+        lower: list[int],
+        out: list[Span],
+    ) -> None:
+        """
+        Merge contiguous pieces into chunks with overlap, as _merge_splits does.
+
+        Pieces i to j span bounds[i]:bounds[j + 1] and measure
+        upper[j + 1] - lower[i]. A chunk grows until the next piece no
+        longer fits, then drops leading pieces until it is within the
+        overlap and leaves room for that piece, or is empty.
+        """
+        size, overlap = self._chunk_size, self._chunk_overlap
+        last = len(bounds) - 1
+        head = 0
+        while True:
+            stop = bisect.bisect_right(upper, lower[head] + size, head + 2)
+            if stop > last:
+                break
+            piece = stop - 1
+            _append_stripped(text, bounds[head], bounds[piece], out)
+            target = min(max(upper[piece] - overlap, upper[piece + 1] - size), upper[piece])
+            head = bisect.bisect_left(lower, target, head, piece)
+        _append_stripped(text, bounds[head], bounds[last], out)
+
+
+class TokenOffsetTextSplitter(OffsetTextSplitter):
+    """
+    Offset splitter that measures chunk sizes in embedding model tokens.
+
+    Texts are tokenized once, in a batch, and the length of any range is
+    the number of tokens overlapping it, found by binary search over the
+    token offsets. Chunks therefore fill the model's input without
+    tokenizing each candidate piece. A chunk cut inside a word may
+    tokenize slightly differently on its own, which only happens for
+    words longer than the chunk size.
+    """
+
+    unit = ChunkUnit.TOKENS.value
+
+    def __init__(self, tokenizer: ModelTokenizer, **kwargs):
+        """
+        Initialize TokenOffsetTextSplitter.
+
+        Args:
+            tokenizer: Tokenizer of the embedding model
+            **kwargs: RecursiveCharacterTextSplitter arguments, sizes in tokens
+        """
+        super().__init__(length_function=tokenizer.count, **kwargs)
+        self.tokenizer = tokenizer
+
+    def supports_offsets(self) -> bool:
+        return self._offset_settings()
+
+    def index_texts(self, texts: list[str]) -> list[_SeparatorIndex]:
+        offsets = self.tokenizer.token_offsets(texts)
+        return [_SeparatorIndex(text, token_offsets) for text, token_offsets in zip(texts, offsets)]
+
+    def _measure(self, index: _SeparatorIndex, bounds: list[int]) -> tuple[list[int], list[int]]:
+        # Tokens starting before each offset, and tokens ending at or before it
+        upper = np.searchsorted(index.token_starts, bounds, side="left")
+        lower = np.searchsorted(index.token_ends, bounds, side="right")
+        return upper.tolist(), lower.tolist()
+
+
+def _append_stripped(text: str, start: int, end: int, out: list[Span]) -> None:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        out.append((start, end))
+
+
+def split_hierarchy(
+    text: str,
+    parent_splitter: OffsetTextSplitter,
+    child_splitter: OffsetTextSplitter,
+    index: _SeparatorIndex = None,
+) -> list[tuple[Span, list[Span]]]:
+    """
+    Split a text into parents and their children in one traversal.
+
+    Each parent's children are split within the parent's offsets right
+    after the parent is found, which gives the same chunks as splitting
+    the parent's text on its own.
+
+    Args:
+        text: Text to split
+        parent_splitter: Splitter of the parents
+        child_splitter: Splitter of the children, measuring in the same unit
+        index: The text prepared by index_texts, prepared here if None
+
+    Returns:
+        (parent offsets, child offsets) pairs in text order
+    """
+    index = index or child_splitter.index_texts([text])[0]
+    return [
+        ((start, end), child_splitter.split_spans(text, start, end, index=index))
+        for start, end in parent_splitter.split_spans(text, index=index)
+    ]
+
+
+def split_documents_hierarchy(
+    documents: Iterable[Document],
+    parent_splitter,
+    child_splitter,
+) -> list[tuple[Document, list[Document]]]:
+    """
+    Split documents into parent documents and the child chunks of each.
+
+    Offset splitters take the single-pass path; other splitters split the
+    parents and then each parent separately.
+    """
+    offsets = (
+        isinstance(parent_splitter, OffsetTextSplitter)
+        and type(parent_splitter) is type(child_splitter)
+        and getattr(parent_splitter, "tokenizer", None) is getattr(child_splitter, "tokenizer", None)
+        and parent_splitter.supports_offsets()
+        and child_splitter.supports_offsets()
+    )
+    documents = list(documents)
+    if not offsets:
+        return [
+            (parent, child_splitter.split_documents([parent]))
+            for parent in parent_splitter.split_documents(documents)
+        ]
+
+    result = []
+    indexes = child_splitter.index_texts([document.page_content for document in documents])
+    for document, index in zip(documents, indexes):
+        text = document.page_content
+        hierarchy = split_hierarchy(text, parent_splitter, child_splitter, index=index)
+        for (start, end), child_spans in hierarchy:
+            parent = Document(page_content=text[start:end], metadata=dict(document.metadata))
+            children = [
+                Document(page_content=text[a:b], metadata=dict(document.metadata))
+                for a, b in child_spans
+            ]
+            result.append((parent, children))
+    return result
+
+
+def create_splitters(
+    child_chunk_size: int,
+    separators: list[str] = None,
+    tokenizer: ModelTokenizer = None,
+) -> tuple[OffsetTextSplitter, OffsetTextSplitter]:
+    """
+    Create the parent and child splitters for a child chunk size.
+
+    Args:
+        child_chunk_size: Size of child chunks in characters, or tokens with a tokenizer
+        separators: Separators to split on, in order of preference
+        tokenizer: Embedding model tokenizer to measure chunk sizes in tokens
+
+    Returns:
+        Tuple of (parent_splitter, child_splitter)
+    """
+    separators = separators or TEXT_SEPARATORS
+    parent_chunk_size = child_chunk_size * PARENT_CHUNK_MULTIPLIER
+    child_overlap = int(child_chunk_size * CHUNK_OVERLAP_RATIO)
+    parent_overlap = int(parent_chunk_size * CHUNK_OVERLAP_RATIO)
+
+    if tokenizer is not None:
+        parent_splitter = TokenOffsetTextSplitter(
+            tokenizer,
+            chunk_size=parent_chunk_size,
+            chunk_overlap=parent_overlap,
+            separators=separators,
+        )
+        child_splitter = TokenOffsetTextSplitter(
+            tokenizer,
+            chunk_size=child_chunk_size,
+            chunk_overlap=child_overlap,
+            separators=separators,
+        )
+        return parent_splitter, child_splitter
+
+    parent_splitter = OffsetTextSplitter(
+        chunk_size=parent_chunk_size,
+        chunk_overlap=parent_overlap,
+        length_function=len,
+        separators=separators,
+    )
+
+    child_splitter = OffsetTextSplitter(
+        chunk_size=child_chunk_size,
+        chunk_overlap=child_overlap,
+        length_function=len,
+        separators=separators,
+    )
+
+    return parent_splitter, child_splitter
+
+
+def benchmark(pages: list[Document], child_chunk_size: int, repeat: int = 3) -> dict:
+    """
+    Compare the offset splitter with two RecursiveCharacterTextSplitter passes.
+
+    Args:
+        pages: Page documents to split
+        child_chunk_size: Size of child chunks in characters
+        repeat: Timing runs per implementation; the fastest is reported
+
+    Returns:
+        Timings, speedup, chunk counts and whether every chunk matched
+    """
+    parent_splitter, child_splitter = create_splitters(child_chunk_size)
+    recursive = [
+        RecursiveCharacterTextSplitter(
+            chunk_size=splitter._chunk_size,
+            chunk_overlap=splitter._chunk_overlap,
+            length_function=len,
+            separators=splitter._separators,
+        )
+        for splitter in (parent_splitter, child_splitter)
+    ]
+
+    def timed(splitters) -> tuple[float, list]:
+        best, result = float("inf"), None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = split_documents_hierarchy(pages, *splitters)
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    recursive_seconds, expected = timed(recursive)
+    offset_seconds, actual = timed((parent_splitter, child_splitter))
+
+    def contents(hierarchy) -> list:
+        return [
+            (parent.page_content, [child.page_content for child in children])
+            for parent, children in hierarchy
+        ]
+
+    return {
+        "pages": len(pages),
+        "parents": len(actual),
+        "children": sum(len(children) for _, children in actual),
+        "recursive_seconds": recursive_seconds,
+        "offset_seconds": offset_seconds,
+        "speedup": recursive_seconds / offset_seconds if offset_seconds else float("inf"),
+        "identical": contents(expected) == contents(actual),
+    }
+
+
+def main(argv: list[str] = None) -> None:
+    """Benchmark the splitters on PDF files: python -m core.splitters FILE.pdf ..."""
+    from core.pdf_parser import PDFParser
+
+    parser = argparse.ArgumentParser(description="Benchmark parent/child splitting.")
+    parser.add_argument("pdfs", nargs="+", help="PDF files to split")
+    parser.add_argument("--child-chunk-size", type=int, nargs="+", default=[100, 300, 1000])
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.pdfs:
+        with open(path, "rb") as f:
+            buffer = io.BytesIO(f.read())
+        buffer.name = os.path.basename(path)
+        files.append(buffer)
+    pages = [
+        Document(page_content=page.text, metadata=page.metadata)
+        for page in PDFParser().iter_pages(files)
+    ]
+
+    for size in args.child_chunk_size:
+        result = benchmark(pages, size)
+        print(
+            f"child size {size}: {result['parents']} parents, {result['children']} children, "
+            f"recursive {result['recursive_seconds'] * 1000:.1f} ms, "
+            f"offsets {result['offset_seconds'] * 1000:.1f} ms, "
+            f"{result['speedup']:.1f}x, identical: {result['identical']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from itertools import product
+from typing import Callable, Iterator, Optional
+
+from langchain_core.documents import Document
+
+from config import SWEEP_PROBE_QUERIES
+from config.constants import ChunkUnit, IndexType, RetrievalMode
+from core.ingestion import IngestionCancelled
+from core.pdf_parser import ParsedPage
+from core.splitters import create_splitters, split_documents_hierarchy
+
+# Words of a page's opening used as a probe query
+_PROBE_QUERY_WORDS = 12
+
+
+@dataclass(frozen=True)
+class SweepVariant:
+    """One combination of sweep parameters."""
+
+    embedding_model: str
+    chunk_size: int
+    top_k: int
+
+    def experiment_name(self, prefix: str) -> str:
+        return f"{prefix}-{self.embedding_model}-c{self.chunk_size}-k{self.top_k}"
+
+
+@dataclass
+class SweepResult:
+    """Outcome of building and saving one sweep variant."""
+
+    experiment_name: str
+    variant: SweepVariant
+    saved: bool = False
+    build_seconds: float = 0.0
+    shared_build: bool = False
+    parents: int = 0
+    children: int = 0
+    index_bytes: int = 0
+    retrieval_ms: float = 0.0
+    error: Optional[str] = None
+
+    def row(self) -> dict:
+        """Summary table row."""
+        return {
+            "Experiment": self.experiment_name,
+            "Embedding Model": self.variant.embedding_model,
+            "Chunk Size": self.variant.chunk_size,
+            "Top K": self.variant.top_k,
+            "Build (s)": round(self.build_seconds, 2),
+            "Shared Build": self.shared_build,
+            "Children": self.children,
+            "Index (MB)": round(self.index_bytes / 1024 ** 2, 2),
+            "Retrieval (ms)": round(self.retrieval_ms, 1),
+            "Status": "saved" if self.saved else f"failed: {self.error or 'not saved'}",
+        }
+
+
+class _ParsedPages:
+    """Parser stand-in serving pages parsed once to every build of a sweep."""
+
+    def __init__(self, pages: list[ParsedPage]):
+        self.pages = pages
+
+    def iter_pages(self, pdf_files: list, on_start=None, on_worker_cpu=None) -> Iterator[ParsedPage]:
+        if on_start:
+            on_start(len(self.pages))
+        yield from self.pages
+
+
+class _SharedSplits:
+    """
+    Parent/child splits of the sweep's pages for one chunk size.
+
+    Each page batch is split by the first build and handed as fresh copies
+    to later builds, since builds tag the chunks with their own parent ids.
+    """
+
+    def __init__(self, parent_splitter, child_splitter):
+        self.parent_splitter = parent_splitter
+        self.child_splitter = child_splitter
+        self._hierarchies: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, pages: list[Document]) -> list[tuple[Document, list[Document]]]:
+        key = tuple((page.metadata.get("source"), page.metadata.get("page")) for page in pages)
+        with self._lock:
+            hierarchy = self._hierarchies.get(key)
+        if hierarchy is None:
+            hierarchy = split_documents_hierarchy(pages, self.parent_splitter, self.child_splitter)
+            with self._lock:
+                self._hierarchies[key] = hierarchy
+        return [
+            (_copy_document(parent), [_copy_document(child) for child in children])
+            for parent, children in hierarchy
+        ]
+
+
+def _copy_document(document: Document) -> Document:
+    return Document(page_content=document.page_content, metadata=dict(document.metadata))
+
+
+def probe_queries(pages: list[ParsedPage], count: int = None) -> list[str]:
+    """Take the opening words of pages spread over the corpus as latency probes."""
+    count = count or SWEEP_PROBE_QUERIES
+    texts = [page.text for page in pages if page.text and page.text.strip()]
+    if not texts:
+        return []
+    step = max(len(texts) / count, 1)
+    picked = [texts[int(i * step)] for i in range(min(count, len(texts)))]
+    return [" ".join(text.split()[:_PROBE_QUERY_WORDS]) for text in picked]
+
+
+def _retrieval_latency(retriever, queries: list[str]) -> float:
+    """Mean milliseconds to retrieve parent documents for a query."""
+    if not queries:
+        return 0.0
+    start = time.perf_counter()
+    for query in queries:
+        retriever.invoke(query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+class ParameterSweep:
+    """
+    Builds and saves one experiment for every combination of sweep parameters.
+
+    The PDFs are parsed once for the whole sweep. Variants that differ only
+    in top_k share a build, since top_k only changes how many documents are
+    retrieved. Character-sized chunks are split once per chunk size and
+    shared by every embedding model; token-sized chunks depend on each
+    model's tokenizer and are split per build. Chunks that several builds
+    of an embedding model have in common are embedded once, through the
+    content-addressed embedding cache. Builds run one after another, so a
+    sweep takes a single slot of the ingestion job pool.
+    """
+
+    def __init__(self, engine, probe_count: int = None):
+        """
+        Initialize ParameterSweep.
+
+        Args:
+            engine: RAGEngine used to build and save experiments
+            probe_count: Probe queries used to measure retrieval latency
+        """
+        self.engine = engine
+        self.probe_count = probe_count or SWEEP_PROBE_QUERIES
+
+    def run(
+        self,
+        pdf_files: list,
+        experiment_prefix: str,
+        embedding_models: list[str],
+        chunk_sizes: list[int],
+        top_ks: list[int],
+        llm_model: str = None,
+        chunk_unit: str = ChunkUnit.CHARACTERS.value,
+        index_type: str = IndexType.AUTO.value,
+        retrieval_mode: str = RetrievalMode.HYBRID.value,
+        queries: list[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        build_progress_callback=None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> list[SweepResult]:
+        """
+        Build, measure and save every variant of the parameter grid.
+
+        Args:
+            pdf_files: Uploaded PDF file objects
+            experiment_prefix: Prefix of the saved experiment names
+            embedding_models: Embedding model names to sweep
+            chunk_sizes: Child chunk sizes to sweep, in chunk_unit
+            top_ks: Numbers of parent documents to retrieve to sweep
+            llm_model: LLM recorded in every experiment's config
+            chunk_unit: "characters", or "tokens" of the embedding model
+            index_type: FAISS index type, or "auto" to choose by corpus size
+            retrieval_mode: "hybrid" to also build a BM25 index, or "dense"
+            queries: Queries timing retrieval, taken from the pages if None
+            progress_callback: Called with (finished variants, total variants)
+            build_progress_callback: Receives the per-stage progress of the current build
+            cancel_event: threading.Event that stops the sweep once set, which
+                then raises IngestionCancelled; experiments saved so far are kept
+
+        Returns:
+            One result per variant, in grid order
+        """
+        if not experiment_prefix:
+            raise ValueError("Experiment prefix must be provided")
+        if not pdf_files:
+            raise ValueError("No PDF files provided for processing")
+
+        variants = [
+            SweepVariant(model, size, top_k)
+            for model, size, top_k in product(
+                dict.fromkeys(embedding_models), dict.fromkeys(chunk_sizes), dict.fromkeys(top_ks)
+            )
+        ]
+        if not variants:
+            raise ValueError("Select at least one embedding model, chunk size and top_k")
+
+        start = time.perf_counter()
+        pages = self.engine.pdf_parser.parse(pdf_files)
+        logging.info(f"Sweep parsed {len(pages)} pages in {time.perf_counter() - start:.1f}s")
+        parser = _ParsedPages(pages)
+        queries = queries or probe_queries(pages, self.probe_count)
+
+        # Grouped by chunk size first, so each size's shared splits can be dropped once used
+        groups: dict[tuple[int, str], list[SweepVariant]] = {}
+        for variant in sorted(variants, key=lambda variant: variant.chunk_size):
+            groups.setdefault((variant.chunk_size, variant.embedding_model), []).append(variant)
+
+        config = {
+            "llm_model": llm_model,
+            "total_documents": len(pdf_files),
+            "documents": [getattr(pdf_file, "name", None) for pdf_file in pdf_files],
+            "sweep": experiment_prefix,
+        }
+        settings = {
+            "chunk_unit": chunk_unit,
+            "index_type": index_type,
+            "retrieval_mode": retrieval_mode,
+            "build_progress_callback": build_progress_callback,
+            "cancel_event": cancel_event,
+        }
+
+        results: dict[SweepVariant, SweepResult] = {}
+        splits = None
+        for (chunk_size, _), group in groups.items():
+            if cancel_event is not None and cancel_event.is_set():
+                raise IngestionCancelled("Sweep was cancelled")
+            if chunk_unit == ChunkUnit.CHARACTERS.value:
+                if splits is None or splits[0] != chunk_size:
+                    splits = (
+                        chunk_size,
+                        _SharedSplits(*create_splitters(chunk_size)),
+                    )
+                settings["shared_splits"] = splits[1]
+            for result in self._build_group(
+                pdf_files, parser, group, experiment_prefix, config, settings, queries,
+            ):
+                results[result.variant] = result
+            if progress_callback:
+                progress_callback(len(results), len(variants))
+
+        logging.info(
+            f"Sweep {experiment_prefix}: {sum(r.saved for r in results.values())} of "
+            f"{len(variants)} experiments saved in {time.perf_counter() - start:.1f}s"
+        )
+        return [results[variant] for variant in variants]
+
+    def _build_group(
+        self,
+        pdf_files: list,
+        parser: _ParsedPages,
+        variants: list[SweepVariant],
+        prefix: str,
+        config: dict,
+        settings: dict,
+        queries: list[str],
+    ) -> list[SweepResult]:
+        """Build the index shared by variants differing only in top_k, then save each."""
+        first = variants[0]
+        start = time.perf_counter()
+        try:
+            retriever, build_info, ingestion = self.engine.build_retriever(
+                pdf_files,
+                embedding_model=first.embedding_model,
+                child_chunk_size=first.chunk_size,
+                top_k=first.top_k,
+                index_type=settings["index_type"],
+                retrieval_mode=settings["retrieval_mode"],
+                chunk_unit=settings["chunk_unit"],
+                parser=parser,
+                progress_callback=settings["build_progress_callback"],
+                cancel_event=settings["cancel_event"],
+                shared_splits=settings.get("shared_splits"),
+            )
+        except IngestionCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Sweep build of {first} failed: {str(e)}")
+            return [
+                SweepResult(variant.experiment_name(prefix), variant, error=str(e))
+                for variant in variants
+            ]
+        build_seconds = time.perf_counter() - start
+
+        # Probe queries should be timed cold, not served from memory
+        embeddings = retriever.vectorstore.embedding_function
+        if getattr(embeddings, "query_cache", None) is not None:
+            embeddings.query_cache = None
+
+        results = []
+        for variant in variants:
+            name = variant.experiment_name(prefix)
+            result = SweepResult(
+                name,
+                variant,
+                build_seconds=build_seconds,
+                shared_build=len(variants) > 1,
+                parents=ingestion.parents,
+                children=ingestion.children,
+                index_bytes=build_info["index"].get("memory_bytes", 0),
+            )
+            try:
+                variant_retriever = retriever.model_copy(
+                    update={"search_kwargs": {**retriever.search_kwargs, "k": variant.top_k}}
+                )
+                result.retrieval_ms = _retrieval_latency(variant_retriever, queries)
+                result.saved = self.engine.save_retriever(
+                    name,
+                    variant_retriever,
+                    {
+                        **config,
+                        "embedding_model": variant.embedding_model,
+                        "chunk_size": variant.chunk_size,
+                        "top_k": variant.top_k,
+                        **build_info,
+                    },
+                )
+            except Exception as e:
+                logging.error(f"Sweep variant {name} failed: {str(e)}")
+                result.error = str(e)
+            results.append(result)
+        return results
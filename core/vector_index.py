@@ -0,0 +1,354 @@
+import logging
+import math
+import statistics
+import time
+import uuid
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from config import (
+    FAISS_FLAT_MAX_VECTORS,
+    FAISS_HNSW_MAX_VECTORS,
+    FAISS_IVF_FLAT_MAX_VECTORS,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NPROBE,
+    FAISS_TRAIN_SAMPLE_SIZE,
+)
+from config.constants import IndexType
+
+# Vectors reconstructed and re-added per step while compacting an index
+_COMPACTION_BATCH_SIZE = 65536
+# Training points FAISS recommends per IVF centroid
+_POINTS_PER_CENTROID = 39
+# Smallest IVF worth building; smaller corpora fall back to a flat index
+_MIN_IVF_LISTS = 8
+# Stored vectors reused as queries to measure search latency after a build
+_LATENCY_PROBE_QUERIES = 32
+_LATENCY_PROBE_K = 10
+
+
+def choose_index_type(expected_vectors: int) -> IndexType:
+    """Pick an index type for the expected number of child chunks."""
+    if expected_vectors <= FAISS_FLAT_MAX_VECTORS:
+        return IndexType.FLAT
+    if expected_vectors <= FAISS_HNSW_MAX_VECTORS:
+        return IndexType.HNSW
+    if expected_vectors <= FAISS_IVF_FLAT_MAX_VECTORS:
+        return IndexType.IVF_FLAT
+    return IndexType.IVF_PQ
+
+
+def detect_index_type(index: faiss.Index) -> IndexType:
+    """Identify the IndexType of an existing FAISS index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return IndexType.HNSW
+    if isinstance(index, faiss.IndexIVFPQ):
+        return IndexType.IVF_PQ
+    if isinstance(index, faiss.IndexIVF) and index.nlist > 1:
+        return IndexType.IVF_FLAT
+    # Flat indexes are persisted as a single-list IVF for memory mapping
+    return IndexType.FLAT
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest usual PQ sub-quantizer count that divides the dimension."""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2):
+        if dimension % m == 0 and m <= dimension:
+            return m
+    return 1
+
+
+def create_index(
+    index_type: IndexType,
+    dimension: int,
+    expected_vectors: int,
+    training_vectors: int,
+) -> tuple[faiss.Index, IndexType]:
+    """
+    Create an empty FAISS index.
+
+    Args:
+        index_type: Requested index type, AUTO to choose by expected size
+        dimension: Embedding dimension
+        expected_vectors: Expected number of vectors in the finished index
+        training_vectors: Vectors available for training IVF indexes
+
+    Returns:
+        Tuple of (index, resolved index type)
+    """
+    if index_type == IndexType.AUTO:
+        index_type = choose_index_type(expected_vectors)
+
+    nlist = 0
+    if index_type in (IndexType.IVF_FLAT, IndexType.IVF_PQ):
+        nlist = min(
+            int(4 * math.sqrt(max(expected_vectors, 1))),
+            training_vectors // _POINTS_PER_CENTROID,
+        )
+        if nlist < _MIN_IVF_LISTS:
+            logging.warning(
+                f"Too few vectors ({training_vectors}) to train {index_type.value}, "
+                "using a flat index"
+            )
+            index_type = IndexType.FLAT
+
+    if index_type == IndexType.HNSW:
+        index = faiss.IndexHNSWFlat(dimension, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+    elif index_type == IndexType.IVF_FLAT:
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, nlist)
+        index.nprobe = FAISS_IVF_NPROBE
+    elif index_type == IndexType.IVF_PQ:
+        # 8-bit codes need 256 centroids per sub-quantizer, each well trained
+        nbits = 8 if training_vectors >= 256 * _POINTS_PER_CENTROID else 4
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dimension),
+            dimension,
+            nlist,
+            _pq_subquantizers(dimension),
+            nbits,
+        )
+        index.nprobe = FAISS_IVF_NPROBE
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    return index, index_type
+
+
+def estimate_index_bytes(index: faiss.Index) -> int:
+    """Estimate the in-memory size of a FAISS index without serializing it."""
+    index = faiss.downcast_index(index)
+    ntotal, dimension = index.ntotal, index.d
+
+    if isinstance(index, faiss.IndexHNSW):
+        # Vectors plus roughly 2*M level-0 neighbour links per vector
+        return ntotal * (dimension * 4 + index.hnsw.nb_neighbors(0) * 4)
+    if isinstance(index, faiss.IndexIVF):
+        centroids = index.nlist * dimension * 4
+        if isinstance(index, faiss.IndexIVFPQ):
+            codebook = index.pq.M * index.pq.ksub * index.pq.dsub * 4
+            return centroids + codebook + ntotal * (index.code_size + 8)
+        return centroids + ntotal * (dimension * 4 + 8)
+    return ntotal * dimension * 4
+
+
+def index_summary(index: faiss.Index) -> dict:
+    """Describe an index for the experiment config."""
+    return {
+        "type": detect_index_type(index).value,
+        "vectors": int(index.ntotal),
+        "dimension": int(index.d),
+        "memory_bytes": estimate_index_bytes(index),
+    }
+
+
+class FaissIndexBuilder:
+    """
+    Batched FAISS index builder.
+
+    Embedding batches arrive as NumPy matrices and are added straight to
+    the native index. New indexes are created once enough vectors have been
+    buffered to pick an index type for the expected corpus size and to
+    train IVF quantizers, so no placeholder vector is ever inserted.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        index_type: str = IndexType.AUTO.value,
+        vectorstore: Optional[FAISS] = None,
+        expected_vectors: Optional[Callable[[], int]] = None,
+        docstore=None,
+    ):
+        """
+        Initialize FaissIndexBuilder.
+
+        Args:
+            embeddings: Embeddings attached to the resulting vectorstore
+            index_type: IndexType value, or "auto" to choose by corpus size
+            vectorstore: Existing vectorstore to extend instead of creating one
+            expected_vectors: Callable estimating the final number of vectors
+            docstore: Child docstore for a new vectorstore, in memory if None
+        """
+        self.embeddings = embeddings
+        self.docstore = docstore
+        self.requested_type = IndexType(index_type)
+        self.vectorstore = vectorstore
+        self.expected_vectors = expected_vectors or (lambda: 0)
+        self._pending_vectors: list[np.ndarray] = []
+        self._pending_documents: list[Document] = []
+        self._pending_count = 0
+        self._probe: Optional[np.ndarray] = None
+        self._build_seconds = 0.0
+
+    def add(self, vectors: np.ndarray, documents: list[Document]) -> None:
+        """
+        Add a batch of embedded chunks.
+
+        Args:
+            vectors: float32 matrix with one row per document
+            documents: Child chunks matching the matrix rows
+        """
+        if self._probe is None or len(self._probe) < _LATENCY_PROBE_QUERIES:
+            needed = _LATENCY_PROBE_QUERIES - (0 if self._probe is None else len(self._probe))
+            sample = vectors[:needed].copy()
+            self._probe = sample if self._probe is None else np.vstack([self._probe, sample])
+
+        if self.vectorstore is not None:
+            self._timed(self._add_to_store, vectors, documents)
+            return
+
+        self._pending_vectors.append(vectors)
+        self._pending_documents.extend(documents)
+        self._pending_count += len(vectors)
+        if self._pending_count >= FAISS_TRAIN_SAMPLE_SIZE:
+            self._timed(self._create_from_pending)
+
+    def finish(self) -> Optional[FAISS]:
+        """Flush buffered vectors and return the vectorstore, if any."""
+        if self.vectorstore is None and self._pending_count:
+            self._timed(self._create_from_pending)
+        return self.vectorstore
+
+    def stats(self) -> dict:
+        """Build statistics recorded in the experiment config."""
+        if self.vectorstore is None:
+            return {}
+
+        return {
+            **index_summary(self.vectorstore.index),
+            "requested_type": self.requested_type.value,
+            "build_seconds": round(self._build_seconds, 3),
+            "query_latency_ms": self._measure_latency(),
+        }
+
+    def _timed(self, target: Callable, *args) -> None:
+        start = time.perf_counter()
+        target(*args)
+        self._build_seconds += time.perf_counter() - start
+
+    def _create_from_pending(self) -> None:
+        """Create, train and fill the index from the buffered vectors."""
+        sample = np.vstack(self._pending_vectors)
+        expected = max(self._pending_count, self.expected_vectors())
+        index, _ = create_index(
+            self.requested_type,
+            sample.shape[1],
+            expected,
+            len(sample),
+        )
+        if not index.is_trained:
+            index.train(sample)
+
+        docstore = self.docstore if self.docstore is not None else InMemoryDocstore()
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=getattr(docstore, "index_mapping", {}),
+        )
+        self._add_to_store(sample, self._pending_documents)
+
+        self._pending_vectors = []
+        self._pending_documents = []
+        self._pending_count = 0
+
+    def _add_to_store(self, vectors: np.ndarray, documents: list[Document]) -> None:
+        """Add a matrix to the native index and register its documents."""
+        ids = [str(uuid.uuid4()) for _ in documents]
+        for doc_id, document in zip(ids, documents):
+            document.id = doc_id
+
+        docstore = self.vectorstore.docstore
+        start = self.vectorstore.index.ntotal
+        self.vectorstore.index.add(vectors)
+
+        if hasattr(docstore, "add_at_positions"):
+            docstore.add_at_positions(start, ids, documents)
+        else:
+            docstore.add(dict(zip(ids, documents)))
+            self.vectorstore.index_to_docstore_id.update(
+                {start + offset: doc_id for offset, doc_id in enumerate(ids)}
+            )
+
+    def _measure_latency(self) -> Optional[float]:
+        """Median single-query search latency in milliseconds."""
+        if self._probe is None or not len(self._probe):
+            return None
+
+        index = self.vectorstore.index
+        k = min(_LATENCY_PROBE_K, index.ntotal)
+        timings = []
+        for query in self._probe:
+            start = time.perf_counter()
+            index.search(query.reshape(1, -1), k)
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(timings), 3)
+
+
+def _enable_reconstruct(index: faiss.Index) -> None:
+    """Make sure stored vectors can be reconstructed from the index."""
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return
+    ivf.make_direct_map()
+
+
+def delete_vectors(vectorstore: FAISS, ids: list[str]) -> int:
+    """
+    Delete vectors from a LangChain FAISS store and compact its index.
+
+    The surviving vectors are copied into a fresh index of the same type
+    (keeping any trained quantizer), so deleted slots do not keep their
+    memory and index types without native removal are supported.
+
+    Args:
+        vectorstore: FAISS vectorstore to modify in place
+        ids: Docstore ids of the vectors to remove
+
+    Returns:
+        Number of vectors removed
+    """
+    to_remove = set(ids)
+    if not to_remove:
+        return 0
+
+    index = vectorstore.index
+    positions = sorted(vectorstore.index_to_docstore_id.items())
+    keep_positions = [position for position, doc_id in positions if doc_id not in to_remove]
+    removed_ids = [doc_id for _, doc_id in positions if doc_id in to_remove]
+    if not removed_ids:
+        return 0
+
+    _enable_reconstruct(index)
+    compacted = faiss.clone_index(index)
+    compacted.reset()
+
+    for start in range(0, len(keep_positions), _COMPACTION_BATCH_SIZE):
+        positions = np.asarray(
+            keep_positions[start:start + _COMPACTION_BATCH_SIZE],
+            dtype=np.int64,
+        )
+        compacted.add(index.reconstruct_batch(positions))
+
+    vectorstore.index = compacted
+    vectorstore.docstore.delete(removed_ids)
+
+    if hasattr(vectorstore.docstore, "compact_positions"):
+        vectorstore.docstore.compact_positions()
+    else:
+        vectorstore.index_to_docstore_id = {
+            new_position: vectorstore.index_to_docstore_id[old_position]
+            for new_position, old_position in enumerate(keep_positions)
+        }
+    return len(removed_ids)
@@ -5,6 +5,8 @@ import streamlit as st
 
 from config import APP_TITLE, APP_ICON, APP_LAYOUT, STYLES_FILE
 from config.constants import PageName, PAGE_CONFIG
+from core.embedding_registry import embedding_registry
+from core.persistence import remove_stale_temp_databases
 from ui.pages import home, model_management, ai_chatbot, rag_chat
 
 
@@ -35,6 +37,17 @@ def load_css() -> None:
 load_css()
 
 
+# =============================================================================
+# Embedding Model Warm-up
+# =============================================================================
+
+# Loads the default embedding models in the background once per process
+embedding_registry.warm_up()
+
+# Build databases of a killed process are never garbage collected
+remove_stale_temp_databases()
+
+
 # =============================================================================
 # Session State Initialization
 # =============================================================================
@@ -0,0 +1,41 @@
+from core.answer_cache import SemanticAnswerCache
+
+NAMESPACE = (("experiment", "v-1"), "llama3", False)
+
+# Paraphrases and near-identical questions embed almost the same
+QUESTION_EMBEDDING = [1.0, 0.0, 0.0]
+NEAR_EMBEDDING = [0.99, 0.05, 0.0]
+
+
+def make_cache() -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=16, max_bytes=1024 ** 2, ttl_seconds=60)
+    cache.store(
+        NAMESPACE,
+        "What is the torque for part A-113?",
+        QUESTION_EMBEDDING,
+        {"result": "12 Nm", "source_documents": []},
+    )
+    return cache
+
+
+def test_similar_question_with_same_identifiers_hits():
+    cache = make_cache()
+
+    result = cache.lookup(NAMESPACE, "what's the torque for part a-113", NEAR_EMBEDDING)
+
+    assert result is not None
+    assert result["result"] == "12 Nm"
+
+
+def test_similar_question_with_other_identifier_misses():
+    cache = make_cache()
+
+    assert cache.lookup(NAMESPACE, "What is the torque for part A-118?", NEAR_EMBEDDING) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_added_or_dropped_numbers_miss():
+    cache = make_cache()
+
+    assert cache.lookup(NAMESPACE, "What is the torque for part A-113 rev 2?", NEAR_EMBEDDING) is None
+    assert cache.lookup(NAMESPACE, "What is the torque for the part?", NEAR_EMBEDDING) is None
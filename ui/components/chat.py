@@ -100,12 +100,11 @@ def handle_rag_chat_input(
             stream_handler = stream_handler_class(response_placeholder)
 
             try:
-                retrieval_chain = rag_system.get_retrieval_chain(
+                response = rag_system.answer_question(
+                    prompt,
                     llm_model,
                     stream_handler=stream_handler,
                 )
-
-                response = retrieval_chain.invoke({"query": prompt})
                 final_response = response["result"].strip()
 
                 st.session_state.messages.append({
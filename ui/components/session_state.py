@@ -84,9 +84,24 @@ def init_rag_session_state() -> None:
     if "previous_chunk_size" not in st.session_state:
         st.session_state.previous_chunk_size = None
 
+    if "previous_chunk_unit" not in st.session_state:
+        st.session_state.previous_chunk_unit = None
+
+    if "ingestion_job_id" not in st.session_state:
+        st.session_state.ingestion_job_id = None
+
+    if "sweep_job_id" not in st.session_state:
+        st.session_state.sweep_job_id = None
+
     if "previous_top_k" not in st.session_state:
         st.session_state.previous_top_k = None
 
+    if "previous_index_type" not in st.session_state:
+        st.session_state.previous_index_type = None
+
+    if "previous_retrieval_mode" not in st.session_state:
+        st.session_state.previous_retrieval_mode = None
+
 
 def reset_conversation_state() -> None:
     """Reset conversation-related session state."""
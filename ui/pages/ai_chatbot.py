@@ -272,14 +272,15 @@ def run() -> None:
 
             try:
                 stream_handler = StreamHandler(response_placeholder)
-                st.session_state.conversation.llm.callbacks = [stream_handler]
 
+                # The LLM is shared between sessions, so stream through this request only
                 response = stream_handler.clean_response(
-                    st.session_state.conversation.run(prompt)
+                    st.session_state.conversation.invoke(
+                        {"input": prompt},
+                        config={"callbacks": [stream_handler]},
+                    )["response"]
                 )
 
-                st.session_state.conversation.llm.callbacks = []
-
                 st.session_state.messages.append({
                     "role": MessageRole.ASSISTANT.value,
                     "content": response,
@@ -1,7 +1,23 @@
 import streamlit as st
 
-from config import DEFAULT_CHUNK_SIZE, DEFAULT_TOP_K
-from config.constants import ExperimentStatus, MessageRole
+from config import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_TOP_K,
+    INGESTION_JOB_POLL_SECONDS,
+)
+from config.constants import (
+    ChunkUnit,
+    ExperimentStatus,
+    IngestionStage,
+    IndexType,
+    JobKind,
+    JobStatus,
+    MessageRole,
+    RetrievalMode,
+)
+from core.ingestion import StageProgress
+from core.jobs import IngestionJob, ingestion_jobs
 from core.ollama_client import get_ollama_models
 from core.rag_engine import RAGEngine, EmbeddingModels, get_rag_configurations
 from utils.stream_handler import StreamHandler
@@ -12,12 +28,31 @@ import warnings
 warnings.filterwarnings("ignore", category=Warning)
 
 
+INDEX_TYPE_LABELS = {
+    IndexType.AUTO.value: "⚡ Automatic (by corpus size)",
+    IndexType.FLAT.value: "Exact (Flat)",
+    IndexType.HNSW.value: "HNSW graph",
+    IndexType.IVF_FLAT.value: "IVF-Flat",
+    IndexType.IVF_PQ.value: "IVF-PQ (compressed)",
+}
+
+RETRIEVAL_MODE_LABELS = {
+    RetrievalMode.HYBRID.value: "🔀 Hybrid (BM25 + dense)",
+    RetrievalMode.DENSE.value: "Dense only",
+}
+
+CHUNK_UNIT_LABELS = {
+    ChunkUnit.CHARACTERS.value: "Characters",
+    ChunkUnit.TOKENS.value: "Embedding model tokens",
+}
+
+
 def setup_model_selection():
     """Setup the embedding and LLM model selection interface."""
     models = get_ollama_models()
     if not models:
         st.warning("Ollama is not running. Make sure to have Ollama API installed")
-        return None, None, None, None, None
+        return None, None, None, None, None, None, None, None
 
     col1, col2 = st.columns(2)
 
@@ -53,14 +88,31 @@ def setup_model_selection():
     slider_col1, slider_col2 = st.columns(2)
 
     with slider_col1:
-        chunk_size = st.slider(
-            "Child Chunk Size (characters):",
-            min_value=100,
-            max_value=1000,
-            value=DEFAULT_CHUNK_SIZE,
-            step=100,
-            help="Size of text chunks for processing. Smaller chunks are more precise but may miss context.",
+        chunk_unit = st.radio(
+            "Chunk Size Unit:",
+            [unit.value for unit in ChunkUnit],
+            format_func=lambda x: CHUNK_UNIT_LABELS[x],
+            horizontal=True,
+            help="Token sizes fill the embedding model's input exactly. Ollama models are always sized in characters.",
         )
+        if chunk_unit == ChunkUnit.TOKENS.value:
+            chunk_size = st.slider(
+                "Child Chunk Size (tokens):",
+                min_value=32,
+                max_value=512,
+                value=DEFAULT_CHUNK_TOKENS,
+                step=32,
+                help="Size of text chunks in embedding model tokens. Sizes above the model's input limit are reduced to it.",
+            )
+        else:
+            chunk_size = st.slider(
+                "Child Chunk Size (characters):",
+                min_value=100,
+                max_value=1000,
+                value=DEFAULT_CHUNK_SIZE,
+                step=100,
+                help="Size of text chunks for processing. Smaller chunks are more precise but may miss context.",
+            )
 
     with slider_col2:
         top_k = st.slider(
@@ -72,13 +124,34 @@ def setup_model_selection():
             help="Number of most relevant parent documents to retrieve for each query.",
         )
 
+    index_col, retrieval_col = st.columns(2)
+
+    with index_col:
+        index_type = st.selectbox(
+            "Vector Index Type:",
+            [index.value for index in IndexType],
+            format_func=lambda x: INDEX_TYPE_LABELS[x],
+            help="Automatic selection uses exact search for small corpora and approximate indexes for large ones.",
+        )
+
+    with retrieval_col:
+        retrieval_mode = st.selectbox(
+            "Retrieval Mode:",
+            [mode.value for mode in RetrievalMode],
+            format_func=lambda x: RETRIEVAL_MODE_LABELS[x],
+            help="Hybrid retrieval also matches exact keywords such as identifiers, part numbers and acronyms.",
+        )
+
     # Check for parameter changes
     if (
         st.session_state.previous_model != llm_model
         or st.session_state.previous_embedding != embedding_model
         or st.session_state.previous_files != uploaded_files
         or st.session_state.previous_chunk_size != chunk_size
+        or st.session_state.previous_chunk_unit != chunk_unit
         or st.session_state.previous_top_k != top_k
+        or st.session_state.previous_index_type != index_type
+        or st.session_state.previous_retrieval_mode != retrieval_mode
     ):
         st.session_state.process_ready = False
         st.session_state.show_chat = False
@@ -89,9 +162,128 @@ def setup_model_selection():
     st.session_state.previous_embedding = embedding_model
     st.session_state.previous_files = uploaded_files
     st.session_state.previous_chunk_size = chunk_size
+    st.session_state.previous_chunk_unit = chunk_unit
     st.session_state.previous_top_k = top_k
+    st.session_state.previous_index_type = index_type
+    st.session_state.previous_retrieval_mode = retrieval_mode
+
+    return (
+        uploaded_files,
+        embedding_model,
+        llm_model,
+        chunk_size,
+        top_k,
+        index_type,
+        retrieval_mode,
+        chunk_unit,
+    )
+
+
+INGESTION_STAGE_LABELS = {
+    IngestionStage.PARSE.value: "📄 Parsing pages",
+    IngestionStage.SPLIT.value: "✂️ Splitting chunks",
+    IngestionStage.EMBED.value: "🧮 Embedding chunks",
+    IngestionStage.INDEX.value: "🗂️ Indexing vectors",
+}
+
+
+def create_progress_callback(container):
+    """Create a callback rendering per-stage ingestion progress bars."""
+    bars = {
+        stage: container.progress(0.0, text=label)
+        for stage, label in INGESTION_STAGE_LABELS.items()
+    }
+
+    def on_progress(progress: dict) -> None:
+        for stage, bar in bars.items():
+            stage_progress = progress[stage]
+            label = INGESTION_STAGE_LABELS[stage]
+            if stage_progress.total:
+                fraction = min(stage_progress.completed / stage_progress.total, 1.0)
+                bar.progress(
+                    fraction,
+                    text=f"{label}: {stage_progress.completed}/{stage_progress.total}",
+                )
+            else:
+                bar.progress(0.0, text=f"{label}: {stage_progress.completed}")
+
+    return on_progress
+
 
-    return uploaded_files, embedding_model, llm_model, chunk_size, top_k
+JOB_STATUS_LABELS = {
+    JobStatus.QUEUED.value: "⏳ Queued",
+    JobStatus.RUNNING.value: "⚙️ Running",
+    JobStatus.COMPLETED.value: "✅ Completed",
+    JobStatus.FAILED.value: "❌ Failed",
+    JobStatus.CANCELLED.value: "⏹️ Cancelled",
+}
+
+
+def job_stage_progress(job: IngestionJob) -> dict[str, StageProgress]:
+    """Per-stage progress of a job, with empty counters for stages not yet reported."""
+    return {
+        stage: StageProgress(**job.progress.get(stage, {}))
+        for stage in INGESTION_STAGE_LABELS
+    }
+
+
+def dismiss_ingestion_job() -> None:
+    """Forget the session's finished job and untick processing."""
+    st.session_state.ingestion_job_id = None
+    st.session_state.process_ready = False
+    st.session_state.process_ready_checkbox = False
+
+
+@st.fragment(run_every=INGESTION_JOB_POLL_SECONDS)
+def render_job_progress(job_id: str) -> None:
+    """Poll a background ingestion job, rerunning the page once it finishes."""
+    job = ingestion_jobs.get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+
+    if job.status == JobStatus.QUEUED.value:
+        st.info("⏳ Waiting for other ingestion jobs to finish...")
+    else:
+        variants = job.progress.get("variants")
+        if variants:
+            st.progress(
+                variants["completed"] / variants["total"],
+                text=f"{variants['completed']}/{variants['total']} experiments built",
+            )
+        create_progress_callback(st)(job_stage_progress(job))
+
+    if st.button("⏹️ Cancel", key=f"cancel_job_{job_id}"):
+        ingestion_jobs.cancel(job_id)
+
+
+@st.fragment(run_every=INGESTION_JOB_POLL_SECONDS)
+def render_ingestion_jobs() -> None:
+    """List recent ingestion jobs of every session, with cancel buttons for active ones."""
+    jobs = ingestion_jobs.list_jobs()
+    if not jobs:
+        return
+
+    with st.expander("⚙️ Ingestion Jobs", expanded=False):
+        for job in jobs:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                details = JOB_STATUS_LABELS[job.status]
+                if job.status == JobStatus.RUNNING.value:
+                    details += " - " + ", ".join(
+                        f"{stage} {progress.completed}/{progress.total or '?'}"
+                        for stage, progress in job_stage_progress(job).items()
+                    )
+                elif job.kind == JobKind.SWEEP.value and job.status == JobStatus.COMPLETED.value:
+                    saved = sum(row["Status"] == "saved" for row in job.results)
+                    details += f" - {saved}/{len(job.results)} experiments saved in {job.elapsed_seconds:.1f}s"
+                elif job.status == JobStatus.COMPLETED.value:
+                    details += f" - {job.pages} pages in {job.elapsed_seconds:.1f}s"
+                elif job.error:
+                    details += f" - {job.error}"
+                st.markdown(f"**{job.experiment_name}**: {details}")
+            with col2:
+                if job.active and st.button("Cancel", key=f"cancel_listed_job_{job.job_id}"):
+                    ingestion_jobs.cancel(job.job_id)
 
 
 def process_documents(
@@ -101,8 +293,11 @@ def process_documents(
     chunk_size: int,
     top_k: int,
     llm_model: str,
+    index_type: str = IndexType.AUTO.value,
+    retrieval_mode: str = RetrievalMode.HYBRID.value,
+    chunk_unit: str = ChunkUnit.CHARACTERS.value,
 ) -> bool:
-    """Process uploaded documents."""
+    """Build the experiment in a background job and load it once the job completes."""
     if not experiment_name:
         st.error("Please enter an experiment name")
         return False
@@ -111,43 +306,102 @@ def process_documents(
         st.error("Please upload PDF files first")
         return False
 
-    with st.spinner("📚 Processing documents..."):
-        try:
-            st.session_state.rag_system.process_pdfs(
-                uploaded_files,
-                experiment_name=experiment_name,
-                embedding_model=embedding_model,
-                child_chunk_size=chunk_size,
-                top_k=top_k,
-                llm_model=llm_model,
-            )
+    job_id = st.session_state.ingestion_job_id
+    job = ingestion_jobs.get(job_id) if job_id else None
+    if job is None or (job.experiment_name != experiment_name and not job.active):
+        config = {
+            "llm_model": llm_model,
+            "embedding_model": embedding_model,
+            "chunk_size": chunk_size,
+            "top_k": top_k,
+            "total_documents": len(uploaded_files),
+            "documents": [uploaded_file.name for uploaded_file in uploaded_files],
+        }
+        job_id = ingestion_jobs.submit(
+            experiment_name,
+            uploaded_files,
+            config,
+            embedding_model=embedding_model,
+            child_chunk_size=chunk_size,
+            top_k=top_k,
+            index_type=index_type,
+            retrieval_mode=retrieval_mode,
+            chunk_unit=chunk_unit,
+        )
+        st.session_state.ingestion_job_id = job_id
+        st.session_state.processing_completed = False
+        job = ingestion_jobs.get(job_id)
 
-            config = {
-                "llm_model": llm_model,
-                "embedding_model": embedding_model,
-                "chunk_size": chunk_size,
-                "top_k": top_k,
-                "total_documents": len(uploaded_files),
-            }
+    if job.active:
+        with st.status(f"📚 Processing {job.experiment_name} in the background...", expanded=True):
+            render_job_progress(job_id)
+        return False
 
-            success = st.session_state.rag_system.save_experiment(experiment_name, config)
+    if job.status != JobStatus.COMPLETED.value:
+        if job.status == JobStatus.CANCELLED.value:
+            st.warning(f"⏹️ Processing of {job.experiment_name} was cancelled")
+        else:
+            st.error(f"❌ Error processing documents: {job.error}")
+        st.button("Dismiss", key="dismiss_ingestion_job", on_click=dismiss_ingestion_job)
+        return False
 
-            if not success:
-                st.error("Failed to save experiment configuration")
-                return False
+    if not st.session_state.processing_completed:
+        # The job built the experiment on its own engine; load it into this session's
+        success, _ = st.session_state.rag_system.load_experiment(job.experiment_name)
+        if not success:
+            st.error(f"Failed to load experiment: {job.experiment_name}")
+            return False
 
-            st.session_state.show_chat = True
-            st.session_state.messages = []
-            st.session_state.target_experiment = experiment_name
-            st.session_state.process_ready = True
-            st.session_state.processing_completed = True
+        st.session_state.show_chat = True
+        st.session_state.messages = []
+        st.session_state.target_experiment = job.experiment_name
+        st.session_state.process_ready = True
+        st.session_state.processing_completed = True
 
-            st.rerun()
-            return True
+    return True
 
-        except Exception as e:
-            st.error(f"❌ Error processing documents: {str(e)}")
-            return False
+
+def render_document_management(experiment_name: str) -> None:
+    """Render controls for adding and removing documents of a saved experiment."""
+    rag_system = st.session_state.rag_system
+
+    with st.expander("🗂️ Manage Experiment Documents", expanded=False):
+        config = rag_system.experiment_store.load_config(experiment_name) or {}
+        documents = config.get("documents", [])
+        if documents:
+            st.markdown("\n".join(f"- {name}" for name in documents))
+
+        new_files = st.file_uploader(
+            "Add PDF files:",
+            type=["pdf"],
+            accept_multiple_files=True,
+            key=f"add_files_{experiment_name}",
+        )
+        if new_files and st.button("➕ Add Documents", key=f"add_button_{experiment_name}"):
+            with st.status("📚 Adding documents...", expanded=True) as status:
+                try:
+                    rag_system.add_documents_to_experiment(
+                        experiment_name,
+                        new_files,
+                        progress_callback=create_progress_callback(status),
+                    )
+                    status.update(label="✅ Documents added", state="complete")
+                except Exception as e:
+                    status.update(label="❌ Adding documents failed", state="error")
+                    st.error(f"❌ Error adding documents: {str(e)}")
+
+        to_remove = st.multiselect(
+            "Remove documents:",
+            documents,
+            key=f"remove_files_{experiment_name}",
+        )
+        if to_remove and st.button("🗑️ Remove Documents", key=f"remove_button_{experiment_name}"):
+            with st.spinner("Removing documents..."):
+                try:
+                    rag_system.remove_documents_from_experiment(experiment_name, to_remove)
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"❌ {str(e)}")
 
 
 def handle_chat_interaction(llm_model: str) -> None:
@@ -157,6 +411,12 @@ def handle_chat_interaction(llm_model: str) -> None:
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    rerank = st.toggle(
+        "🎯 Rerank retrieved passages",
+        key="rerank_enabled",
+        help="Reorders retrieved passages with a cross-encoder so fewer, more relevant ones reach the model.",
+    )
+
     # Display chat history
     display_chat_history()
 
@@ -176,13 +436,21 @@ def handle_chat_interaction(llm_model: str) -> None:
             stream_handler = StreamHandler(response_placeholder)
 
             try:
-                retrieval_chain = st.session_state.rag_system.get_retrieval_chain(
+                response = st.session_state.rag_system.answer_question(
+                    prompt,
                     llm_model,
                     stream_handler=stream_handler,
+                    rerank=rerank,
                 )
-
-                response = retrieval_chain.invoke({"query": prompt})
                 final_response = response["result"].strip()
+                if response["cached"]:
+                    st.caption("⚡ Answered from cache")
+                elif response.get("context"):
+                    context = response["context"]
+                    st.caption(
+                        f"📦 {context['documents']} passages, ~{context['tokens']} prompt tokens "
+                        f"({context['tokens_saved']} saved)"
+                    )
 
                 st.session_state.messages.append({
                     "role": MessageRole.ASSISTANT.value,
@@ -200,6 +468,108 @@ def handle_chat_interaction(llm_model: str) -> None:
                 })
 
 
+def render_parameter_sweep() -> None:
+    """Render the form building one experiment per combination of parameters."""
+    with st.expander("🧪 Parameter Sweep", expanded=False):
+        st.markdown(
+            "Build and save an experiment for every combination of the selected "
+            "parameters in a background job. The PDFs are parsed once and builds "
+            "are shared where possible."
+        )
+
+        sweep_files = st.file_uploader(
+            "Upload one or more PDF files:",
+            type=["pdf"],
+            accept_multiple_files=True,
+            key="sweep_files",
+        )
+
+        embedding_models = EmbeddingModels.load()
+        col1, col2 = st.columns(2)
+        with col1:
+            sweep_embeddings = st.multiselect(
+                "Embedding Models:",
+                list(embedding_models.keys()),
+                default=list(embedding_models.keys())[:1],
+                key="sweep_embeddings",
+            )
+            sweep_unit = st.radio(
+                "Chunk Size Unit:",
+                [unit.value for unit in ChunkUnit],
+                format_func=lambda x: CHUNK_UNIT_LABELS[x],
+                horizontal=True,
+                key="sweep_unit",
+            )
+            if sweep_unit == ChunkUnit.TOKENS.value:
+                size_options, default_size = list(range(64, 513, 64)), DEFAULT_CHUNK_TOKENS
+            else:
+                size_options, default_size = list(range(100, 1001, 100)), DEFAULT_CHUNK_SIZE
+            sweep_sizes = st.multiselect(
+                f"Child Chunk Sizes ({sweep_unit}):",
+                size_options,
+                default=[default_size],
+                key=f"sweep_sizes_{sweep_unit}",
+            )
+        with col2:
+            sweep_top_ks = st.multiselect(
+                "Parent Documents to Retrieve:",
+                list(range(1, 16)),
+                default=[DEFAULT_TOP_K],
+                key="sweep_top_ks",
+            )
+            models = get_ollama_models()
+            sweep_llm = st.selectbox(
+                "Language Model:",
+                models or [None],
+                format_func=lambda x: f"🔮 {x}" if x else "None available",
+                key="sweep_llm",
+            )
+            sweep_prefix = st.text_input(
+                "Experiment Name Prefix:",
+                placeholder="Enter a prefix for the experiment names",
+                key="sweep_prefix",
+            )
+
+        variants = len(sweep_embeddings) * len(sweep_sizes) * len(sweep_top_ks)
+        builds = len(sweep_embeddings) * len(sweep_sizes)
+        st.caption(f"{variants} experiments from {builds} index builds")
+
+        job_id = st.session_state.sweep_job_id
+        job = ingestion_jobs.get(job_id) if job_id else None
+        if job is None:
+            # After a reload, show the most recent sweep of any session
+            job = next((job for job in ingestion_jobs.list_jobs() if job.kind == JobKind.SWEEP.value), None)
+
+        running = job is not None and job.active
+        if st.button(
+            "🚀 Run Sweep",
+            disabled=running or not (variants and sweep_files and sweep_prefix),
+        ):
+            st.session_state.sweep_job_id = ingestion_jobs.submit_sweep(
+                sweep_prefix,
+                sweep_files,
+                embedding_models=sweep_embeddings,
+                chunk_sizes=sweep_sizes,
+                top_ks=sweep_top_ks,
+                llm_model=sweep_llm,
+                chunk_unit=sweep_unit,
+            )
+            job = ingestion_jobs.get(st.session_state.sweep_job_id)
+
+        if job is None:
+            return
+        if job.active:
+            with st.status(f"🧪 Running parameter sweep {job.experiment_name}...", expanded=True):
+                render_job_progress(job.job_id)
+        elif job.status == JobStatus.COMPLETED.value:
+            st.markdown(f"✅ Parameter sweep **{job.experiment_name}** completed")
+            st.dataframe(job.results, use_container_width=True, hide_index=True)
+        elif job.status == JobStatus.CANCELLED.value:
+            st.warning(f"⏹️ Parameter sweep {job.experiment_name} was cancelled")
+        else:
+            st.error(f"❌ Error running sweep: {job.error}")
+
+
 def render_rag_analysis_tab() -> None:
     """Render the RAG Analysis tab content."""
     st.markdown("#### 📋 Configuration")
@@ -212,6 +582,9 @@ def render_rag_analysis_tab() -> None:
         else:
             st.write("No saved configurations found.")
 
+    render_parameter_sweep()
+    render_ingestion_jobs()
+
     # Get existing experiments
     current_experiments = st.session_state.rag_system.list_experiments()
     experiment_names = [ExperimentStatus.NEW.value] + [name for name, _ in current_experiments]
@@ -242,7 +615,16 @@ def render_rag_analysis_tab() -> None:
     is_new_experiment = selected_experiment == ExperimentStatus.NEW.value
 
     if is_new_experiment:
-        uploaded_files, embedding_model, llm_model, chunk_size, top_k = setup_model_selection()
+        (
+            uploaded_files,
+            embedding_model,
+            llm_model,
+            chunk_size,
+            top_k,
+            index_type,
+            retrieval_mode,
+            chunk_unit,
+        ) = setup_model_selection()
         if not llm_model:
             return
 
@@ -253,6 +635,7 @@ def render_rag_analysis_tab() -> None:
         )
     else:
         experiment_name = selected_experiment
+        render_document_management(experiment_name)
         models = get_ollama_models()
         if not models:
             st.warning("Ollama is not running. Make sure to have Ollama API installed.")
@@ -290,6 +673,9 @@ def render_rag_analysis_tab() -> None:
                 chunk_size,
                 top_k,
                 llm_model,
+                index_type,
+                retrieval_mode,
+                chunk_unit,
             )
             if success:
                 st.session_state.show_chat = True
@@ -297,6 +683,11 @@ def render_rag_analysis_tab() -> None:
     else:
         st.session_state.show_chat = False
         st.session_state.messages = []
+        # Keep following a job still running, so ticking again does not resubmit it
+        job_id = st.session_state.ingestion_job_id
+        job = ingestion_jobs.get(job_id) if job_id else None
+        if job is None or not job.active:
+            st.session_state.ingestion_job_id = None
 
 
 def run() -> None: